@@ -1,12 +1,33 @@
 # https://github.com/xinntao/BasicSR
 # flake8: noqa
-from .archs import *
-from .data import *
-from .losses import *
-from .metrics import *
-from .models import *
-from .ops import *
-from .test import *
-from .train import *
-from .utils import *
+import importlib
+
 from .version import __gitsha__, __version__
+
+# The subpackages are imported on first access (PEP 562), so that e.g. ``from basicsr.archs import build_network``
+# does not import every model, loss and the training pipeline. ``basicsr.<name>`` and ``from basicsr import *`` still
+# see the names that used to be star-imported here; later subpackages take precedence, as before.
+_SUBMODULES = ('archs', 'data', 'losses', 'metrics', 'models', 'ops', 'test', 'train', 'utils')
+
+
+def _public_names(module):
+    return getattr(module, '__all__', [name for name in vars(module) if not name.startswith('_')])
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    if name == '__all__':
+        names = {}
+        for submodule in _SUBMODULES:
+            names.update(dict.fromkeys(_public_names(importlib.import_module(f'.{submodule}', __name__))))
+        return list(names) + ['__gitsha__', '__version__']
+    for submodule in reversed(_SUBMODULES):
+        module = importlib.import_module(f'.{submodule}', __name__)
+        if name in _public_names(module):
+            return getattr(module, name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
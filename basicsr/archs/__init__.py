@@ -1,18 +1,17 @@
-import importlib
 from copy import deepcopy
 from os import path as osp
 
-from basicsr.utils import get_root_logger, scandir
-from basicsr.utils.registry import ARCH_REGISTRY
+from basicsr.utils import get_root_logger
+from basicsr.utils.registry import ARCH_REGISTRY, scan_registered_names
 
 __all__ = ['build_network']
 
-# automatically scan and import arch modules for registry
-# scan all the files under the 'archs' folder and collect files ending with '_arch.py'
+# automatically scan arch modules for registry
+# scan all the files under the 'archs' folder ending with '_arch.py' for registered names, and only import the
+# module of an arch when it is requested by ARCH_REGISTRY.get
 arch_folder = osp.dirname(osp.abspath(__file__))
-arch_filenames = [osp.splitext(osp.basename(v))[0] for v in scandir(arch_folder) if v.endswith('_arch.py')]
-# import all the arch modules
-_arch_modules = [importlib.import_module(f'basicsr.archs.{file_name}') for file_name in arch_filenames]
+for _name, _module in scan_registered_names(arch_folder, 'basicsr.archs', '_arch.py', 'ARCH_REGISTRY').items():
+    ARCH_REGISTRY.register_lazy(_name, _module)
 
 
 def build_network(opt):
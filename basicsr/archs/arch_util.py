@@ -1,7 +1,6 @@
 import collections.abc
 import math
 import torch
-import torchvision
 import warnings
 from distutils.version import LooseVersion
 from itertools import repeat
@@ -223,6 +222,9 @@ class DCNv2Pack(ModulatedDeformConvPack):
             logger = get_root_logger()
             logger.warning(f'Offset abs mean is {offset_absmean}, larger than 50.')
 
+        # torchvision is slow to import, so it is only imported here
+        import torchvision
+
         if LooseVersion(torchvision.__version__) >= LooseVersion('0.9.0'):
             return torchvision.ops.deform_conv2d(x, offset, self.weight, self.bias, self.stride, self.padding,
                                                  self.dilation, mask)
@@ -1,4 +1,3 @@
-import importlib
 import numpy as np
 import random
 import torch
@@ -8,18 +7,18 @@ from functools import partial
 from os import path as osp
 
 from basicsr.data.prefetch_dataloader import PrefetchDataLoader
-from basicsr.utils import get_root_logger, scandir
+from basicsr.utils import get_root_logger
 from basicsr.utils.dist_util import get_dist_info
-from basicsr.utils.registry import DATASET_REGISTRY
+from basicsr.utils.registry import DATASET_REGISTRY, scan_registered_names
 
 __all__ = ['build_dataset', 'build_dataloader']
 
-# automatically scan and import dataset modules for registry
-# scan all the files under the data folder with '_dataset' in file names
+# automatically scan dataset modules for registry
+# scan all the files under the data folder with '_dataset' in file names for registered names, and only import the
+# module of a dataset when it is requested by DATASET_REGISTRY.get
 data_folder = osp.dirname(osp.abspath(__file__))
-dataset_filenames = [osp.splitext(osp.basename(v))[0] for v in scandir(data_folder) if v.endswith('_dataset.py')]
-# import all the dataset modules
-_dataset_modules = [importlib.import_module(f'basicsr.data.{file_name}') for file_name in dataset_filenames]
+for _name, _module in scan_registered_names(data_folder, 'basicsr.data', '_dataset.py', 'DATASET_REGISTRY').items():
+    DATASET_REGISTRY.register_lazy(_name, _module)
 
 
 def build_dataset(dataset_opt):
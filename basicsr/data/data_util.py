@@ -92,6 +92,68 @@ def generate_frame_indices(crt_idx, max_frame_num, num_frames, padding='reflecti
     return indices
 
 
+class FrameWindowCache():
+    """Ring cache of decoded frames for sequential access to video folders.
+
+    Video test datasets read ``num_frame`` neighbours for every center frame,
+    so without caching each frame is decoded ``num_frame`` times. This cache
+    keeps the most recent ``capacity`` frames of the current folder in a ring
+    buffer: frame ``i`` lives in slot ``i % capacity``. When the center frame
+    moves forward, only the new frames are decoded and the neighbours are
+    gathered with ``index_select``. Memory is bounded by ``capacity`` frames,
+    whatever the length of the folder.
+
+    Args:
+        capacity (int): Number of frames held. It must be larger than the span
+            of the requested indices; ``2 * num_frame`` covers all padding modes
+            of :func:`generate_frame_indices`.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._folder = None
+        self._buffer = None
+        self._owner = [-1] * capacity  # frame index held by each slot
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.num_decoded = 0
+        self.num_requested = 0
+
+    @property
+    def nbytes(self):
+        return 0 if self._buffer is None else self._buffer.numel() * self._buffer.element_size()
+
+    def get(self, folder, paths, indices):
+        """Get frames of a folder.
+
+        Args:
+            folder (str): Folder name. Cached frames are dropped when it changes.
+            paths (list[str]): Frame paths of the folder.
+            indices (list[int]): Indices of the requested frames.
+
+        Returns:
+            Tensor: size (t, c, h, w), RGB, [0, 1].
+        """
+        if max(indices) - min(indices) >= self.capacity:
+            raise ValueError(f'The span of frame indices {indices} exceeds the cache capacity {self.capacity}.')
+        if folder != self._folder:
+            self._folder = folder
+            self._owner = [-1] * self.capacity
+
+        missing = [i for i in sorted(set(indices)) if self._owner[i % self.capacity] != i]
+        if missing:
+            frames = read_img_seq([paths[i] for i in missing])
+            if self._buffer is None or self._buffer.shape[1:] != frames.shape[1:]:
+                self._buffer = frames.new_empty((self.capacity, ) + frames.shape[1:])
+            for i, frame in zip(missing, frames):
+                self._buffer[i % self.capacity] = frame
+                self._owner[i % self.capacity] = i
+            self.num_decoded += len(missing)
+        self.num_requested += len(indices)
+        return self._buffer.index_select(0, torch.LongTensor([i % self.capacity for i in indices]))
+
+
 def paired_paths_from_lmdb(folders, keys):
     """Generate paired paths from lmdb files.
 
@@ -119,6 +181,9 @@ def paired_paths_from_lmdb(folders, keys):
     We use the image name without extension as the lmdb key.
     Note that we use the same key for the corresponding lq and gt images.
 
+    Memmap shards (see :func:`basicsr.utils.memmap_util.make_memmap_from_imgs`)
+    have a meta_info.txt in the same format, so they are also supported.
+
     Args:
         folders (list[str]): A list of folder path. The order of list should
             be [input_folder, gt_folder].
@@ -135,8 +200,8 @@ def paired_paths_from_lmdb(folders, keys):
     input_folder, gt_folder = folders
     input_key, gt_key = keys
 
-    if not (input_folder.endswith('.lmdb') and gt_folder.endswith('.lmdb')):
-        raise ValueError(f'{input_key} folder and {gt_key} folder should both in lmdb '
+    if not (input_folder.endswith(('.lmdb', '.memmap')) and gt_folder.endswith(('.lmdb', '.memmap'))):
+        raise ValueError(f'{input_key} folder and {gt_key} folder should both in lmdb (or memmap) '
                          f'formats. But received {input_key}: {input_folder}; '
                          f'{gt_key}: {gt_folder}')
     # ensure that the two meta_info files are the same
@@ -233,6 +298,37 @@ def paired_paths_from_folder(folders, keys, filename_tmpl):
     return paths
 
 
+def generate_subimage_index(shapes, crop_size, step, thresh_size=0):
+    """Generate the index of overlapped sub-images (crops) of images.
+
+    The crop positions are the same as those of
+    ``scripts/data_preparation/extract_subimages.py``, so that a dataset can
+    crop the sub-images on the fly instead of extracting them to disk.
+
+    Args:
+        shapes (list[tuple[int]]): Shapes (h, w, ...) of the images.
+        crop_size (int): Crop size.
+        step (int): Step for overlapped sliding window.
+        thresh_size (int): Threshold size. If the remaining border is larger
+            than it, an extra crop aligned to the border is added.
+            Default: 0.
+
+    Returns:
+        list[tuple[int]]: (image index, top, left) of each crop.
+    """
+    index = []
+    for idx, shape in enumerate(shapes):
+        h, w = shape[0:2]
+        h_space = np.arange(0, h - crop_size + 1, step)
+        if h - (h_space[-1] + crop_size) > thresh_size:
+            h_space = np.append(h_space, h - crop_size)
+        w_space = np.arange(0, w - crop_size + 1, step)
+        if w - (w_space[-1] + crop_size) > thresh_size:
+            w_space = np.append(w_space, w - crop_size)
+        index.extend((idx, int(top), int(left)) for top in h_space for left in w_space)
+    return index
+
+
 def paths_from_folder(folder):
     """Generate paths from folder.
 
@@ -257,8 +353,8 @@ def paths_from_lmdb(folder):
     Returns:
         list[str]: Returned path list.
     """
-    if not folder.endswith('.lmdb'):
-        raise ValueError(f'Folder {folder}folder should in lmdb format.')
+    if not folder.endswith(('.lmdb', '.memmap')):
+        raise ValueError(f'Folder {folder}folder should in lmdb (or memmap) format.')
     with open(osp.join(folder, 'meta_info.txt')) as fin:
         paths = [line.split('.')[0] for line in fin]
     return paths
@@ -0,0 +1,229 @@
+import atexit
+import hashlib
+import multiprocessing
+import numpy as np
+import os
+import shutil
+import tempfile
+from os import path as osp
+
+from basicsr.utils import imfrombytes
+
+_HITS, _MISSES, _EVICTIONS, _BYTES = range(4)
+
+
+class SharedImageCache():
+    """Cache of decoded images shared by all DataLoader workers.
+
+    Decoded uint8 arrays are stored as ``.npy`` files in a directory on
+    ``/dev/shm`` (falling back to the system temp dir), so an image decoded by
+    any worker is reused by all workers in later epochs. Entries are written to
+    a temporary file and renamed, thus readers never see partial arrays.
+
+    The total size is capped by ``max_size_mb``. When the cap is exceeded, the
+    least recently used entries (by mtime, refreshed on every hit) are evicted
+    until the size drops below ``low_watermark * max_size_mb``, so that the
+    directory is scanned once per batch of evictions rather than per insert.
+
+    The counters and the lock live in shared memory. Create the cache in the
+    main process before the DataLoader workers are started. The directory is
+    removed when the main process exits.
+
+    Args:
+        max_size_mb (int): Size cap of the cache in MB. Default: 4096.
+        cache_dir (str | None): Parent directory of the cache. Default: None,
+            which means ``/dev/shm`` if it exists.
+        low_watermark (float): Ratio of the cap to evict down to. Default: 0.9.
+    """
+
+    def __init__(self, max_size_mb=4096, cache_dir=None, low_watermark=0.9):
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.low_watermark = low_watermark
+        if cache_dir is None:
+            cache_dir = '/dev/shm' if osp.isdir('/dev/shm') else None
+        self.cache_dir = tempfile.mkdtemp(prefix='basicsr_img_cache_', dir=cache_dir)
+        self._owner_pid = os.getpid()
+        self._lock = multiprocessing.Lock()
+        self._counters = multiprocessing.Array('q', 4)
+        atexit.register(self.close)
+
+    def _path(self, key):
+        return osp.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.npy')
+
+    def _count(self, idx, value=1):
+        with self._counters.get_lock():
+            self._counters[idx] += value
+
+    def get(self, key):
+        """Get a decoded image.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            ndarray | None: The cached image, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            img = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError):  # not cached, evicted meanwhile or unreadable
+            self._count(_MISSES)
+            return None
+        self._count(_HITS)
+        return img
+
+    def put(self, key, img):
+        """Put a decoded image.
+
+        Args:
+            key (str): Cache key.
+            img (ndarray): Decoded image.
+
+        Returns:
+            bool: Whether the image is cached. It fails when the image is larger
+                than the cap or the file system is full.
+        """
+        if img.nbytes > self.max_bytes * self.low_watermark:
+            return False
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, img, allow_pickle=False)
+            size = osp.getsize(tmp_path)
+            with self._lock:
+                if osp.exists(path):  # cached by another worker meanwhile
+                    os.remove(tmp_path)
+                    return True
+                os.replace(tmp_path, path)
+                self._count(_BYTES, size)
+                if self._counters[_BYTES] > self.max_bytes:
+                    self._evict()
+        except OSError:
+            if osp.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def _evict(self):
+        """Remove the least recently used entries. Must hold the lock."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.npy'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.low_watermark
+        num_evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            num_evicted += 1
+        self._count(_EVICTIONS, num_evicted)
+        with self._counters.get_lock():
+            self._counters[_BYTES] = total
+
+    def stats(self):
+        """Get the counters accumulated over all processes.
+
+        Returns:
+            dict: hits, misses, evictions, hit_rate and size_mb.
+        """
+        with self._counters.get_lock():
+            hits, misses, evictions, nbytes = self._counters[:]
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / total if total > 0 else 0.,
+            'size_mb': nbytes / 1024 / 1024
+        }
+
+    def close(self):
+        """Remove the cache directory. Only effective in the creating process."""
+        if os.getpid() == self._owner_pid:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def build_image_cache(opt):
+    """Build a SharedImageCache from the ``image_cache`` option of a dataset.
+
+    Args:
+        opt (dict | None): Config with optional keys ``max_size_mb``,
+            ``cache_dir`` and ``low_watermark``. None disables the cache.
+
+    Returns:
+        SharedImageCache | None: The cache.
+    """
+    if not opt:
+        return None
+    return SharedImageCache(**opt)
+
+
+def read_image(file_client, path, client_key='default', image_cache=None):
+    """Read and decode an image through an optional decoded-image cache.
+
+    Args:
+        file_client (FileClient): File client to read the image bytes.
+        path (str): Image path (or lmdb key).
+        client_key (str): Client key of the file client. Default: 'default'.
+        image_cache (SharedImageCache | None): Decoded-image cache. Default: None.
+
+    Returns:
+        ndarray: Image with order HWC, BGR, range [0, 1], float32.
+    """
+    if getattr(file_client, 'backend', None) == 'memmap':  # uint8 arrays, nothing to decode or cache
+        return file_client.get(path, client_key).astype(np.float32) / 255.
+    if image_cache is None:
+        return imfrombytes(file_client.get(path, client_key), float32=True)
+    key = f'{client_key}:{path}'
+    img = image_cache.get(key)
+    if img is None:
+        img = imfrombytes(file_client.get(path, client_key))
+        image_cache.put(key, img)
+    return img.astype(np.float32) / 255.
+
+
+def read_image_region(file_client, path, region, client_key='default', image_cache=None):
+    """Read a region of an image.
+
+    Images in memmap shards (the memmap backend) and images stored as uint8
+    ``.npy`` arrays (HWC, BGR) are memory-mapped, so only the pages of the
+    region are read and nothing is decoded. Other images are decoded (through
+    the optional decoded-image cache) and cropped.
+
+    Args:
+        file_client (FileClient): File client to read the image bytes.
+        path (str): Image path (or lmdb key).
+        region (tuple[int]): (top, left, height, width) of the region.
+        client_key (str): Client key of the file client. Default: 'default'.
+        image_cache (SharedImageCache | None): Decoded-image cache. Default: None.
+
+    Returns:
+        ndarray: Image region with order HWC, BGR, range [0, 1], float32.
+    """
+    top, left, height, width = region
+    if getattr(file_client, 'backend', None) == 'memmap':
+        img = file_client.get(path, client_key)
+    elif path.endswith('.npy'):
+        img = np.load(path, mmap_mode='r')
+        if img.ndim == 2:
+            img = img[..., None]
+    else:
+        img = read_image(file_client, path, client_key, image_cache)
+        return img[top:top + height, left:left + width]
+    # only the region is copied
+    return img[top:top + height, left:left + width].astype(np.float32) / 255.
@@ -1,9 +1,15 @@
+import numpy as np
+import random
+from os import path as osp
+from PIL import Image
 from torch.utils import data as data
 from torchvision.transforms.functional import normalize
 
-from basicsr.data.data_util import paired_paths_from_folder, paired_paths_from_lmdb, paired_paths_from_meta_info_file
+from basicsr.data.data_util import (generate_subimage_index, paired_paths_from_folder, paired_paths_from_lmdb,
+                                    paired_paths_from_meta_info_file)
+from basicsr.data.image_cache import build_image_cache, read_image, read_image_region
 from basicsr.data.transforms import augment, paired_random_crop
-from basicsr.utils import FileClient, bgr2ycbcr, imfrombytes, img2tensor
+from basicsr.utils import FileClient, bgr2ycbcr, img2tensor
 from basicsr.utils.registry import DATASET_REGISTRY
 
 
@@ -16,7 +22,7 @@ class PairedImageDataset(data.Dataset):
 
     There are three modes:
 
-    1. **lmdb**: Use lmdb files. If opt['io_backend'] == lmdb.
+    1. **lmdb**: Use lmdb files (or memmap shards). If opt['io_backend'] == lmdb (or memmap).
     2. **meta_info_file**: Use meta information file to generate paths. \
         If opt['io_backend'] != lmdb and opt['meta_info_file'] is not None.
     3. **folder**: Scan folders to generate paths. The rest.
@@ -34,6 +40,14 @@ class PairedImageDataset(data.Dataset):
         use_rot (bool): Use rotation (use vertical flip and transposing h and w for implementation).
         scale (bool): Scale, which will be added automatically.
         phase (str): 'train' or 'val'.
+        image_cache (dict): Optional. Cache decoded images in shared memory across workers and epochs. It contains
+            max_size_mb (int), cache_dir (str) and low_watermark (float). See :class:`SharedImageCache`.
+        sub_images (dict): Optional. Use the overlapped sub-images of the full images as samples, as
+            `scripts/data_preparation/extract_subimages.py` does, without extracting them to disk. It contains
+            crop_size (int), step (int) and thresh_size (int, default 0), all for gt. During training, only the
+            randomly cropped patch is read. Images stored as uint8 .npy files (see
+            `scripts/data_preparation/convert_to_npy.py`) or in memmap shards (io_backend memmap, see
+            `scripts/data_preparation/create_memmap.py`) are memory-mapped, so that nothing is decoded.
     """
 
     def __init__(self, opt):
@@ -51,7 +65,7 @@ class PairedImageDataset(data.Dataset):
         else:
             self.filename_tmpl = '{}'
 
-        if self.io_backend_opt['type'] == 'lmdb':
+        if self.io_backend_opt['type'] in ('lmdb', 'memmap'):
             self.io_backend_opt['db_paths'] = [self.lq_folder, self.gt_folder]
             self.io_backend_opt['client_keys'] = ['lq', 'gt']
             self.paths = paired_paths_from_lmdb([self.lq_folder, self.gt_folder], ['lq', 'gt'])
@@ -61,21 +75,56 @@ class PairedImageDataset(data.Dataset):
         else:
             self.paths = paired_paths_from_folder([self.lq_folder, self.gt_folder], ['lq', 'gt'], self.filename_tmpl)
 
+        self.image_cache = build_image_cache(opt.get('image_cache'))
+
+        # index of (image index, top, left) of the sub-images (gt coordinates)
+        self.crop_index = None
+        if opt.get('sub_images') is not None:
+            sub_opt = opt['sub_images']
+            if sub_opt['crop_size'] % opt['scale'] != 0:
+                raise ValueError(f"sub_images crop_size {sub_opt['crop_size']} should be divisible by the scale.")
+            if opt['phase'] == 'train' and opt['gt_size'] > sub_opt['crop_size']:
+                raise ValueError(f"gt_size {opt['gt_size']} should not be larger than the sub_images crop_size "
+                                 f"{sub_opt['crop_size']}.")
+            self.crop_index = generate_subimage_index(self._get_gt_shapes(), sub_opt['crop_size'], sub_opt['step'],
+                                                      sub_opt.get('thresh_size', 0))
+
+    def _get_gt_shapes(self):
+        """Get the gt image shapes (h, w) without decoding the images."""
+        if self.io_backend_opt['type'] in ('lmdb', 'memmap'):
+            # meta_info.txt of lmdb (and memmap) records: name.png (h,w,c) compress_level ...
+            shapes = {}
+            with open(osp.join(self.gt_folder, 'meta_info.txt')) as fin:
+                for line in fin:
+                    name, shape = line.split(' ')[0:2]
+                    shapes[osp.splitext(name)[0]] = tuple(int(v) for v in shape[1:-1].split(','))
+            return [shapes[path['gt_path']] for path in self.paths]
+        shapes = []
+        for path in self.paths:
+            gt_path = path['gt_path']
+            if gt_path.endswith('.npy'):
+                shapes.append(np.load(gt_path, mmap_mode='r').shape)
+            else:
+                with Image.open(gt_path) as img:  # only the header is read
+                    shapes.append(img.size[::-1])
+        return shapes
+
     def __getitem__(self, index):
         if self.file_client is None:
             self.file_client = FileClient(self.io_backend_opt.pop('type'), **self.io_backend_opt)
 
         scale = self.opt['scale']
 
+        if self.crop_index is not None:
+            return self._get_sub_image(index)
+
         # Load gt and lq images. Dimension order: HWC; channel order: BGR;
         # image range: [0, 1], float32.
         # 加载gt和lq图像。维度顺序：HWC；通道顺序：BGR；
         gt_path = self.paths[index]['gt_path']
-        img_bytes = self.file_client.get(gt_path, 'gt')
-        img_gt = imfrombytes(img_bytes, float32=True)
+        img_gt = read_image(self.file_client, gt_path, 'gt', self.image_cache)
         lq_path = self.paths[index]['lq_path']
-        img_bytes = self.file_client.get(lq_path, 'lq')
-        img_lq = imfrombytes(img_bytes, float32=True)
+        img_lq = read_image(self.file_client, lq_path, 'lq', self.image_cache)
 
         # augmentation for training
         # 开始增强训练
@@ -96,6 +145,39 @@ class PairedImageDataset(data.Dataset):
         if self.opt['phase'] != 'train':
             img_gt = img_gt[0:img_lq.shape[0] * scale, 0:img_lq.shape[1] * scale, :]
 
+        return self._to_tensor(img_gt, img_lq, gt_path, lq_path)
+
+    def _get_sub_image(self, index):
+        """Get a sub-image of the crop index. During training, only the random patch is read."""
+        scale = self.opt['scale']
+        path_idx, top, left = self.crop_index[index]
+        # align to the lq pixel grid
+        top, left = top // scale * scale, left // scale * scale
+        gt_path = self.paths[path_idx]['gt_path']
+        lq_path = self.paths[path_idx]['lq_path']
+
+        size = self.opt['sub_images']['crop_size']
+        if self.opt['phase'] == 'train':
+            # the same random crop as paired_random_crop on the sub-image
+            lq_size = self.opt['gt_size'] // scale
+            top += random.randint(0, size // scale - lq_size) * scale
+            left += random.randint(0, size // scale - lq_size) * scale
+            size = self.opt['gt_size']
+        img_gt = read_image_region(self.file_client, gt_path, (top, left, size, size), 'gt', self.image_cache)
+        img_lq = read_image_region(self.file_client, lq_path,
+                                   (top // scale, left // scale, size // scale, size // scale), 'lq', self.image_cache)
+        if self.opt['phase'] == 'train':
+            # flip, rotation
+            img_gt, img_lq = augment([img_gt, img_lq], self.opt['use_hflip'], self.opt['use_rot'])
+
+        # color space transform
+        if 'color' in self.opt and self.opt['color'] == 'y':
+            img_gt = bgr2ycbcr(img_gt, y_only=True)[..., None]
+            img_lq = bgr2ycbcr(img_lq, y_only=True)[..., None]
+
+        return self._to_tensor(img_gt, img_lq, gt_path, lq_path)
+
+    def _to_tensor(self, img_gt, img_lq, gt_path, lq_path):
         # BGR to RGB, HWC to CHW, numpy to tensor
         img_gt, img_lq = img2tensor([img_gt, img_lq], bgr2rgb=True, float32=True)
         # normalize
@@ -106,4 +188,6 @@ class PairedImageDataset(data.Dataset):
         return {'lq': img_lq, 'gt': img_gt, 'lq_path': lq_path, 'gt_path': gt_path}
 
     def __len__(self):
+        if self.crop_index is not None:
+            return len(self.crop_index)
         return len(self.paths)
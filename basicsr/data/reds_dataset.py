@@ -121,46 +121,32 @@ class REDSDataset(data.Dataset):
 
         assert len(neighbor_list) == self.num_frame, (f'Wrong length of neighbor list: {len(neighbor_list)}')
 
-        # get the GT frame (as the center frame)
+        # paths of the GT frame (as the center frame) and the neighboring LQ frames
         if self.is_lmdb:
             img_gt_path = f'{clip_name}/{frame_name}'
+            img_lq_paths = [f'{clip_name}/{neighbor:08d}' for neighbor in neighbor_list]
         else:
             img_gt_path = self.gt_root / clip_name / f'{frame_name}.png'
-        img_bytes = self.file_client.get(img_gt_path, 'gt')
-        img_gt = imfrombytes(img_bytes, float32=True)
-
-        # get the neighboring LQ frames
-        img_lqs = []
-        for neighbor in neighbor_list:
+            img_lq_paths = [self.lq_root / clip_name / f'{neighbor:08d}.png' for neighbor in neighbor_list]
+        # paths of the previous and next flows
+        if self.flow_root is not None:
+            flow_names = [f'{frame_name}_p{i}' for i in range(self.num_half_frames, 0, -1)]
+            flow_names += [f'{frame_name}_n{i}' for i in range(1, self.num_half_frames + 1)]
             if self.is_lmdb:
-                img_lq_path = f'{clip_name}/{neighbor:08d}'
+                flow_paths = [f'{clip_name}/{name}' for name in flow_names]
             else:
-                img_lq_path = self.lq_root / clip_name / f'{neighbor:08d}.png'
-            img_bytes = self.file_client.get(img_lq_path, 'lq')
-            img_lq = imfrombytes(img_bytes, float32=True)
-            img_lqs.append(img_lq)
+                flow_paths = [self.flow_root / clip_name / f'{name}.png' for name in flow_names]
+            # read the flows in the background (if prefetch is enabled) while the frames are decoded
+            self.file_client.prefetch(flow_paths, 'flow')
+        self.file_client.prefetch(img_lq_paths, 'lq')
+
+        img_gt = imfrombytes(self.file_client.get(img_gt_path, 'gt'), float32=True)
+        img_lqs = [imfrombytes(v, float32=True) for v in self.file_client.get_many(img_lq_paths, 'lq')]
 
         # get flows
         if self.flow_root is not None:
             img_flows = []
-            # read previous flows
-            for i in range(self.num_half_frames, 0, -1):
-                if self.is_lmdb:
-                    flow_path = f'{clip_name}/{frame_name}_p{i}'
-                else:
-                    flow_path = (self.flow_root / clip_name / f'{frame_name}_p{i}.png')
-                img_bytes = self.file_client.get(flow_path, 'flow')
-                cat_flow = imfrombytes(img_bytes, flag='grayscale', float32=False)  # uint8, [0, 255]
-                dx, dy = np.split(cat_flow, 2, axis=0)
-                flow = dequantize_flow(dx, dy, max_val=20, denorm=False)  # we use max_val 20 here.
-                img_flows.append(flow)
-            # read next flows
-            for i in range(1, self.num_half_frames + 1):
-                if self.is_lmdb:
-                    flow_path = f'{clip_name}/{frame_name}_n{i}'
-                else:
-                    flow_path = (self.flow_root / clip_name / f'{frame_name}_n{i}.png')
-                img_bytes = self.file_client.get(flow_path, 'flow')
+            for img_bytes in self.file_client.get_many(flow_paths, 'flow'):
                 cat_flow = imfrombytes(img_bytes, flag='grayscale', float32=False)  # uint8, [0, 255]
                 dx, dy = np.split(cat_flow, 2, axis=0)
                 flow = dequantize_flow(dx, dy, max_val=20, denorm=False)  # we use max_val 20 here.
@@ -312,25 +298,17 @@ class REDSRecurrentDataset(data.Dataset):
             neighbor_list.reverse()
 
         # get the neighboring LQ and GT frames
-        img_lqs = []
-        img_gts = []
-        for neighbor in neighbor_list:
-            if self.is_lmdb:
-                img_lq_path = f'{clip_name}/{neighbor:08d}'
-                img_gt_path = f'{clip_name}/{neighbor:08d}'
-            else:
-                img_lq_path = self.lq_root / clip_name / f'{neighbor:08d}.png'
-                img_gt_path = self.gt_root / clip_name / f'{neighbor:08d}.png'
-
-            # get LQ
-            img_bytes = self.file_client.get(img_lq_path, 'lq')
-            img_lq = imfrombytes(img_bytes, float32=True)
-            img_lqs.append(img_lq)
-
-            # get GT
-            img_bytes = self.file_client.get(img_gt_path, 'gt')
-            img_gt = imfrombytes(img_bytes, float32=True)
-            img_gts.append(img_gt)
+        if self.is_lmdb:
+            img_lq_paths = [f'{clip_name}/{neighbor:08d}' for neighbor in neighbor_list]
+            img_gt_paths = [f'{clip_name}/{neighbor:08d}' for neighbor in neighbor_list]
+        else:
+            img_lq_paths = [self.lq_root / clip_name / f'{neighbor:08d}.png' for neighbor in neighbor_list]
+            img_gt_paths = [self.gt_root / clip_name / f'{neighbor:08d}.png' for neighbor in neighbor_list]
+        img_gt_path = img_gt_paths[-1]
+        # read the GT frames in the background (if prefetch is enabled) while the LQ frames are decoded
+        self.file_client.prefetch(img_gt_paths, 'gt')
+        img_lqs = [imfrombytes(v, float32=True) for v in self.file_client.get_many(img_lq_paths, 'lq')]
+        img_gts = [imfrombytes(v, float32=True) for v in self.file_client.get_many(img_gt_paths, 'gt')]
 
         # randomly crop
         img_gts, img_lqs = paired_random_crop(img_gts, img_lqs, gt_size, scale, img_gt_path)
@@ -3,7 +3,8 @@ from torch.utils import data as data
 from torchvision.transforms.functional import normalize
 
 from basicsr.data.data_util import paths_from_lmdb
-from basicsr.utils import FileClient, imfrombytes, img2tensor, rgb2ycbcr, scandir
+from basicsr.data.image_cache import build_image_cache, read_image
+from basicsr.utils import FileClient, img2tensor, rgb2ycbcr, scandir
 from basicsr.utils.registry import DATASET_REGISTRY
 
 
@@ -22,6 +23,7 @@ class SingleImageDataset(data.Dataset):
             dataroot_lq (str): Data root path for lq.
             meta_info_file (str): Path for meta information file.
             io_backend (dict): IO backend type and other kwarg.
+            image_cache (dict): Optional. Cache decoded images in shared memory. See :class:`SharedImageCache`.
     """
 
     def __init__(self, opt):
@@ -34,7 +36,7 @@ class SingleImageDataset(data.Dataset):
         self.std = opt['std'] if 'std' in opt else None
         self.lq_folder = opt['dataroot_lq']
 
-        if self.io_backend_opt['type'] == 'lmdb':
+        if self.io_backend_opt['type'] in ('lmdb', 'memmap'):
             self.io_backend_opt['db_paths'] = [self.lq_folder]
             self.io_backend_opt['client_keys'] = ['lq']
             self.paths = paths_from_lmdb(self.lq_folder)
@@ -44,14 +46,15 @@ class SingleImageDataset(data.Dataset):
         else:
             self.paths = sorted(list(scandir(self.lq_folder, full_path=True)))
 
+        self.image_cache = build_image_cache(opt.get('image_cache'))
+
     def __getitem__(self, index):
         if self.file_client is None:
             self.file_client = FileClient(self.io_backend_opt.pop('type'), **self.io_backend_opt)
 
         # load lq image
         lq_path = self.paths[index]
-        img_bytes = self.file_client.get(lq_path, 'lq')
-        img_lq = imfrombytes(img_bytes, float32=True)
+        img_lq = read_image(self.file_client, lq_path, 'lq', self.image_cache)
 
         # color space transform
         if 'color' in self.opt and self.opt['color'] == 'y':
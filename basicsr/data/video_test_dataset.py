@@ -3,7 +3,7 @@ import torch
 from os import path as osp
 from torch.utils import data as data
 
-from basicsr.data.data_util import duf_downsample, generate_frame_indices, read_img_seq
+from basicsr.data.data_util import FrameWindowCache, duf_downsample, generate_frame_indices, read_img_seq
 from basicsr.utils import get_root_logger, scandir
 from basicsr.utils.registry import DATASET_REGISTRY
 
@@ -36,6 +36,8 @@ class VideoTestDataset(data.Dataset):
         dataroot_lq (str): Data root path for lq.
         io_backend (dict): IO backend type and other kwarg.
         cache_data (bool): Whether to cache testing datasets.
+        window_cache (bool): If cache_data is False, keep a ring buffer of recently decoded lq frames so that each
+            frame is decoded once per pass. Default: True.
         name (str): Dataset name.
         meta_info_file (str): The path to the file storing the list of test folders. If not provided, all the folders
             in the dataroot will be used.
@@ -99,6 +101,10 @@ class VideoTestDataset(data.Dataset):
         else:
             raise ValueError(f'Non-supported video test dataset: {type(opt["name"])}')
 
+        self.frame_cache = None
+        if not self.cache_data and opt.get('window_cache', True):
+            self.frame_cache = FrameWindowCache(2 * opt['num_frame'])
+
     def __getitem__(self, index):
         folder = self.data_info['folder'][index]
         idx, max_idx = self.data_info['idx'][index].split('/')
@@ -111,6 +117,10 @@ class VideoTestDataset(data.Dataset):
         if self.cache_data:
             imgs_lq = self.imgs_lq[folder].index_select(0, torch.LongTensor(select_idx))
             img_gt = self.imgs_gt[folder][idx]
+        elif self.frame_cache is not None:
+            imgs_lq = self.frame_cache.get(folder, self.imgs_lq[folder], select_idx)
+            img_gt = read_img_seq([self.imgs_gt[folder][idx]])
+            img_gt.squeeze_(0)
         else:
             img_paths_lq = [self.imgs_lq[folder][i] for i in select_idx]
             imgs_lq = read_img_seq(img_paths_lq)
@@ -232,6 +242,8 @@ class VideoTestDUFDataset(VideoTestDataset):
                 # read imgs_gt to generate low-resolution frames
                 imgs_lq = read_img_seq(img_paths_lq, require_mod_crop=True, scale=self.opt['scale'])
                 imgs_lq = duf_downsample(imgs_lq, kernel_size=13, scale=self.opt['scale'])
+            elif self.frame_cache is not None:
+                imgs_lq = self.frame_cache.get(folder, self.imgs_lq[folder], select_idx)
             else:
                 img_paths_lq = [self.imgs_lq[folder][i] for i in select_idx]
                 imgs_lq = read_img_seq(img_paths_lq)
@@ -95,24 +95,17 @@ class Vimeo90KDataset(data.Dataset):
         key = self.keys[index]
         clip, seq = key.split('/')  # key example: 00001/0001
 
-        # get the GT frame (im4.png)
+        # paths of the GT frame (im4.png) and the neighboring LQ frames
         if self.is_lmdb:
             img_gt_path = f'{key}/im4'
+            img_lq_paths = [f'{clip}/{seq}/im{neighbor}' for neighbor in self.neighbor_list]
         else:
             img_gt_path = self.gt_root / clip / seq / 'im4.png'
-        img_bytes = self.file_client.get(img_gt_path, 'gt')
-        img_gt = imfrombytes(img_bytes, float32=True)
-
-        # get the neighboring LQ frames
-        img_lqs = []
-        for neighbor in self.neighbor_list:
-            if self.is_lmdb:
-                img_lq_path = f'{clip}/{seq}/im{neighbor}'
-            else:
-                img_lq_path = self.lq_root / clip / seq / f'im{neighbor}.png'
-            img_bytes = self.file_client.get(img_lq_path, 'lq')
-            img_lq = imfrombytes(img_bytes, float32=True)
-            img_lqs.append(img_lq)
+            img_lq_paths = [self.lq_root / clip / seq / f'im{neighbor}.png' for neighbor in self.neighbor_list]
+        # read the LQ frames in the background (if prefetch is enabled) while the GT frame is decoded
+        self.file_client.prefetch(img_lq_paths, 'lq')
+        img_gt = imfrombytes(self.file_client.get(img_gt_path, 'gt'), float32=True)
+        img_lqs = [imfrombytes(v, float32=True) for v in self.file_client.get_many(img_lq_paths, 'lq')]
 
         # randomly crop
         img_gt, img_lqs = paired_random_crop(img_gt, img_lqs, gt_size, scale, img_gt_path)
@@ -157,24 +150,17 @@ class Vimeo90KRecurrentDataset(Vimeo90KDataset):
         clip, seq = key.split('/')  # key example: 00001/0001
 
         # get the neighboring LQ and  GT frames
-        img_lqs = []
-        img_gts = []
-        for neighbor in self.neighbor_list:
-            if self.is_lmdb:
-                img_lq_path = f'{clip}/{seq}/im{neighbor}'
-                img_gt_path = f'{clip}/{seq}/im{neighbor}'
-            else:
-                img_lq_path = self.lq_root / clip / seq / f'im{neighbor}.png'
-                img_gt_path = self.gt_root / clip / seq / f'im{neighbor}.png'
-            # LQ
-            img_bytes = self.file_client.get(img_lq_path, 'lq')
-            img_lq = imfrombytes(img_bytes, float32=True)
-            # GT
-            img_bytes = self.file_client.get(img_gt_path, 'gt')
-            img_gt = imfrombytes(img_bytes, float32=True)
-
-            img_lqs.append(img_lq)
-            img_gts.append(img_gt)
+        if self.is_lmdb:
+            img_lq_paths = [f'{clip}/{seq}/im{neighbor}' for neighbor in self.neighbor_list]
+            img_gt_paths = [f'{clip}/{seq}/im{neighbor}' for neighbor in self.neighbor_list]
+        else:
+            img_lq_paths = [self.lq_root / clip / seq / f'im{neighbor}.png' for neighbor in self.neighbor_list]
+            img_gt_paths = [self.gt_root / clip / seq / f'im{neighbor}.png' for neighbor in self.neighbor_list]
+        img_gt_path = img_gt_paths[-1]
+        # read the GT frames in the background (if prefetch is enabled) while the LQ frames are decoded
+        self.file_client.prefetch(img_gt_paths, 'gt')
+        img_lqs = [imfrombytes(v, float32=True) for v in self.file_client.get_many(img_lq_paths, 'lq')]
+        img_gts = [imfrombytes(v, float32=True) for v in self.file_client.get_many(img_gt_paths, 'gt')]
 
         # randomly crop
         img_gts, img_lqs = paired_random_crop(img_gts, img_lqs, gt_size, scale, img_gt_path)
@@ -1,20 +1,68 @@
+import os
+import torch
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 
+from basicsr.utils import tensor2img
 from basicsr.utils.registry import METRIC_REGISTRY
+from .metric_util import batched_metric
 from .niqe import calculate_niqe
 from .psnr_ssim import calculate_psnr, calculate_ssim
 
-__all__ = ['calculate_psnr', 'calculate_ssim', 'calculate_niqe']
+__all__ = ['calculate_psnr', 'calculate_ssim', 'calculate_niqe', 'batched_metric']
+
+# number of threads for metrics without a batched version
+_NUM_METRIC_THREADS = min(8, os.cpu_count() or 1)
 
 
 def calculate_metric(data, opt):
     """Calculate metric from data and options.
 
+    If ``data['img']`` is a Tensor with shape (n, c, h, w) (range [0, 1], RGB
+    order, on any device), the metric is calculated for the whole batch and a
+    Tensor with shape (n, ) is returned. The metric is resolved as follows:
+
+    1. A metric marked by :func:`batched_metric` is called on the batch.
+    2. Otherwise, its batched version ``{type}_pt`` is used if registered.
+    3. Otherwise, the images are converted by :func:`tensor2img` and the
+       metric is mapped over them with a thread pool.
+
     Args:
+        data (dict): Inputs of the metric, e.g., 'img' and 'img2'.
         opt (dict): Configuration. It must contain:
-            type (str): Model type.
+            type (str): Metric type.
+
+    Returns:
+        float | Tensor: Metric result. A Tensor with shape (n, ) for batched inputs.
     """
     opt = deepcopy(opt)
     metric_type = opt.pop('type')
+    img = data.get('img')
+    if isinstance(img, torch.Tensor) and img.dim() == 4:
+        return _calculate_metric_batch(data, metric_type, opt)
     metric = METRIC_REGISTRY.get(metric_type)(**data, **opt)
     return metric
+
+
+def _calculate_metric_batch(data, metric_type, opt):
+    """Calculate a metric for a batch of (n, c, h, w) tensors. It is called by :func:`calculate_metric`."""
+    metric = METRIC_REGISTRY.get(metric_type)
+    if not getattr(metric, 'batched', False) and f'{metric_type}_pt' in METRIC_REGISTRY:
+        metric = METRIC_REGISTRY.get(f'{metric_type}_pt')
+    if getattr(metric, 'batched', False):
+        return metric(**data, **opt)
+
+    # fall back to the numpy metric per image
+    num_imgs = data['img'].size(0)
+    per_image = [{} for _ in range(num_imgs)]
+    for key, value in data.items():
+        if isinstance(value, torch.Tensor) and value.dim() == 4:
+            value = tensor2img(list(value.detach()))
+            value = value if isinstance(value, list) else [value]
+        else:
+            value = [value] * num_imgs
+        for i in range(num_imgs):
+            per_image[i][key] = value[i]
+    with ThreadPoolExecutor(max_workers=min(num_imgs, _NUM_METRIC_THREADS)) as executor:
+        results = list(executor.map(lambda kwargs: metric(**kwargs, **opt), per_image))
+    return torch.tensor(results, dtype=torch.float64)
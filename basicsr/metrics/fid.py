@@ -1,4 +1,7 @@
+import cv2
+import hashlib
 import numpy as np
+import os
 import torch
 import torch.nn as nn
 from scipy import linalg
@@ -47,6 +50,192 @@ def extract_inception_features(data_generator, inception, len_generator=None, de
     return features
 
 
+class FeatureStats():
+    """Running mean and covariance of feature vectors.
+
+    Batches are merged with the parallel form of Welford's algorithm in
+    float64, so the memory does not grow with the number of samples and the
+    results match ``np.mean`` and ``np.cov`` of the concatenated features.
+    The feature dimension is taken from the first batch.
+    """
+
+    def __init__(self):
+        self.num = 0
+        self._mean = None
+        self._m2 = None
+
+    def update(self, features):
+        """Add a batch of features.
+
+        Args:
+            features (ndarray | Tensor): Features with shape (n, c).
+        """
+        if isinstance(features, torch.Tensor):
+            features = features.detach().cpu().numpy()
+        features = np.asarray(features, dtype=np.float64).reshape(len(features), -1)
+        num_batch = features.shape[0]
+        if num_batch == 0:
+            return
+        if self._mean is None:
+            self._mean = np.zeros(features.shape[1], dtype=np.float64)
+            self._m2 = np.zeros((features.shape[1], features.shape[1]), dtype=np.float64)
+        batch_mean = features.mean(0)
+        centered = features - batch_mean
+        num_total = self.num + num_batch
+        delta = batch_mean - self._mean
+        self._m2 += centered.T @ centered + np.outer(delta, delta) * (self.num * num_batch / num_total)
+        self._mean += delta * (num_batch / num_total)
+        self.num = num_total
+
+    @property
+    def mean(self):
+        return self._mean.copy()
+
+    @property
+    def cov(self):
+        """Unbiased covariance, the same as ``np.cov(features, rowvar=False)``."""
+        return self._m2 / max(self.num - 1, 1)
+
+
+@torch.no_grad()
+def extract_inception_stats(data_generator, inception, len_generator=None, device='cuda', num_sample=None):
+    """Extract the mean and covariance of inception features.
+
+    Unlike :func:`extract_inception_features`, the features are accumulated in
+    :class:`FeatureStats` and not kept in memory.
+
+    Args:
+        data_generator (generator): A data generator.
+        inception (nn.Module): Inception model.
+        len_generator (int): Length of the data_generator to show the
+            progressbar. Default: None.
+        device (str): Device. Default: cuda.
+        num_sample (int | None): Use the first ``num_sample`` samples. None for
+            all. Default: None.
+
+    Returns:
+        FeatureStats: Feature statistics.
+    """
+    stats = FeatureStats()
+    pbar = tqdm(total=len_generator, unit='batch', desc='Extract') if len_generator is not None else None
+    for data in data_generator:
+        if pbar:
+            pbar.update(1)
+        if num_sample is not None:
+            data = data[:num_sample - stats.num]
+        data = data.to(device)
+        stats.update(inception(data)[0].view(data.shape[0], -1))
+        if num_sample is not None and stats.num >= num_sample:
+            break
+    if pbar:
+        pbar.close()
+    return stats
+
+
+class InceptionFeatureCache():
+    """On-disk cache of inception features keyed by the content hash of image files.
+
+    The cache is a single npz file with the sha1 hashes and the features. Only
+    new or changed images need to be passed through the inception model when a
+    folder is scored again. The features depend on the preprocessing and the
+    inception model, so use one cache file per setting.
+
+    Args:
+        cache_path (str): Path to the npz file. It is created if missing.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.features = {}
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                self.features = dict(zip(data['keys'].tolist(), data['features']))
+        self.num_new = 0
+
+    @staticmethod
+    def hash_bytes(content):
+        return hashlib.sha1(content).hexdigest()
+
+    def get(self, key):
+        return self.features.get(key)
+
+    def put(self, key, feature):
+        self.features[key] = np.asarray(feature, dtype=np.float32)
+        self.num_new += 1
+
+    def save(self):
+        """Save the cache if there are new features. It is written to a temporary file first."""
+        if self.num_new == 0:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp.npz'
+        keys = list(self.features.keys())
+        np.savez(tmp_path, keys=np.array(keys), features=np.stack([self.features[key] for key in keys]))
+        os.replace(tmp_path, self.cache_path)
+
+
+@torch.no_grad()
+def extract_inception_stats_from_paths(img_paths, inception, cache=None, batch_size=64, device='cuda'):
+    """Extract the inception feature statistics of image files with a feature cache.
+
+    Each file is read once, hashed and only decoded if its features are not in
+    the cache. Images are normalized to [-1, 1] in RGB order, the same as
+    SingleImageDataset with ``mean = std = [0.5, 0.5, 0.5]``. Consecutive
+    images with the same shape are batched. The statistics do not depend on
+    the order of the samples, so cached and new features are accumulated
+    separately.
+
+    Args:
+        img_paths (list[str]): Image paths.
+        inception (nn.Module): Inception model.
+        cache (InceptionFeatureCache | None): Feature cache. It is saved at the
+            end. Default: None.
+        batch_size (int): Batch size of the inception model. Default: 64.
+        device (str): Device. Default: cuda.
+
+    Returns:
+        FeatureStats: Feature statistics.
+    """
+    stats = FeatureStats()
+    batch_keys, batch_imgs, cached = [], [], []
+
+    def _flush():
+        if batch_imgs:
+            data = torch.from_numpy(np.stack(batch_imgs)).to(device)
+            features = inception(data)[0].view(data.shape[0], -1).cpu().numpy()
+            stats.update(features)
+            if cache is not None:
+                for key, feature in zip(batch_keys, features):
+                    cache.put(key, feature)
+            batch_keys.clear()
+            batch_imgs.clear()
+
+    for path in tqdm(img_paths, unit='image', desc='Extract'):
+        with open(path, 'rb') as f:
+            content = f.read()
+        key = InceptionFeatureCache.hash_bytes(content)
+        feature = cache.get(key) if cache is not None else None
+        if feature is not None:
+            cached.append(feature)
+            if len(cached) >= batch_size:
+                stats.update(np.stack(cached))
+                cached.clear()
+            continue
+
+        img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32).transpose(2, 0, 1) / 127.5 - 1
+        if batch_imgs and (img.shape != batch_imgs[0].shape or len(batch_imgs) >= batch_size):
+            _flush()
+        batch_keys.append(key)
+        batch_imgs.append(img)
+    _flush()
+    if cached:
+        stats.update(np.stack(cached))
+    if cache is not None:
+        cache.save()
+    return stats
+
+
 def calculate_fid(mu1, sigma1, mu2, sigma2, eps=1e-6):
     """Numpy implementation of the Frechet Distance.
 
@@ -0,0 +1,256 @@
+import csv
+import cv2
+import json
+import numpy as np
+import os
+import warnings
+from collections import deque
+from multiprocessing import Pool
+from os import path as osp
+
+from basicsr.utils import bgr2ycbcr
+from .niqe import calculate_niqe
+from .psnr_ssim import calculate_psnr, calculate_ssim
+
+_PAIR_METRICS = ('psnr', 'ssim')
+_NR_METRICS = ('niqe', )
+
+
+def _correct_mean_var(img, img_ref):
+    """Correct the per-channel mean and std of an image to those of a reference image.
+
+    The correction is applied twice, as in the original evaluation codes.
+
+    Args:
+        img (ndarray): Image to be corrected, shape (h, w, c), float32. It is modified in place.
+        img_ref (ndarray): Reference image, shape (h, w, c).
+
+    Returns:
+        ndarray: Corrected image.
+    """
+    for j in range(img_ref.shape[2]):
+        mean_ref, std_ref = np.mean(img_ref[:, :, j]), np.std(img_ref[:, :, j])
+        for _ in range(2):
+            img[:, :, j] = img[:, :, j] - np.mean(img[:, :, j]) + mean_ref
+            img[:, :, j] = img[:, :, j] / np.std(img[:, :, j]) * std_ref
+    return img
+
+
+def score_image_pair(gt_path,
+                     restored_path,
+                     metrics=('psnr', 'ssim'),
+                     crop_border=0,
+                     test_y_channel=False,
+                     correct_mean_var=False,
+                     return_imgs=False):
+    """Decode an image pair once and calculate all the requested metrics.
+
+    Args:
+        gt_path (str | None): Path to the gt image. It can be None if only
+            no-reference metrics (NIQE) are calculated.
+        restored_path (str): Path to the restored image.
+        metrics (tuple[str]): Metrics among 'psnr', 'ssim' and 'niqe'. NIQE is
+            calculated on the restored image only. Default: ('psnr', 'ssim').
+        crop_border (int): Cropped pixels in each edge of an image. Default: 0.
+        test_y_channel (bool): Test PSNR/SSIM on Y channel of YCbCr. Default: False.
+        correct_mean_var (bool): Correct the mean and var of the restored
+            image to those of the gt image. Default: False.
+        return_imgs (bool): Also return the decoded uint8 images, e.g., for
+            LPIPS in the main process. Default: False.
+
+    Returns:
+        dict: Metric results.
+        tuple[ndarray] | None: The decoded gt and restored images if
+            ``return_imgs`` is True.
+    """
+    if gt_path is None and (return_imgs or any(name in _PAIR_METRICS for name in metrics)):
+        raise ValueError(f'The gt image is required for the metrics {metrics}.')
+    img_gt_uint8 = cv2.imread(gt_path, cv2.IMREAD_UNCHANGED) if gt_path is not None else None
+    img_restored_uint8 = cv2.imread(restored_path, cv2.IMREAD_UNCHANGED)
+    if (gt_path is not None and img_gt_uint8 is None) or img_restored_uint8 is None:
+        raise IOError(f'Cannot read the image pair {gt_path}, {restored_path}.')
+
+    results = {}
+    if any(name in _PAIR_METRICS for name in metrics):
+        img_gt = img_gt_uint8.astype(np.float32) / 255.
+        img_restored = img_restored_uint8.astype(np.float32) / 255.
+        if correct_mean_var:
+            img_restored = _correct_mean_var(img_restored, img_gt)
+        if test_y_channel and img_gt.ndim == 3 and img_gt.shape[2] == 3:
+            img_gt = bgr2ycbcr(img_gt, y_only=True)
+            img_restored = bgr2ycbcr(img_restored, y_only=True)
+        if 'psnr' in metrics:
+            results['psnr'] = calculate_psnr(img_gt * 255, img_restored * 255, crop_border, input_order='HWC')
+        if 'ssim' in metrics:
+            results['ssim'] = calculate_ssim(img_gt * 255, img_restored * 255, crop_border, input_order='HWC')
+    if 'niqe' in metrics:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            results['niqe'] = calculate_niqe(img_restored_uint8, crop_border, input_order='HWC', convert_to='y')
+    return results, (img_gt_uint8, img_restored_uint8) if return_imgs else None
+
+
+def _score_worker(args):
+    """Worker for each process. It unpacks the arguments of score_image_pair."""
+    return score_image_pair(*args)
+
+
+def load_metric_results(result_path):
+    """Load the per-image results written by :func:`score_folder`.
+
+    An unfinished last line, e.g., from an interrupted run, is dropped and the
+    file is truncated to the complete lines, so that new results can be
+    appended.
+
+    Args:
+        result_path (str): Path to the result file, ending with '.csv' or '.jsonl'.
+
+    Returns:
+        list[dict]: Results with the key 'name' and one key per metric.
+    """
+    if not osp.exists(result_path):
+        return []
+    with open(result_path, 'r', newline='') as f:
+        lines = f.readlines()
+    if lines and not lines[-1].endswith('\n'):
+        lines = lines[:-1]
+
+    rows = []
+    if result_path.endswith('.csv'):
+        if lines:
+            for row in csv.DictReader(lines):
+                rows.append({k: v if k == 'name' else float(v) for k, v in row.items()})
+    else:
+        rows = [json.loads(line) for line in lines]
+    with open(result_path, 'w', newline='') as f:
+        f.writelines(lines)
+    return rows
+
+
+class _ResultWriter():
+    """Append per-image results to a csv or jsonl file and flush after each line."""
+
+    def __init__(self, result_path, fieldnames):
+        if not result_path.endswith(('.csv', '.jsonl')):
+            raise ValueError(f"result_path must end with '.csv' or '.jsonl', but got {result_path}.")
+        self.is_csv = result_path.endswith('.csv')
+        write_header = self.is_csv and (not osp.exists(result_path) or osp.getsize(result_path) == 0)
+        os.makedirs(osp.dirname(osp.abspath(result_path)), exist_ok=True)
+        self.file = open(result_path, 'a', newline='')
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def score_folder(pairs,
+                 metrics=('psnr', 'ssim'),
+                 crop_border=0,
+                 test_y_channel=False,
+                 correct_mean_var=False,
+                 num_workers=8,
+                 max_pending=None,
+                 result_path=None,
+                 resume=False,
+                 lpips_fn=None,
+                 callback=None):
+    """Score image pairs across a process pool.
+
+    Each pair is decoded once in a worker process, which calculates all the
+    requested metrics. At most ``max_pending`` pairs are submitted but not
+    consumed, so memory does not grow with the number of images. Results are
+    consumed in order and streamed to ``result_path`` line by line, so an
+    interrupted run can be resumed with ``resume=True``.
+
+    LPIPS needs a network, so it is calculated in the calling process with
+    ``lpips_fn`` on the images decoded by the workers.
+
+    Args:
+        pairs (list[tuple[str]]): (name, gt_path, restored_path) of each pair.
+            gt_path can be None for no-reference metrics.
+        metrics (tuple[str]): Metrics among 'psnr', 'ssim', 'niqe' and 'lpips'.
+            Default: ('psnr', 'ssim').
+        crop_border (int): Cropped pixels in each edge of an image. Default: 0.
+        test_y_channel (bool): Test PSNR/SSIM on Y channel of YCbCr. Default: False.
+        correct_mean_var (bool): Correct the mean and var of the restored
+            images. Default: False.
+        num_workers (int): Number of processes. 0 scores in the calling
+            process. Default: 8.
+        max_pending (int | None): Max number of pairs in flight. None for
+            ``4 * num_workers``. Default: None.
+        result_path (str | None): Path to stream per-image results to, ending
+            with '.csv' or '.jsonl'. Default: None.
+        resume (bool): Skip the pairs already recorded in ``result_path``.
+            Default: False.
+        lpips_fn (callable | None): ``lpips_fn(img_gt, img_restored) -> float``
+            on uint8 BGR images. Required if 'lpips' is in ``metrics``.
+            Default: None.
+        callback (callable | None): ``callback(idx, row)`` called for each new
+            result. Default: None.
+
+    Returns:
+        list[dict]: Results of all the pairs (including resumed ones) in the
+            order of ``pairs``, with the key 'name' and one key per metric.
+    """
+    for name in metrics:
+        if name not in _PAIR_METRICS + _NR_METRICS + ('lpips', ):
+            raise ValueError(f'Unsupported metric {name}.')
+    if 'lpips' in metrics and lpips_fn is None:
+        raise ValueError('lpips_fn is required for the lpips metric.')
+
+    done = {}
+    if result_path is not None:
+        if resume:
+            done = {row['name']: row for row in load_metric_results(result_path)}
+        elif osp.exists(result_path):
+            os.remove(result_path)
+        writer = _ResultWriter(result_path, ['name'] + list(metrics))
+    todo = [(idx, pair) for idx, pair in enumerate(pairs) if pair[0] not in done]
+    worker_metrics = tuple(name for name in metrics if name != 'lpips')
+    return_imgs = 'lpips' in metrics
+
+    def _args(pair):
+        return (pair[1], pair[2], worker_metrics, crop_border, test_y_channel, correct_mean_var, return_imgs)
+
+    def _consume(idx, pair, output):
+        scores, imgs = output
+        row = {'name': pair[0]}
+        for name in metrics:
+            row[name] = float(lpips_fn(*imgs)) if name == 'lpips' else float(scores[name])
+        if result_path is not None:
+            writer.write(row)
+        done[pair[0]] = row
+        if callback is not None:
+            callback(idx, row)
+
+    try:
+        if num_workers == 0:
+            for idx, pair in todo:
+                _consume(idx, pair, score_image_pair(*_args(pair)))
+        else:
+            if max_pending is None:
+                max_pending = 4 * num_workers
+            with Pool(num_workers) as pool:
+                pending = deque()
+                for idx, pair in todo:
+                    if len(pending) >= max_pending:
+                        old_idx, old_pair, result = pending.popleft()
+                        _consume(old_idx, old_pair, result.get())
+                    pending.append((idx, pair, pool.apply_async(_score_worker, (_args(pair), ))))
+                while pending:
+                    idx, pair, result = pending.popleft()
+                    _consume(idx, pair, result.get())
+    finally:
+        if result_path is not None:
+            writer.close()
+    return [done[pair[0]] for pair in pairs]
@@ -43,3 +43,20 @@ def to_y_channel(img):
         img = bgr2ycbcr(img, y_only=True)
         img = img[..., None]
     return img * 255.
+
+
+def batched_metric(func):
+    """Mark a registered metric as batched.
+
+    A batched metric takes Tensors with shape (n, c, h, w), range [0, 1] and
+    RGB order, and returns a Tensor with shape (n, ). :func:`calculate_metric`
+    calls it on whole batches; other metrics are mapped over the images.
+
+    Args:
+        func (callable): Metric function.
+
+    Returns:
+        callable: The same function, with ``batched = True``.
+    """
+    func.batched = True
+    return func
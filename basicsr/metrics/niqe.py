@@ -1,16 +1,34 @@
-from tkinter.messagebox import NO
-import cv2
+import functools
 import math
 import numpy as np
 import os
+import torch
+import torch.nn.functional as F
 from scipy.ndimage import convolve
 from scipy.special import gamma
 
-from basicsr.metrics.metric_util import reorder_image, to_y_channel
+from basicsr.metrics.metric_util import batched_metric, reorder_image, to_y_channel
 from basicsr.utils.matlab_functions import imresize
 from basicsr.utils.registry import METRIC_REGISTRY
 
 
+@functools.lru_cache()
+def _aggd_table():
+    """Lookup table for the AGGD shape parameter.
+
+    Returns:
+        tuple[ndarray]: gam (the candidate alphas), r_gam (the generalized
+            Gaussian ratio of each alpha), beta_factor (sqrt(gamma(1/alpha) /
+            gamma(3/alpha))) and mean_factor (gamma(2/alpha) / gamma(1/alpha)).
+    """
+    gam = np.arange(0.2, 10.001, 0.001)  # len = 9801
+    gam_reciprocal = np.reciprocal(gam)
+    r_gam = np.square(gamma(gam_reciprocal * 2)) / (gamma(gam_reciprocal) * gamma(gam_reciprocal * 3))
+    beta_factor = np.sqrt(gamma(1 / gam) / gamma(3 / gam))
+    mean_factor = gamma(2 / gam) / gamma(1 / gam)
+    return gam, r_gam, beta_factor, mean_factor
+
+
 def estimate_aggd_param(block):
     """Estimate AGGD (Asymmetric Generalized Gaussian Distribution) parameters.
 
@@ -22,9 +40,7 @@ def estimate_aggd_param(block):
             distribution (Estimating the parames in Equation 7 in the paper).
     """
     block = block.flatten()
-    gam = np.arange(0.2, 10.001, 0.001)  # len = 9801
-    gam_reciprocal = np.reciprocal(gam)
-    r_gam = np.square(gamma(gam_reciprocal * 2)) / (gamma(gam_reciprocal) * gamma(gam_reciprocal * 3))
+    gam, r_gam = _aggd_table()[:2]
 
     left_std = np.sqrt(np.mean(block[block < 0]**2))
     right_std = np.sqrt(np.mean(block[block > 0]**2))
@@ -66,6 +82,74 @@ def compute_feature(block):
     return feat
 
 
+def estimate_aggd_param_batch(blocks, chunk_size=1024):
+    """Estimate AGGD parameters of many blocks at once.
+
+    Vectorized version of :func:`estimate_aggd_param`.
+
+    Args:
+        blocks (ndarray): Blocks with shape (n, ...). Each block is flattened.
+        chunk_size (int): Number of blocks matched against the lookup table at
+            a time, to bound the memory. Default: 1024.
+
+    Returns:
+        tuple[ndarray]: Indices into the AGGD lookup table, beta_l and beta_r,
+            each with shape (n, ).
+    """
+    gam, r_gam, beta_factor, _ = _aggd_table()
+    blocks = blocks.reshape(blocks.shape[0], -1)
+    sq = np.square(blocks)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        left_std = np.sqrt(np.where(blocks < 0, sq, 0).sum(axis=1) / (blocks < 0).sum(axis=1))
+        right_std = np.sqrt(np.where(blocks > 0, sq, 0).sum(axis=1) / (blocks > 0).sum(axis=1))
+        gammahat = left_std / right_std
+        rhat = np.square(np.mean(np.abs(blocks), axis=1)) / np.mean(sq, axis=1)
+        rhatnorm = (rhat * (gammahat**3 + 1) * (gammahat + 1)) / ((gammahat**2 + 1)**2)
+
+    position = np.zeros(blocks.shape[0], dtype=np.int64)  # NaN features fall back to the first entry, as np.argmin
+    valid = np.flatnonzero(~np.isnan(rhatnorm))
+    for start in range(0, valid.size, chunk_size):
+        idx = valid[start:start + chunk_size]
+        position[idx] = np.argmin(np.square(r_gam[None] - rhatnorm[idx, None]), axis=1)
+    return position, left_std * beta_factor[position], right_std * beta_factor[position]
+
+
+def compute_feature_batch(blocks):
+    """Compute features of many blocks at once.
+
+    Vectorized version of :func:`compute_feature`.
+
+    Args:
+        blocks (ndarray): Blocks with shape (n, h, w).
+
+    Returns:
+        ndarray: Features with shape (n, 18).
+    """
+    gam, _, _, mean_factor = _aggd_table()
+    position, beta_l, beta_r = estimate_aggd_param_batch(blocks)
+    feat = [gam[position], (beta_l + beta_r) / 2]
+    for shift in [[0, 1], [1, 0], [1, 1], [1, -1]]:
+        shifted_blocks = np.roll(blocks, shift, axis=(1, 2))
+        position, beta_l, beta_r = estimate_aggd_param_batch(blocks * shifted_blocks)
+        # Eq. 8
+        feat.extend([gam[position], (beta_r - beta_l) * mean_factor[position], beta_l, beta_r])
+    return np.stack(feat, axis=1)
+
+
+def _split_blocks(img, num_block_h, num_block_w, block_size_h, block_size_w, scale):
+    """Split an image into blocks ordered as the original (column-major) loop.
+
+    Returns:
+        ndarray: Blocks with shape (num_block_w * num_block_h, bh, bw).
+    """
+    if block_size_h % scale == 0 and block_size_w % scale == 0:
+        bh, bw = block_size_h // scale, block_size_w // scale
+        blocks = img[:num_block_h * bh, :num_block_w * bw].reshape(num_block_h, bh, num_block_w, bw)
+        return blocks.transpose(2, 0, 1, 3).reshape(-1, bh, bw)
+    # blocks are of unequal sizes and cannot be stacked
+    return None
+
+
 def niqe(img, mu_pris_param, cov_pris_param, gaussian_window, block_size_h=96, block_size_w=96):
     """Calculate NIQE (Natural Image Quality Evaluator) metric.
 
@@ -106,29 +190,29 @@ def niqe(img, mu_pris_param, cov_pris_param, gaussian_window, block_size_h=96, b
     if num_block_h == 0 or num_block_w == 0:
         raise ValueError(f"Image size ({h}x{w}) is too small for block size ({block_size_h}x{block_size_w}).")
 
-
     img = img[0:num_block_h * block_size_h, 0:num_block_w * block_size_w]
 
     distparam = []  # dist param is actually the multiscale features
     for scale in (1, 2):  # perform on two scales (1, 2)
+        # in float64 as MATLAB; in float32, the AGGD shape (a lookup with the step of 0.001) is not stable
+        img = img.astype(np.float64)
         mu = convolve(img, gaussian_window, mode='nearest')
         sigma = np.sqrt(np.abs(convolve(np.square(img), gaussian_window, mode='nearest') - np.square(mu)))
         # normalize, as in Eq. 1 in the paper
         img_nomalized = (img - mu) / (sigma + 1)
 
-        feat = []
-        for idx_w in range(num_block_w):
-            for idx_h in range(num_block_h):
-                # process ecah block
-                block = img_nomalized[idx_h * block_size_h // scale:(idx_h + 1) * block_size_h // scale,
-                                      idx_w * block_size_w // scale:(idx_w + 1) * block_size_w // scale]
-                feat.append(compute_feature(block))
-
-        distparam.append(np.array(feat))
-
-        # if scale == 1:
-        #     img = imresize(img / 255., scale=0.5, antialiasing=True)
-        #     img = img * 255.
+        blocks = _split_blocks(img_nomalized, num_block_h, num_block_w, block_size_h, block_size_w, scale)
+        if blocks is not None:
+            distparam.append(compute_feature_batch(blocks))
+        else:
+            feat = []
+            for idx_w in range(num_block_w):
+                for idx_h in range(num_block_h):
+                    # process ecah block
+                    block = img_nomalized[idx_h * block_size_h // scale:(idx_h + 1) * block_size_h // scale,
+                                          idx_w * block_size_w // scale:(idx_w + 1) * block_size_w // scale]
+                    feat.append(compute_feature(block))
+            distparam.append(np.array(feat))
 
         if scale == 1:
             # 检查输入是否为空
@@ -138,7 +222,18 @@ def niqe(img, mu_pris_param, cov_pris_param, gaussian_window, block_size_h=96, b
             img = img * 255.
 
     distparam = np.concatenate(distparam, axis=1)
+    return _mvg_quality(distparam, mu_pris_param, cov_pris_param)
+
+
+def _mvg_quality(distparam, mu_pris_param, cov_pris_param):
+    """Fit a MVG model to the block features and compare it to the pristine one.
 
+    Args:
+        distparam (ndarray): Block features with shape (num_blocks, 36).
+
+    Returns:
+        float: NIQE result.
+    """
     # fit a MVG (multivariate Gaussian) model to distorted patch features
     mu_distparam = np.nanmean(distparam, axis=0)
     # use nancov. ref: https://ww2.mathworks.cn/help/stats/nancov.html
@@ -155,6 +250,115 @@ def niqe(img, mu_pris_param, cov_pris_param, gaussian_window, block_size_h=96, b
     return quality
 
 
+def _estimate_aggd_param_pt(blocks, chunk_size=1024):
+    """Estimate AGGD parameters of many blocks at once (PyTorch version).
+
+    Args:
+        blocks (Tensor): Blocks with shape (m, ...). Each block is flattened.
+        chunk_size (int): Number of blocks matched against the lookup table at
+            a time. Default: 1024.
+
+    Returns:
+        tuple[Tensor]: Indices into the AGGD lookup table, beta_l and beta_r,
+            each with shape (m, ).
+    """
+    _, r_gam, beta_factor, _ = (torch.from_numpy(x).to(blocks) for x in _aggd_table())
+    blocks = blocks.reshape(blocks.size(0), -1)
+    sq = blocks**2
+    neg, pos = blocks < 0, blocks > 0
+    left_std = torch.sqrt((sq * neg).sum(dim=1) / neg.sum(dim=1))
+    right_std = torch.sqrt((sq * pos).sum(dim=1) / pos.sum(dim=1))
+    gammahat = left_std / right_std
+    rhat = blocks.abs().mean(dim=1)**2 / sq.mean(dim=1)
+    rhatnorm = (rhat * (gammahat**3 + 1) * (gammahat + 1)) / ((gammahat**2 + 1)**2)
+
+    position = torch.zeros(blocks.size(0), dtype=torch.long, device=blocks.device)
+    valid = torch.nonzero(~torch.isnan(rhatnorm), as_tuple=False).squeeze(1)
+    for start in range(0, valid.numel(), chunk_size):
+        idx = valid[start:start + chunk_size]
+        position[idx] = torch.argmin((r_gam[None] - rhatnorm[idx, None])**2, dim=1)
+    return position, left_std * beta_factor[position], right_std * beta_factor[position]
+
+
+def _compute_feature_pt(blocks):
+    """Compute features of blocks with shape (m, h, w). Returns (m, 18)."""
+    gam, _, _, mean_factor = (torch.from_numpy(x).to(blocks) for x in _aggd_table())
+    position, beta_l, beta_r = _estimate_aggd_param_pt(blocks)
+    feat = [gam[position], (beta_l + beta_r) / 2]
+    for shift in [[0, 1], [1, 0], [1, 1], [1, -1]]:
+        shifted_blocks = torch.roll(blocks, shift, dims=(1, 2))
+        position, beta_l, beta_r = _estimate_aggd_param_pt(blocks * shifted_blocks)
+        # Eq. 8
+        feat.extend([gam[position], (beta_r - beta_l) * mean_factor[position], beta_l, beta_r])
+    return torch.stack(feat, dim=1)
+
+
+@torch.no_grad()
+def niqe_pt(img, mu_pris_param, cov_pris_param, gaussian_window, block_size_h=96, block_size_w=96):
+    """Calculate NIQE metric for a batch of images (PyTorch version).
+
+    Filtering, normalization, the second scale and the block features of all
+    images are computed on the device of ``img``. Only the final MVG fit
+    (36-dim) is done per image with numpy, as in :func:`niqe`.
+
+    Args:
+        img (Tensor): Gray or Y (of YCbCr) images with shape (n, 1, h, w).
+            Range [0, 255] with float type.
+        mu_pris_param (ndarray): Mean of a pre-defined multivariate Gaussian
+            model calculated on the pristine dataset.
+        cov_pris_param (ndarray): Covariance of a pre-defined multivariate
+            Gaussian model calculated on the pristine dataset.
+        gaussian_window (ndarray): A 7x7 Gaussian window used for smoothing the
+            image.
+        block_size_h (int): Height of the blocks. It must be even. Default: 96.
+        block_size_w (int): Width of the blocks. It must be even. Default: 96.
+
+    Returns:
+        Tensor: NIQE results with shape (n, ).
+    """
+    assert img.dim() == 4 and img.size(1) == 1, ('Input images must be gray or Y (of YCbCr) with shape (n, 1, h, w).')
+    assert block_size_h % 2 == 0 and block_size_w % 2 == 0, 'Block sizes must be even.'
+    n, _, h, w = img.shape
+    num_block_h = math.floor(h / block_size_h)
+    num_block_w = math.floor(w / block_size_w)
+    if num_block_h == 0 or num_block_w == 0:
+        raise ValueError(f'Image size ({h}x{w}) is too small for block size ({block_size_h}x{block_size_w}).')
+
+    img = img[:, :, 0:num_block_h * block_size_h, 0:num_block_w * block_size_w].to(torch.float32)
+    # scipy convolve flips the window; the border mode 'nearest' is replicate padding
+    pad = gaussian_window.shape[0] // 2
+    window = torch.from_numpy(np.ascontiguousarray(gaussian_window[::-1, ::-1])).to(img.device, torch.float64)
+    window = window[None, None]
+
+    distparam = []
+    for scale in (1, 2):  # perform on two scales (1, 2)
+        img64 = img.to(torch.float64)
+        mu = F.conv2d(F.pad(img64, (pad, pad, pad, pad), mode='replicate'), window)
+        sigma = torch.sqrt(torch.abs(F.conv2d(F.pad(img64**2, (pad, pad, pad, pad), mode='replicate'), window) - mu**2))
+        # normalize, as in Eq. 1 in the paper
+        img_nomalized = (img64 - mu) / (sigma + 1)
+
+        # (n, nbh, bh, nbw, bw) -> (n * nbw * nbh, bh, bw), in the same block order as niqe
+        bh, bw = block_size_h // scale, block_size_w // scale
+        blocks = img_nomalized.view(n, num_block_h, bh, num_block_w, bw).permute(0, 3, 1, 2, 4)
+        blocks = blocks.reshape(-1, bh, bw)
+        distparam.append(_compute_feature_pt(blocks).view(n, num_block_w * num_block_h, -1))
+
+        if scale == 1:
+            img = imresize(img / 255., scale=0.5, antialiasing=True) * 255.
+
+    distparam = torch.cat(distparam, dim=2).cpu().numpy()
+    quality = [_mvg_quality(feat, mu_pris_param, cov_pris_param) for feat in distparam]
+    return torch.tensor(quality, dtype=torch.float64)
+
+
+@functools.lru_cache()
+def _load_pris_params():
+    """Load the official params estimated from the pristine dataset (once)."""
+    niqe_pris_params = np.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'niqe_pris_params.npz'))
+    return (niqe_pris_params['mu_pris_param'], niqe_pris_params['cov_pris_param'], niqe_pris_params['gaussian_window'])
+
+
 @METRIC_REGISTRY.register()
 def calculate_niqe(img, crop_border, input_order='HWC', convert_to='y', **kwargs):
     """Calculate NIQE (Natural Image Quality Evaluator) metric.
@@ -181,18 +385,14 @@ def calculate_niqe(img, crop_border, input_order='HWC', convert_to='y', **kwargs
         input_order (str): Whether the input order is 'HW', 'HWC' or 'CHW'.
             Default: 'HWC'.
         convert_to (str): Whether converted to 'y' (of MATLAB YCbCr) or 'gray'.
+            The gray image uses the BT.601 weights, as ``cv2.COLOR_BGR2GRAY``.
             Default: 'y'.
 
     Returns:
         float: NIQE result.
     """
-    ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
     # we use the official params estimated from the pristine dataset.
-    niqe_pris_params = np.load(os.path.join(ROOT_DIR, 'niqe_pris_params.npz'))
-    mu_pris_param = niqe_pris_params['mu_pris_param']
-    cov_pris_param = niqe_pris_params['cov_pris_param']
-    gaussian_window = niqe_pris_params['gaussian_window']
-
+    mu_pris_param, cov_pris_param, gaussian_window = _load_pris_params()
 
     if img is None or img.size == 0:
         raise ValueError('Input image is None or empty.')
@@ -205,7 +405,11 @@ def calculate_niqe(img, crop_border, input_order='HWC', convert_to='y', **kwargs
         if convert_to == 'y':
             img = to_y_channel(img)
         elif convert_to == 'gray':
-            img = cv2.cvtColor(img / 255., cv2.COLOR_BGR2GRAY) * 255.
+            # Integer inputs often give an exact .5 before rounding. cv2.cvtColor breaks these ties in a way that
+            # depends on the pixel position in a row, so the sum is taken in a fixed order, as in calculate_niqe_pt
+            img = img / 255.
+            img = (img[..., 0] * np.float32(0.114) + img[..., 1] * np.float32(0.587)) + img[..., 2] * np.float32(0.299)
+            img = img * 255.
         img = np.squeeze(img)
 
     if img is None or img.size == 0:
@@ -220,3 +424,43 @@ def calculate_niqe(img, crop_border, input_order='HWC', convert_to='y', **kwargs
     niqe_result = niqe(img, mu_pris_param, cov_pris_param, gaussian_window)
 
     return niqe_result
+
+
+@METRIC_REGISTRY.register()
+@batched_metric
+def calculate_niqe_pt(img, crop_border, convert_to='y', **kwargs):
+    """Calculate NIQE (Natural Image Quality Evaluator) metric (PyTorch version).
+
+    The results match :func:`calculate_niqe` within 1e-4, for both
+    ``convert_to='y'`` and ``convert_to='gray'``.
+
+    Args:
+        img (Tensor): Images with range [0, 1], shape (n, 3/1, h, w), RGB order.
+        crop_border (int): Cropped pixels in each edge of an image. These pixels are not involved in the calculation.
+        convert_to (str): Whether converted to 'y' (of MATLAB YCbCr) or 'gray'. Default: 'y'.
+
+    Returns:
+        Tensor: NIQE results with shape (n, ).
+    """
+    mu_pris_param, cov_pris_param, gaussian_window = _load_pris_params()
+
+    img = img.to(torch.float32)
+    if img.size(1) == 3:
+        # the same operations in the same order as calculate_niqe, so that the pixels at the rounding boundary (.5)
+        # are rounded in the same way
+        if convert_to == 'y':
+            # as bgr2ycbcr (in float64), instead of rgb2ycbcr_pt (in float32)
+            img = img.to(torch.float64)
+            img = ((img[:, 2:3] * 24.966 + img[:, 1:2] * 128.553) + img[:, 0:1] * 65.481 + 16.) / 255.
+            img = img.to(torch.float32)
+        elif convert_to == 'gray':
+            img = (img[:, 2:3] * 0.114 + img[:, 1:2] * 0.587) + img[:, 0:1] * 0.299
+    img = img * 255.
+
+    if crop_border != 0:
+        img = img[:, :, crop_border:-crop_border, crop_border:-crop_border]
+
+    # round is necessary for being consistent with MATLAB's result
+    img = img.round()
+
+    return niqe_pt(img, mu_pris_param, cov_pris_param, gaussian_window)
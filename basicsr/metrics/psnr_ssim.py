@@ -3,7 +3,7 @@ import numpy as np
 import torch
 import torch.nn.functional as F
 
-from basicsr.metrics.metric_util import reorder_image, to_y_channel
+from basicsr.metrics.metric_util import batched_metric, reorder_image, to_y_channel
 from basicsr.utils.color_util import rgb2ycbcr_pt
 from basicsr.utils.registry import METRIC_REGISTRY
 
@@ -49,6 +49,7 @@ def calculate_psnr(img, img2, crop_border, input_order='HWC', test_y_channel=Fal
 
 
 @METRIC_REGISTRY.register()
+@batched_metric
 def calculate_psnr_pt(img, img2, crop_border, test_y_channel=False, **kwargs):
     """Calculate PSNR (Peak Signal-to-Noise Ratio) (PyTorch version).
 
@@ -119,16 +120,11 @@ def calculate_ssim(img, img2, crop_border, input_order='HWC', test_y_channel=Fal
         img = to_y_channel(img)
         img2 = to_y_channel(img2)
 
-    img = img.astype(np.float64)
-    img2 = img2.astype(np.float64)
-
-    ssims = []
-    for i in range(img.shape[2]):
-        ssims.append(_ssim(img[..., i], img2[..., i]))
-    return np.array(ssims).mean()
+    return _ssim_separable(img, img2)
 
 
 @METRIC_REGISTRY.register()
+@batched_metric
 def calculate_ssim_pt(img, img2, crop_border, test_y_channel=False, **kwargs):
     """Calculate SSIM (structural similarity) (PyTorch version).
 
@@ -163,7 +159,7 @@ def calculate_ssim_pt(img, img2, crop_border, test_y_channel=False, **kwargs):
     img = img.to(torch.float64)
     img2 = img2.to(torch.float64)
 
-    ssim = _ssim_pth(img * 255., img2 * 255.)
+    ssim = _ssim_separable_pth(img * 255., img2 * 255.)
     return ssim
 
 
@@ -198,6 +194,56 @@ def _ssim(img, img2):
     return ssim_map.mean()
 
 
+def _ssim_map_from_moments(mu1, mu2, e11, e22, e12):
+    """Calculate the SSIM map from the filtered first and second moments."""
+    c1 = (0.01 * 255)**2
+    c2 = (0.03 * 255)**2
+    mu1_sq = mu1**2
+    mu2_sq = mu2**2
+    mu1_mu2 = mu1 * mu2
+    sigma1_sq = e11 - mu1_sq
+    sigma2_sq = e22 - mu2_sq
+    sigma12 = e12 - mu1_mu2
+    return ((2 * mu1_mu2 + c1) * (2 * sigma12 + c2)) / ((mu1_sq + mu2_sq + c1) * (sigma1_sq + sigma2_sq + c2))
+
+
+def _ssim_separable(img, img2, strip_size=64):
+    """Calculate SSIM (structural similarity) with a separable Gaussian window.
+
+    It is called by func:`calculate_ssim`. The 11x11 Gaussian window is the
+    outer product of a 1D kernel, so it is applied as a 1x11 and a 11x1 filter.
+    Each channel is processed in strips of rows (with a margin of 5 rows on
+    each side), so that only a few strip-sized float64 maps are alive at any
+    time, even for 4K images. The results match :func:`_ssim` averaged over
+    channels up to floating point rounding.
+
+    Args:
+        img (ndarray): Images with range [0, 255] with order 'HWC'.
+        img2 (ndarray): Images with range [0, 255] with order 'HWC'.
+        strip_size (int): Number of output rows of each strip. Default: 64.
+
+    Returns:
+        float: SSIM result, averaged over channels.
+    """
+    if img.ndim == 2:
+        img, img2 = img[..., None], img2[..., None]
+    h, w, c = img.shape
+    if h <= 10 or w <= 10:
+        # no valid pixels for window size 11
+        return float('nan')
+    kernel = cv2.getGaussianKernel(11, 1.5)
+    ssim_sum = 0.
+    for i in range(c):
+        for top in range(0, h - 10, strip_size):
+            bottom = min(top + strip_size + 10, h)
+            x = img[top:bottom, :, i].astype(np.float64)
+            y = img2[top:bottom, :, i].astype(np.float64)
+            # valid mode for window size 11
+            moments = [cv2.sepFilter2D(m, -1, kernel, kernel)[5:-5, 5:-5] for m in (x, y, x * x, y * y, x * y)]
+            ssim_sum += _ssim_map_from_moments(*moments).sum()
+    return float(ssim_sum / ((h - 10) * (w - 10) * c))
+
+
 def _ssim_pth(img, img2):
     """Calculate SSIM (structural similarity) (PyTorch version).
 
@@ -229,3 +275,28 @@ def _ssim_pth(img, img2):
     cs_map = (2 * sigma12 + c2) / (sigma1_sq + sigma2_sq + c2)
     ssim_map = ((2 * mu1_mu2 + c1) / (mu1_sq + mu2_sq + c1)) * cs_map
     return ssim_map.mean([1, 2, 3])
+
+
+def _ssim_separable_pth(img, img2):
+    """Calculate SSIM (structural similarity) with a separable Gaussian window (PyTorch version).
+
+    It is called by func:`calculate_ssim_pt`. The five moment maps of all
+    channels are stacked and filtered by one grouped 11x1 and one grouped 1x11
+    convolution, instead of five 11x11 convolutions. The results match
+    :func:`_ssim_pth` up to floating point rounding.
+
+    Args:
+        img (Tensor): Images with range [0, 255], shape (n, 3/1, h, w).
+        img2 (Tensor): Images with range [0, 255], shape (n, 3/1, h, w).
+
+    Returns:
+        Tensor: SSIM results with shape (n, ).
+    """
+    kernel = torch.from_numpy(cv2.getGaussianKernel(11, 1.5)).to(img)
+    moments = torch.cat([img, img2, img * img, img2 * img2, img * img2], dim=1)
+    groups = moments.size(1)
+    # valid mode
+    filtered = F.conv2d(moments, kernel.view(1, 1, 11, 1).expand(groups, 1, 11, 1), groups=groups)
+    filtered = F.conv2d(filtered, kernel.view(1, 1, 1, 11).expand(groups, 1, 1, 11), groups=groups)
+    ssim_map = _ssim_map_from_moments(*torch.chunk(filtered, 5, dim=1))
+    return ssim_map.mean([1, 2, 3])
@@ -1,3 +1,4 @@
+import contextlib
 import os
 import time
 import torch
@@ -6,7 +7,7 @@ from copy import deepcopy
 from torch.nn.parallel import DataParallel, DistributedDataParallel
 
 from basicsr.models import lr_scheduler as lr_scheduler
-from basicsr.utils import get_root_logger
+from basicsr.utils import AsyncCheckpointWriter, build_step_profiler, get_root_logger
 from basicsr.utils.dist_util import master_only
 
 
@@ -20,6 +21,27 @@ class BaseModel():
         self.schedulers = []
         self.optimizers = []
 
+        # mixed precision (train: amp) and memory format (train: channels_last) of training
+        train_opt = opt.get('train') or {}
+        self.amp_dtype = self.get_amp_dtype(train_opt.get('amp'))
+        self.memory_format = torch.channels_last if train_opt.get('channels_last', False) else torch.contiguous_format
+        # loss scaling is only needed for fp16; a disabled scaler passes losses and steps through
+        use_grad_scaler = self.amp_dtype == torch.float16
+        if hasattr(getattr(torch, 'amp', None), 'GradScaler'):
+            self.grad_scaler = torch.amp.GradScaler('cuda', enabled=use_grad_scaler)
+        else:  # PyTorch < 2.3
+            self.grad_scaler = torch.cuda.amp.GradScaler(enabled=use_grad_scaler)
+
+        # checkpoint writer (logger: checkpoint). None means the blocking torch.save
+        ckpt_opt = deepcopy((opt.get('logger') or {}).get('checkpoint') or {})
+        self.keep_best_checkpoints = ckpt_opt.pop('keep_best', False)
+        self.async_checkpoint = ckpt_opt.pop('async_write', True)
+        self.checkpoint_writer = AsyncCheckpointWriter(**ckpt_opt) if ckpt_opt or self.keep_best_checkpoints else None
+
+        # step profiler (logger: profiler), only on the main process
+        profiler_opt = (opt.get('logger') or {}).get('profiler') if self.is_train and opt.get('rank', 0) == 0 else None
+        self.profiler = build_step_profiler(profiler_opt, opt['path'].get('log'))
+
     def feed_data(self, data):
         pass
 
@@ -71,6 +93,10 @@ class BaseModel():
             if val <= self.best_metric_results[dataset_name][metric]['val']:
                 self.best_metric_results[dataset_name][metric]['val'] = val
                 self.best_metric_results[dataset_name][metric]['iter'] = current_iter
+        if self.checkpoint_writer is not None and self.keep_best_checkpoints:
+            # never remove the checkpoints with the best results
+            self.checkpoint_writer.set_protected(record['iter'] for records in self.best_metric_results.values()
+                                                 for record in records.values())
 
     def model_ema(self, decay=0.999):
         net_g = self.get_bare_model(self.net_g)
@@ -84,6 +110,36 @@ class BaseModel():
     def get_current_log(self):
         return self.log_dict
 
+    @staticmethod
+    def get_amp_dtype(amp):
+        """Get the autocast dtype of the ``train: amp`` option.
+
+        Args:
+            amp (bool | str | None): False/None (fp32), True/'fp16' or 'bf16'.
+
+        Returns:
+            torch.dtype | None: Autocast dtype, None for fp32 training.
+        """
+        if amp in (None, False):
+            return None
+        if not hasattr(torch, 'autocast'):
+            raise ValueError(
+                f'train: amp requires torch.autocast (PyTorch >= 1.10), but got PyTorch {torch.__version__}.')
+        if amp in (True, 'fp16', 'float16'):
+            return torch.float16
+        if amp in ('bf16', 'bfloat16'):
+            return torch.bfloat16
+        raise ValueError(f'Unsupported amp mode: {amp}. Supported ones are: fp16, bf16.')
+
+    def autocast(self):
+        """Autocast context for the forward passes and losses of a training step.
+
+        It is a no-op when ``train: amp`` is off.
+        """
+        if self.amp_dtype is None:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=self.amp_dtype)
+
     def model_to_device(self, net):
         """Model to device. It also warps models with DistributedDataParallel
         or DataParallel.
@@ -92,6 +148,8 @@ class BaseModel():
             net (nn.Module)
         """
         net = net.to(self.device)
+        if self.memory_format == torch.channels_last:
+            net = net.to(memory_format=torch.channels_last)
         if self.opt['dist']:
             find_unused_parameters = self.opt.get('find_unused_parameters', False)
             net = DistributedDataParallel(
@@ -231,9 +289,14 @@ class BaseModel():
             for key, param in state_dict.items():
                 if key.startswith('module.'):  # remove unnecessary 'module.'
                     key = key[7:]
-                state_dict[key] = param.cpu()
+                # the checkpoint writer takes its own (pinned) CPU snapshot
+                state_dict[key] = param if self.checkpoint_writer is not None else param.cpu()
             save_dict[param_key_] = state_dict
 
+        if self.checkpoint_writer is not None:
+            self._write_checkpoint(save_dict, save_path)
+            return
+
         # avoid occasional writing errors
         retry = 3
         while retry > 0:
@@ -251,6 +314,20 @@ class BaseModel():
             logger.warning(f'Still cannot save {save_path}. Just ignore it.')
             # raise IOError(f'Cannot save {save_path}.')
 
+    def _write_checkpoint(self, obj, save_path):
+        """Save a checkpoint with the checkpoint writer.
+
+        The writing is done in the background unless ``async_write`` is false.
+        """
+        self.checkpoint_writer.save(obj, save_path)
+        if not self.async_checkpoint:
+            self.checkpoint_writer.wait()
+
+    def wait_checkpoints(self):
+        """Block until the checkpoints written in the background are saved."""
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.wait()
+
     def _print_different_keys_loading(self, crt_net, load_net, strict=True):
         """Print keys with different name or different size when loading models.
 
@@ -329,9 +406,15 @@ class BaseModel():
                 state['optimizers'].append(o.state_dict())
             for s in self.schedulers:
                 state['schedulers'].append(s.state_dict())
+            if self.grad_scaler.is_enabled():
+                state['grad_scaler'] = self.grad_scaler.state_dict()
             save_filename = f'{current_iter}.state'
             save_path = os.path.join(self.opt['path']['training_states'], save_filename)
 
+            if self.checkpoint_writer is not None:
+                self._write_checkpoint(state, save_path)
+                return
+
             # avoid occasional writing errors
             retry = 3
             while retry > 0:
@@ -363,6 +446,8 @@ class BaseModel():
             self.optimizers[i].load_state_dict(o)
         for i, s in enumerate(resume_schedulers):
             self.schedulers[i].load_state_dict(s)
+        if 'grad_scaler' in resume_state and self.grad_scaler.is_enabled():
+            self.grad_scaler.load_state_dict(resume_state['grad_scaler'])
 
     def reduce_loss_dict(self, loss_dict):
         """reduce loss dict.
@@ -378,7 +463,7 @@ class BaseModel():
                 losses = []
                 for name, value in loss_dict.items():
                     keys.append(name)
-                    losses.append(value)
+                    losses.append(value.float())  # losses may be in half precision under amp
                 losses = torch.stack(losses, 0)
                 torch.distributed.reduce(losses, dst=0)
                 if self.opt['rank'] == 0:
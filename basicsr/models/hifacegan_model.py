@@ -213,6 +213,11 @@ class HiFaceGANModel(SRModel):
                   'Using super method now (Only PSNR & SSIM are supported)')
             super().nondist_validation(dataloader, current_iter, tb_logger, save_img)
 
+    def dist_validation(self, dataloader, current_iter, tb_logger, save_img):
+        # the metrics of HiFaceGAN are evaluated after all images are tested; it is not sharded
+        if self.opt['rank'] == 0:
+            self.nondist_validation(dataloader, current_iter, tb_logger, save_img)
+
     def nondist_validation(self, dataloader, current_iter, tb_logger, save_img):
         """
         TODO: Validation using updated metric system
@@ -1,15 +1,25 @@
 import torch
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from os import path as osp
+from torch import distributed as dist
+from torch.utils.data import Subset
 from tqdm import tqdm
 
 from basicsr.archs import build_network
 from basicsr.losses import build_loss
 from basicsr.metrics import calculate_metric
 from basicsr.utils import get_root_logger, imwrite, tensor2img
+from basicsr.utils.dist_util import get_dist_info
 from basicsr.utils.registry import MODEL_REGISTRY
 from .base_model import BaseModel
 
+
+def _quantize(img):
+    """Round a batch of images in [0, 1] to 8 bits, as :func:`tensor2img` does."""
+    return img.detach().float().clamp(0, 1).mul(255.).round().div(255.)
+
+
 # registry the model
 @MODEL_REGISTRY.register()
 class SRModel(BaseModel):
@@ -59,7 +69,8 @@ class SRModel(BaseModel):
             self.cri_pix = None
 
         if train_opt.get('perceptual_opt'):
-            self.cri_perceptual = build_loss(train_opt['perceptual_opt']).to(self.device)
+            self.cri_perceptual = build_loss(train_opt['perceptual_opt']).to(
+                self.device, memory_format=self.memory_format)
         else:
             self.cri_perceptual = None
 
@@ -85,38 +96,43 @@ class SRModel(BaseModel):
         self.optimizers.append(self.optimizer_g)
 
     def feed_data(self, data):
-        self.lq = data['lq'].to(self.device)
-        if 'gt' in data:
-            self.gt = data['gt'].to(self.device)
+        with self.profiler.section('h2d'):
+            self.lq = data['lq'].to(self.device, memory_format=self.memory_format)
+            if 'gt' in data:
+                self.gt = data['gt'].to(self.device, memory_format=self.memory_format)
 
     def optimize_parameters(self, current_iter):
         # a full train step
 
         # 0 grad
         self.optimizer_g.zero_grad()
-        self.output = self.net_g(self.lq)
-
-        # loss
-        l_total = 0
-        loss_dict = OrderedDict()
-        # pixel loss
-        if self.cri_pix:
-            l_pix = self.cri_pix(self.output, self.gt)
-            l_total += l_pix
-            loss_dict['l_pix'] = l_pix
-        # perceptual loss
-        if self.cri_perceptual:
-            l_percep, l_style = self.cri_perceptual(self.output, self.gt)
-            if l_percep is not None:
-                l_total += l_percep
-                loss_dict['l_percep'] = l_percep
-            if l_style is not None:
-                l_total += l_style
-                loss_dict['l_style'] = l_style
+        with self.profiler.section('g_forward'), self.autocast():
+            self.output = self.net_g(self.lq)
+
+            # loss
+            l_total = 0
+            loss_dict = OrderedDict()
+            # pixel loss
+            if self.cri_pix:
+                l_pix = self.cri_pix(self.output, self.gt)
+                l_total += l_pix
+                loss_dict['l_pix'] = l_pix
+            # perceptual loss
+            if self.cri_perceptual:
+                l_percep, l_style = self.cri_perceptual(self.output, self.gt)
+                if l_percep is not None:
+                    l_total += l_percep
+                    loss_dict['l_percep'] = l_percep
+                if l_style is not None:
+                    l_total += l_style
+                    loss_dict['l_style'] = l_style
 
         # backward
-        l_total.backward()
-        self.optimizer_g.step()
+        with self.profiler.section('g_backward'):
+            self.grad_scaler.scale(l_total).backward()
+        with self.profiler.section('optimizer_step'):
+            self.grad_scaler.step(self.optimizer_g)
+            self.grad_scaler.update()
 
         self.log_dict = self.reduce_loss_dict(loss_dict)
 
@@ -183,29 +199,78 @@ class SRModel(BaseModel):
         self.output = output.mean(dim=0, keepdim=True)
 
     def dist_validation(self, dataloader, current_iter, tb_logger, save_img):
-        if self.opt['rank'] == 0:
+        """Validation sharded across ranks.
+
+        Rank r validates images r, r + world_size, ... and saves their results. The per-image metric values are
+        gathered with an all-reduce and summed in dataset order on every rank, so the results are identical to
+        :meth:`nondist_validation`.
+        """
+        rank, world_size = get_dist_info()
+        if world_size == 1:
             self.nondist_validation(dataloader, current_iter, tb_logger, save_img)
+            return
+
+        dataset = dataloader.dataset
+        dataset_name = dataset.opt['name']
+        shard = torch.utils.data.DataLoader(
+            Subset(dataset, range(rank, len(dataset), world_size)), batch_size=1, shuffle=False, num_workers=0)
+        with_metrics = self._init_validation_metrics(dataset_name)
+        use_pbar = self.opt['val'].get('pbar', False) and rank == 0
+        metric_values = self._validate(shard, dataset_name, current_iter, save_img, use_pbar)
+
+        if with_metrics:
+            values = torch.zeros(len(dataset), len(metric_values), dtype=torch.float64, device=self.device)
+            for col, shard_values in enumerate(metric_values.values()):
+                values[rank::world_size, col] = torch.tensor(shard_values, dtype=torch.float64)
+            dist.all_reduce(values)
+            values = values.cpu().tolist()
+            for col, metric in enumerate(metric_values.keys()):
+                self.metric_results[metric] = sum(row[col] for row in values) / len(values)
+                # update the best metric result
+                self._update_best_metric_result(dataset_name, metric, self.metric_results[metric], current_iter)
+            if rank == 0:
+                self._log_validation_metric_values(current_iter, dataset_name, tb_logger)
 
     def nondist_validation(self, dataloader, current_iter, tb_logger, save_img):
         dataset_name = dataloader.dataset.opt['name']
-        with_metrics = self.opt['val'].get('metrics') is not None
-        use_pbar = self.opt['val'].get('pbar', False)
+        with_metrics = self._init_validation_metrics(dataset_name)
+        metric_values = self._validate(dataloader, dataset_name, current_iter, save_img,
+                                       self.opt['val'].get('pbar', False))
 
+        if with_metrics:
+            for metric, values in metric_values.items():
+                self.metric_results[metric] = sum(values) / len(values)
+                # update the best metric result
+                self._update_best_metric_result(dataset_name, metric, self.metric_results[metric], current_iter)
+
+            self._log_validation_metric_values(current_iter, dataset_name, tb_logger)
+
+    def _init_validation_metrics(self, dataset_name):
+        """Reset self.metric_results and initialize the best metric results. Returns whether metrics are used."""
+        with_metrics = self.opt['val'].get('metrics') is not None
         # metrics: PSNR SSIM etc.
         if with_metrics:
-            if not hasattr(self, 'metric_results'):  # only execute in the first run
-                self.metric_results = {metric: 0 for metric in self.opt['val']['metrics'].keys()}
             # initialize the best metric results for each dataset_name (supporting multiple validation datasets)
             self._initialize_best_metric_results(dataset_name)
-        # zero self.metric_results
-        if with_metrics:
-            self.metric_results = {metric: 0 for metric in self.metric_results}
+            # zero self.metric_results
+            self.metric_results = {metric: 0 for metric in self.opt['val']['metrics'].keys()}
+        return with_metrics
+
+    def _validate(self, dataloader, dataset_name, current_iter, save_img, use_pbar):
+        """Run the model on a dataloader (batch size 1), save results and compute metrics.
+
+        Returns:
+            OrderedDict: Metric name -> list of per-image values, in dataloader order.
+        """
+        if self.opt['val'].get('batch_size', 1) > 1:
+            return self._validate_batched(dataloader, dataset_name, current_iter, save_img, use_pbar)
 
+        metric_values = OrderedDict((name, []) for name in self.opt['val'].get('metrics', None) or {})
         metric_data = dict()
         if use_pbar:
             pbar = tqdm(total=len(dataloader), unit='image')
 
-        for idx, val_data in enumerate(dataloader):
+        for val_data in dataloader:
             img_name = osp.splitext(osp.basename(val_data['lq_path'][0]))[0]
             self.feed_data(val_data)
             self.test()
@@ -224,35 +289,98 @@ class SRModel(BaseModel):
             torch.cuda.empty_cache()
 
             if save_img:
-                if self.opt['is_train']:
-                    save_img_path = osp.join(self.opt['path']['visualization'], img_name,
-                                             f'{img_name}_{current_iter}.png')
-                else:
-                    if self.opt['val']['suffix']:
-                        save_img_path = osp.join(self.opt['path']['visualization'], dataset_name,
-                                                 f'{img_name}_{self.opt["val"]["suffix"]}.png')
-                    else:
-                        save_img_path = osp.join(self.opt['path']['visualization'], dataset_name,
-                                                 f'{img_name}_{self.opt["name"]}.png')
-                imwrite(sr_img, save_img_path)
-
-            if with_metrics:
-                # calculate metrics
-                for name, opt_ in self.opt['val']['metrics'].items():
-                    self.metric_results[name] += calculate_metric(metric_data, opt_)
+                imwrite(sr_img, self._get_save_img_path(dataset_name, img_name, current_iter))
+
+            # calculate metrics
+            for name, values in metric_values.items():
+                values.append(calculate_metric(metric_data, self.opt['val']['metrics'][name]))
             if use_pbar:
                 pbar.update(1)
                 pbar.set_description(f'Test {img_name}')
         if use_pbar:
             pbar.close()
+        return metric_values
+
+    def _validate_batched(self, dataloader, dataset_name, current_iter, save_img, use_pbar):
+        """Validation with batched forward passes and on-device metrics.
+
+        Enabled by ``val: batch_size`` > 1. Images of the same size are bucketed into batches, so no padding changes
+        the results. Outputs stay on the device and are quantized to 8 bits as :func:`tensor2img` does, and
+        :func:`calculate_metric` scores the whole batch: metrics with a batched version (e.g., ``calculate_psnr`` ->
+        ``calculate_psnr_pt``) run on the device, the others are mapped over the images. Images are written by a
+        thread pool.
+        """
+        val_opt = self.opt['val']
+        batch_size = val_opt['batch_size']
+        max_pending = 4 * batch_size  # images held in buckets; the largest bucket is flushed beyond it
+
+        metric_opts = val_opt.get('metrics', None) or {}
+        metric_values = OrderedDict((name, [None] * len(dataloader)) for name in metric_opts)
+
+        writer = ThreadPoolExecutor(max_workers=val_opt.get('num_write_workers', 2)) if save_img else None
+        pending_writes = deque()
+        buckets = OrderedDict()  # (lq shape, gt shape) -> list of (position, img_name, val_data)
+        if use_pbar:
+            pbar = tqdm(total=len(dataloader), unit='image')
 
-        if with_metrics:
-            for metric in self.metric_results.keys():
-                self.metric_results[metric] /= (idx + 1)
-                # update the best metric result
-                self._update_best_metric_result(dataset_name, metric, self.metric_results[metric], current_iter)
+        def _flush(key):
+            batch = buckets.pop(key)
+            self.feed_data({
+                name: torch.cat([val_data[name] for _, _, val_data in batch])
+                for name in ('lq', 'gt') if name in batch[0][2]
+            })
+            self.test()
+            # quantize as tensor2img does, so that the metrics agree with the per-image validation
+            metric_data = {'img': _quantize(self.output)}
+            if hasattr(self, 'gt'):
+                metric_data['img2'] = _quantize(self.gt)
+            for name, opt_ in metric_opts.items():
+                results = calculate_metric(metric_data, opt_).tolist()
+                for (position, _, _), result in zip(batch, results):
+                    metric_values[name][position] = result
 
-            self._log_validation_metric_values(current_iter, dataset_name, tb_logger)
+            if save_img:
+                output = self.output.detach().cpu()
+                for (_, img_name, _), img in zip(batch, output):
+                    save_img_path = self._get_save_img_path(dataset_name, img_name, current_iter)
+                    pending_writes.append(
+                        writer.submit(lambda x, path: imwrite(tensor2img([x]), path), img, save_img_path))
+                while len(pending_writes) > max_pending:
+                    pending_writes.popleft().result()
+
+            if use_pbar:
+                pbar.update(len(batch))
+                pbar.set_description(f'Test {batch[-1][1]}')
+            del self.lq
+            del self.output
+            if hasattr(self, 'gt'):
+                del self.gt
+
+        for position, val_data in enumerate(dataloader):
+            img_name = osp.splitext(osp.basename(val_data['lq_path'][0]))[0]
+            key = (tuple(val_data['lq'].shape), tuple(val_data['gt'].shape) if 'gt' in val_data else None)
+            buckets.setdefault(key, []).append((position, img_name, val_data))
+            if len(buckets[key]) >= batch_size:
+                _flush(key)
+            elif sum(len(bucket) for bucket in buckets.values()) > max_pending:
+                _flush(max(buckets, key=lambda k: len(buckets[k])))
+        while buckets:
+            _flush(next(iter(buckets)))
+        if save_img:
+            for future in pending_writes:
+                future.result()
+            writer.shutdown()
+        if use_pbar:
+            pbar.close()
+        return metric_values
+
+    def _get_save_img_path(self, dataset_name, img_name, current_iter):
+        if self.opt['is_train']:
+            return osp.join(self.opt['path']['visualization'], img_name, f'{img_name}_{current_iter}.png')
+        if self.opt['val']['suffix']:
+            return osp.join(self.opt['path']['visualization'], dataset_name,
+                            f'{img_name}_{self.opt["val"]["suffix"]}.png')
+        return osp.join(self.opt['path']['visualization'], dataset_name, f'{img_name}_{self.opt["name"]}.png')
 
     def _log_validation_metric_values(self, current_iter, dataset_name, tb_logger):
         log_str = f'Validation {dataset_name}\n'
@@ -98,6 +98,13 @@ class VideoBaseModel(SRModel):
         if rank == 0:
             pbar.close()
 
+        frame_cache = getattr(dataset, 'frame_cache', None)
+        if frame_cache is not None and frame_cache.num_requested > 0:
+            get_root_logger().info(f'Frame cache of {dataset_name}: decoded {frame_cache.num_decoded} frames for '
+                                   f'{frame_cache.num_requested} requested, holding '
+                                   f'{frame_cache.nbytes / 1024 / 1024:.1f} MB.')
+            frame_cache.reset_stats()
+
         if with_metrics:
             if self.opt['dist']:
                 # collect data among GPUs
@@ -123,16 +123,20 @@ class VideoRecurrentModel(VideoBaseModel):
 
             # evaluate
             if i < num_folders:
-                for idx in range(visuals['result'].size(1)):
-                    result = visuals['result'][0, idx, :, :, :]
-                    result_img = tensor2img([result])  # uint8, bgr
-                    metric_data['img'] = result_img
-                    if 'gt' in visuals:
-                        gt = visuals['gt'][0, idx, :, :, :]
-                        gt_img = tensor2img([gt])  # uint8, bgr
-                        metric_data['img2'] = gt_img
+                if with_metrics:
+                    # score the frames in batches of 8 to bound the memory; quantize as tensor2img does
+                    for start in range(0, visuals['result'].size(1), 8):
+                        frames = visuals['result'][0, start:start + 8]
+                        metric_data['img'] = frames.float().clamp(0, 1).mul(255.).round().div(255.)
+                        if 'gt' in visuals:
+                            metric_data['img2'] = visuals['gt'][0, start:start + 8]
+                        for metric_idx, opt_ in enumerate(self.opt['val']['metrics'].values()):
+                            result = calculate_metric(metric_data, opt_).to(self.metric_results[folder])
+                            self.metric_results[folder][start:start + frames.size(0), metric_idx] += result
 
+                for idx in range(visuals['result'].size(1)):
                     if save_img:
+                        result_img = tensor2img([visuals['result'][0, idx, :, :, :]])  # uint8, bgr
                         if self.opt['is_train']:
                             raise NotImplementedError('saving image is not supported during training.')
                         else:
@@ -148,12 +152,6 @@ class VideoRecurrentModel(VideoBaseModel):
                             # image name only for REDS dataset
                         imwrite(result_img, img_path)
 
-                    # calculate metrics
-                    if with_metrics:
-                        for metric_idx, opt_ in enumerate(self.opt['val']['metrics'].values()):
-                            result = calculate_metric(metric_data, opt_)
-                            self.metric_results[folder][idx, metric_idx] += result
-
                 # progress bar
                 if rank == 0:
                     for _ in range(world_size):
@@ -0,0 +1,370 @@
+import argparse
+import cv2
+import json
+import logging
+import math
+import numpy as np
+import os
+import socketserver
+import stat
+import threading
+import time
+import torch
+import uuid
+from collections import OrderedDict
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path as osp
+from urllib.parse import parse_qs, urlparse
+
+from basicsr.archs import build_network
+from basicsr.utils import get_root_logger, tile_inference
+from basicsr.utils.options import dict2str, yaml_load
+
+
+class _SRRequest():
+    """A pending inference request."""
+
+    def __init__(self, img, decode_time=0.):
+        self.id = uuid.uuid4().hex
+        self.img = img
+        self.output = None
+        self.error = None
+        self.cancelled = False
+        self.done = threading.Event()
+        self.timings = OrderedDict(decode=decode_time)
+        self.t_enqueue = time.perf_counter()
+        self.batch_size = 0
+
+
+class BatchScheduler():
+    """Coalesce concurrent requests of equal size into batches.
+
+    Requests are bucketed by image shape. The scheduler always serves the
+    bucket with the oldest request and waits at most ``max_latency`` seconds
+    (measured from the arrival of that request) for more requests of the same
+    shape before running the forward pass.
+
+    Args:
+        model (nn.Module): SR network.
+        device (torch.device): Device of the network.
+        max_batch_size (int): Maximum number of images per forward. Default: 8.
+        max_latency (float): Batching latency budget in seconds. Default: 0.01.
+        tile_size (int): Tile size for large inputs, 0 to disable. Default: 0.
+        tile_overlap (int): Overlap between tiles. Default: 16.
+        window_size (int): Pad inputs to a multiple of it. Default: 1.
+    """
+
+    def __init__(self, model, device, max_batch_size=8, max_latency=0.01, tile_size=0, tile_overlap=16, window_size=1):
+        self.model = model
+        self.device = device
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.window_size = window_size
+
+        self._buckets = OrderedDict()  # shape -> list of requests
+        self._requests = {}  # id -> request, for cancellation
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, img, decode_time=0.):
+        """Queue an image (HWC, BGR, uint8) and return its request."""
+        request = _SRRequest(img, decode_time)
+        with self._cond:
+            self._buckets.setdefault(img.shape, []).append(request)
+            self._requests[request.id] = request
+            self._cond.notify_all()
+        return request
+
+    def cancel(self, request_id):
+        """Cancel a queued request. Returns False if it is unknown or finished."""
+        with self._cond:
+            request = self._requests.get(request_id)
+            if request is None or request.done.is_set():
+                return False
+            request.cancelled = True
+            for shape, bucket in list(self._buckets.items()):
+                if request in bucket:
+                    bucket.remove(request)
+                    if not bucket:
+                        del self._buckets[shape]
+            self._requests.pop(request_id, None)
+        request.done.set()
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._buckets and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            shape, bucket = min(self._buckets.items(), key=lambda item: item[1][0].t_enqueue)
+            deadline = bucket[0].t_enqueue + self.max_latency
+            while len(bucket) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                if not bucket:  # all requests of this bucket were cancelled
+                    return []
+            batch = bucket[:self.max_batch_size]
+            del bucket[:self.max_batch_size]
+            if not bucket:
+                self._buckets.pop(shape, None)
+            for request in batch:
+                self._requests.pop(request.id, None)
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            batch = [request for request in batch if not request.cancelled]
+            if not batch:
+                continue
+            t_start = time.perf_counter()
+            for request in batch:
+                request.timings['queue'] = t_start - request.t_enqueue
+                request.batch_size = len(batch)
+            try:
+                outputs = self._forward([request.img for request in batch])
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+                    request.done.set()
+                continue
+            t_forward = time.perf_counter() - t_start
+            for request, output in zip(batch, outputs):
+                request.output = output
+                request.timings['forward'] = t_forward
+                request.done.set()
+
+    @torch.no_grad()
+    def _forward(self, imgs):
+        img = np.stack(imgs).astype(np.float32) / 255.
+        img = torch.from_numpy(np.transpose(img[..., [2, 1, 0]], (0, 3, 1, 2))).to(self.device)
+        output = tile_inference(
+            self.model,
+            img,
+            tile_size=self.tile_size,
+            tile_overlap=self.tile_overlap,
+            window_size=self.window_size,
+            device=self.device)
+        output = output.float().cpu().clamp_(0, 1).numpy()
+        output = (np.transpose(output[:, [2, 1, 0]], (0, 2, 3, 1)) * 255.0).round().astype(np.uint8)
+        return list(output)
+
+
+class SRRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API.
+
+    - ``POST /sr``: body is an encoded image. Optional query ``timeout``
+      (positive seconds, otherwise 400) and header ``X-Request-Id``.
+      Returns a PNG; the timing breakdown (queue, decode, forward, encode)
+      is in the ``X-SR-Timing`` header as JSON.
+    - ``DELETE /sr/<request_id>``: cancel a queued request.
+    - ``GET /health``: liveness check.
+    """
+
+    server_version = 'BasicSRServe'
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # unix sockets have no client address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        get_root_logger().debug(f'{self.address_string()} - {format % args}')
+
+    def _send(self, code, body, content_type='application/json', headers=None):
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'sr':
+            self._send(404, {'error': 'not found'})
+        elif self.server.scheduler.cancel(self.server.resolve_request_id(parts[1])):
+            self._send(200, {'id': parts[1], 'cancelled': True})
+        else:
+            self._send(404, {'id': parts[1], 'cancelled': False})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/sr':
+            self._send(404, {'error': 'not found'})
+            return
+        query = parse_qs(url.query)
+        # read the body first, so that the connection can be reused after an error response
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            timeout = float(query.get('timeout', [self.server.request_timeout])[0])
+        except ValueError:
+            timeout = math.nan
+        if not math.isfinite(timeout) or timeout <= 0:
+            self._send(400, {'error': 'timeout should be a positive number of seconds'})
+            return
+
+        t_start = time.perf_counter()
+        img = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+        t_decode = time.perf_counter() - t_start
+        if img is None:
+            self._send(400, {'error': 'cannot decode image'})
+            return
+
+        scheduler = self.server.scheduler
+        request = scheduler.submit(img, t_decode)
+        client_id = self.headers.get('X-Request-Id')
+        if client_id:
+            self.server.register_alias(client_id, request.id)
+
+        finished = request.done.wait(timeout)
+        if client_id:
+            self.server.register_alias(client_id, None)
+        if not finished:
+            scheduler.cancel(request.id)
+            self._send(504, {'id': request.id, 'error': 'timeout'})
+            return
+        if request.cancelled:
+            self._send(409, {'id': request.id, 'error': 'cancelled'})
+            return
+        if request.error is not None:
+            self._send(500, {'id': request.id, 'error': str(request.error)})
+            return
+
+        t_start = time.perf_counter()
+        _, buffer = cv2.imencode('.png', request.output)
+        request.timings['encode'] = time.perf_counter() - t_start
+        timing = {key: round(value * 1000, 3) for key, value in request.timings.items()}  # ms
+        timing['batch_size'] = request.batch_size
+        self._send(200, buffer.tobytes(), 'image/png', {'X-Request-Id': request.id, 'X-SR-Timing': json.dumps(timing)})
+
+
+class _ServerMixin():
+
+    def setup_sr(self, scheduler, request_timeout):
+        self.scheduler = scheduler
+        self.request_timeout = request_timeout
+        self._aliases = {}  # client-provided request id -> server request id
+        self._alias_lock = threading.Lock()
+
+    def register_alias(self, client_id, request_id):
+        with self._alias_lock:
+            if request_id is None:
+                self._aliases.pop(client_id, None)
+            else:
+                self._aliases[client_id] = request_id
+
+    def resolve_request_id(self, request_id):
+        with self._alias_lock:
+            return self._aliases.get(request_id, request_id)
+
+
+class SRHTTPServer(_ServerMixin, ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+
+    class SRUnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def build_server(opt, model, device):
+    serve_opt = opt.get('serve', {})
+    unix_socket = serve_opt.get('unix_socket')
+    # remove a stale socket of a previous run, but never a regular file
+    if unix_socket and osp.exists(unix_socket):
+        if not stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+            raise FileExistsError(f'{unix_socket} exists and is not a socket.')
+        os.remove(unix_socket)
+
+    scheduler = BatchScheduler(
+        model,
+        device,
+        max_batch_size=serve_opt.get('max_batch_size', 8),
+        max_latency=serve_opt.get('max_latency_ms', 10) / 1000.,
+        tile_size=serve_opt.get('tile_size', 0),
+        tile_overlap=serve_opt.get('tile_overlap', 16),
+        window_size=serve_opt.get('window_size', 1))
+
+    if unix_socket:
+        server = SRUnixServer(unix_socket, SRRequestHandler)
+    else:
+        server = SRHTTPServer((serve_opt.get('host', '127.0.0.1'), serve_opt.get('port', 8866)), SRRequestHandler)
+    server.setup_sr(scheduler, serve_opt.get('timeout', 60))
+    return server
+
+
+def load_network_for_serving(opt, device):
+    """Build network_g with build_network and load its pretrained weights once."""
+    logger = get_root_logger()
+    net = build_network(deepcopy(opt['network_g']))
+    load_path = opt['path'].get('pretrain_network_g')
+    if load_path is not None:
+        param_key = opt['path'].get('param_key_g', 'params')
+        load_net = torch.load(load_path, map_location=lambda storage, loc: storage)
+        if param_key is not None:
+            if param_key not in load_net and 'params' in load_net:
+                param_key = 'params'
+            load_net = load_net[param_key]
+        # remove unnecessary 'module.'
+        load_net = OrderedDict((k[7:] if k.startswith('module.') else k, v) for k, v in load_net.items())
+        net.load_state_dict(load_net, strict=opt['path'].get('strict_load_g', True))
+        logger.info(f'Loading {net.__class__.__name__} model from {load_path}, with param key: [{param_key}].')
+    net.eval()
+    return net.to(device)
+
+
+def serve_pipeline(root_path):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-opt', type=str, required=True, help='Path to option YAML file.')
+    args = parser.parse_args()
+    opt = yaml_load(args.opt)
+    opt['root_path'] = root_path
+
+    logger = get_root_logger(logger_name='basicsr', log_level=logging.INFO)
+    logger.info(dict2str(opt))
+
+    torch.backends.cudnn.benchmark = True
+    device = torch.device('cuda' if opt.get('num_gpu', 1) != 0 and torch.cuda.is_available() else 'cpu')
+    model = load_network_for_serving(opt, device)
+    server = build_server(opt, model, device)
+    logger.info(f'Serving {opt["network_g"]["type"]} on {server.server_address}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.scheduler.stop()
+
+
+if __name__ == '__main__':
+    # python basicsr/serve.py -opt options/serve/serve_RRDBNet_PSNR_x4.yml
+    root_path = osp.abspath(osp.join(__file__, osp.pardir, osp.pardir))
+    serve_pipeline(root_path)
@@ -182,6 +182,7 @@ def train_pipeline(root_path):
             current_iter += 1
             if current_iter > total_iters:
                 break
+            model.profiler.step(current_iter)
             # update learning rate
             model.update_learning_rate(current_iter, warmup_iter=opt['train'].get('warmup_iter', -1))
             # training
@@ -198,7 +199,19 @@ def train_pipeline(root_path):
                 log_vars.update({'lrs': model.get_current_learning_rate()})
                 log_vars.update({'time': iter_timer.get_avg_time(), 'data_time': data_timer.get_avg_time()})
                 log_vars.update(model.get_current_log())
+                profile = model.profiler.summary()
+                if profile:
+                    log_vars.update({'profile': profile})
+                    # training samples per second over all GPUs
+                    num_samples = opt['datasets']['train']['batch_size_per_gpu'] * opt['world_size']
+                    log_vars.update({'throughput': num_samples / iter_timer.get_avg_time()})
                 msg_logger(log_vars)
+                image_cache = getattr(train_loader.dataset, 'image_cache', None)
+                if image_cache is not None:
+                    cache_stats = image_cache.stats()
+                    logger.info(f'Image cache: hits {cache_stats["hits"]}, misses {cache_stats["misses"]} '
+                                f'(hit rate {cache_stats["hit_rate"]:.2%}), evictions {cache_stats["evictions"]}, '
+                                f'size {cache_stats["size_mb"]:.1f} MB.')
 
             # save models and training states
             if current_iter % opt['logger']['save_checkpoint_freq'] == 0:
@@ -209,12 +222,15 @@ def train_pipeline(root_path):
             if opt.get('val') is not None and (current_iter % opt['val']['val_freq'] == 0):
                 if len(val_loaders) > 1:
                     logger.warning('Multiple validation datasets are *only* supported by SRModel.')
-                for val_loader in val_loaders:
-                    model.validation(val_loader, current_iter, tb_logger, opt['val']['save_img'])
+                # the sections of validation (e.g., h2d in feed_data) are not training steps
+                with model.profiler.paused():
+                    for val_loader in val_loaders:
+                        model.validation(val_loader, current_iter, tb_logger, opt['val']['save_img'])
 
             data_timer.start()
             iter_timer.start()
-            train_data = prefetcher.next()
+            with model.profiler.section('data', host=True):
+                train_data = prefetcher.next()
         # end of iter
 
     # end of epoch
@@ -223,8 +239,11 @@ def train_pipeline(root_path):
     logger.info('Save the latest model.')
     model.save(epoch=-1, current_iter=-1)  # -1 stands for the latest
     if opt.get('val') is not None:
-        for val_loader in val_loaders:
-            model.validation(val_loader, current_iter, tb_logger, opt['val']['save_img'])
+        with model.profiler.paused():
+            for val_loader in val_loaders:
+                model.validation(val_loader, current_iter, tb_logger, opt['val']['save_img'])
+    model.wait_checkpoints()
+    model.profiler.close()
     if tb_logger:
         tb_logger.close()
 
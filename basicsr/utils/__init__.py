@@ -1,3 +1,4 @@
+from .checkpoint_util import AsyncCheckpointWriter, snapshot_to_cpu
 from .color_util import bgr2ycbcr, rgb2ycbcr, rgb2ycbcr_pt, ycbcr2bgr, ycbcr2rgb
 from .diffjpeg import DiffJPEG
 from .file_client import FileClient
@@ -6,8 +7,15 @@ from .img_util import crop_border, imfrombytes, img2tensor, imwrite, tensor2img
 from .logger import AvgTimer, MessageLogger, get_env_info, get_root_logger, init_tb_logger, init_wandb_logger
 from .misc import check_resume, get_time_str, make_exp_dirs, mkdir_and_rename, scandir, set_random_seed, sizeof_fmt
 from .options import yaml_load
+from .pipeline_util import run_folder_pipeline
+from .profiler_util import StepProfiler, build_step_profiler
+from .tile_util import pad_to_window, tile_inference
+from .video_util import FFmpegVideoReader, FFmpegVideoWriter, get_overlap_windows, get_video_meta_info, stream_inference
 
 __all__ = [
+    # checkpoint_util.py
+    'AsyncCheckpointWriter',
+    'snapshot_to_cpu',
     #  color_util.py
     'bgr2ycbcr',
     'rgb2ycbcr',
@@ -43,5 +51,19 @@ __all__ = [
     'USMSharp',
     'usm_sharp',
     # options
-    'yaml_load'
+    'yaml_load',
+    # pipeline_util
+    'run_folder_pipeline',
+    # profiler_util
+    'StepProfiler',
+    'build_step_profiler',
+    # tile_util
+    'pad_to_window',
+    'tile_inference',
+    # video_util
+    'FFmpegVideoReader',
+    'FFmpegVideoWriter',
+    'get_overlap_windows',
+    'get_video_meta_info',
+    'stream_inference'
 ]
@@ -0,0 +1,163 @@
+import os
+import re
+import threading
+import time
+import torch
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from os import path as osp
+
+from .logger import get_root_logger
+
+# <prefix><iter><ext>, e.g., net_g_5000.pth, 5000.state
+_CKPT_PATTERN = re.compile(r'^(.*?)(\d+)(\.[^.]+)$')
+
+
+def snapshot_to_cpu(obj, pin_memory=True):
+    """Copy all the tensors in a (nested) state dict to CPU memory.
+
+    The copies are independent of the training tensors, so that the training
+    can go on while the snapshot is being written. CUDA tensors are copied to
+    pinned memory asynchronously and synchronized once at the end.
+
+    Args:
+        obj (dict | list | tuple | Tensor | object): State to be copied.
+        pin_memory (bool): Whether to copy CUDA tensors to pinned memory.
+            Default: True.
+
+    Returns:
+        Same type as obj: The snapshot.
+    """
+    has_cuda = [False]
+
+    def _copy(x):
+        if torch.is_tensor(x):
+            if x.is_cuda:
+                has_cuda[0] = True
+                out = torch.empty(x.size(), dtype=x.dtype, pin_memory=pin_memory)
+                return out.copy_(x, non_blocking=pin_memory)
+            return x.clone()
+        if isinstance(x, dict):
+            return type(x)((k, _copy(v)) for k, v in x.items())
+        if isinstance(x, (list, tuple)):
+            return type(x)(_copy(v) for v in x)
+        return x
+
+    snapshot = _copy(obj)
+    if has_cuda[0]:
+        torch.cuda.synchronize()
+    return snapshot
+
+
+class AsyncCheckpointWriter():
+    """Write checkpoints on a background thread.
+
+    ``save`` snapshots the state to CPU memory and returns; the snapshot is
+    written by a single worker thread, so checkpoints are written in the order
+    they are submitted. Each file is written to ``<path>.tmp`` and renamed, so
+    a checkpoint on disk is always complete. When ``max_pending`` checkpoints
+    are already waiting to be written, ``save`` blocks, which bounds the host
+    memory held by snapshots.
+
+    When ``keep_latest`` > 0, after each write only the ``keep_latest`` newest
+    files of the same kind (e.g., ``net_g_<iter>.pth`` or ``<iter>.state`` in
+    the same folder) are kept. Iterations marked by ``set_protected`` (e.g.,
+    the iterations with the best validation results) and files without an
+    iteration number (e.g., ``net_g_latest.pth``) are never removed.
+
+    Args:
+        max_pending (int): Max number of checkpoints waiting to be written.
+            Default: 2.
+        keep_latest (int): Number of checkpoints of each kind to keep. 0 keeps
+            all of them. Default: 0.
+        pin_memory (bool): Whether to snapshot CUDA tensors to pinned memory.
+            Default: True.
+    """
+
+    def __init__(self, max_pending=2, keep_latest=0, pin_memory=True):
+        self.keep_latest = keep_latest
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint_writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._protected = set()
+        self._futures = []
+
+    def save(self, obj, path):
+        """Snapshot the state and write it in the background.
+
+        Args:
+            obj (dict): State to be saved with ``torch.save``.
+            path (str): Save path.
+        """
+        # take the slot before the snapshot, so that at most max_pending snapshots are ever held in host memory
+        self._slots.acquire()
+        try:
+            snapshot = snapshot_to_cpu(obj, self.pin_memory)
+            future = self._executor.submit(self._write, snapshot, path)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures = [f for f in self._futures if not f.done()] + [future]
+
+    def set_protected(self, iters):
+        """Set the iterations whose checkpoints are never removed.
+
+        Args:
+            iters (Iterable[int]): Iteration numbers.
+        """
+        self._protected = set(int(i) for i in iters)
+
+    def wait(self):
+        """Block until all the submitted checkpoints are written."""
+        for future in self._futures:
+            future.result()
+        self._futures = []
+
+    def close(self):
+        """Write the pending checkpoints and stop the worker thread."""
+        self.wait()
+        self._executor.shutdown(wait=True)
+
+    def _write(self, obj, path):
+        tmp_path = f'{path}.tmp'
+        # avoid occasional writing errors
+        num_retry = 3
+        for retry in range(num_retry):
+            try:
+                torch.save(obj, tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                get_root_logger().warning(f'Save checkpoint error: {e}, remaining retry times: {num_retry - retry - 1}')
+                time.sleep(1)
+            else:
+                break
+        else:
+            get_root_logger().warning(f'Still cannot save {path}. Just ignore it.')
+            if osp.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        if self.keep_latest > 0:
+            self._prune(path)
+
+    def _prune(self, path):
+        """Remove the old checkpoints of the same kind as path."""
+        match = _CKPT_PATTERN.match(osp.basename(path))
+        if match is None:
+            return
+        folder = osp.dirname(path)
+        prefix, _, ext = match.groups()
+        candidates = defaultdict(list)
+        for name in os.listdir(folder):
+            other = _CKPT_PATTERN.match(name)
+            if other is not None and other.group(1) == prefix and other.group(3) == ext:
+                candidates[int(other.group(2))].append(osp.join(folder, name))
+        protected = self._protected
+        for current_iter in sorted(candidates)[:-self.keep_latest]:
+            if current_iter in protected:
+                continue
+            for ckpt_path in candidates[current_iter]:
+                try:
+                    os.remove(ckpt_path)
+                except FileNotFoundError:
+                    pass
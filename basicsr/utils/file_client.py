@@ -1,5 +1,8 @@
 # Modified from https://github.com/open-mmlab/mmcv/blob/master/mmcv/fileio/file_client.py  # noqa: E501
+import numpy as np
+import os
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 
 
 class BaseStorageBackend(metaclass=ABCMeta):
@@ -7,7 +10,8 @@ class BaseStorageBackend(metaclass=ABCMeta):
 
     All backends need to implement two apis: ``get()`` and ``get_text()``.
     ``get()`` reads the file as a byte stream and ``get_text()`` reads the file
-    as texts.
+    as texts. Backends can override ``get_many()`` to read several files more
+    efficiently than one by one.
     """
 
     @abstractmethod
@@ -18,6 +22,9 @@ class BaseStorageBackend(metaclass=ABCMeta):
     def get_text(self, filepath):
         pass
 
+    def get_many(self, filepaths, *args):
+        return [self.get(filepath, *args) for filepath in filepaths]
+
 
 class MemcachedBackend(BaseStorageBackend):
     """Memcached storage backend.
@@ -56,7 +63,23 @@ class MemcachedBackend(BaseStorageBackend):
 
 
 class HardDiskBackend(BaseStorageBackend):
-    """Raw hard disks storage backend."""
+    """Raw hard disks storage backend.
+
+    Args:
+        num_threads (int): Number of threads to read files concurrently in
+            ``get_many()``. Default: 8.
+    """
+
+    def __init__(self, num_threads=8):
+        self.num_threads = num_threads
+        self._executor = None
+
+    def get_many(self, filepaths):
+        if self.num_threads <= 1 or len(filepaths) <= 1:
+            return [self.get(filepath) for filepath in filepaths]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_threads)
+        return list(self._executor.map(self.get, filepaths))
 
     def get(self, filepath):
         filepath = str(filepath)
@@ -125,6 +148,78 @@ class LmdbBackend(BaseStorageBackend):
             value_buf = txn.get(filepath.encode('ascii'))
         return value_buf
 
+    def get_many(self, filepaths, client_key):
+        """Get values of several keys from one lmdb named client_key in one read transaction.
+
+        Args:
+            filepaths (list[str | obj:`Path`]): Lmdb keys.
+            client_key (str): Used for distinguishing different lmdb envs.
+        """
+        assert client_key in self._client, (f'client_key {client_key} is not in lmdb clients.')
+        with self._client[client_key].begin(write=False) as txn:
+            return [txn.get(str(filepath).encode('ascii')) for filepath in filepaths]
+
+    def get_text(self, filepath):
+        raise NotImplementedError
+
+
+class MemmapBackend(BaseStorageBackend):
+    """Memory-mapped shards storage backend.
+
+    Images are stored as raw uint8 arrays in shard files, see
+    :func:`basicsr.utils.memmap_util.make_memmap_from_imgs`. ``get()`` returns
+    a uint8 array (HWC, BGR) that is a view of the mapping instead of bytes;
+    slicing it only reads the pages of the region and copies nothing.
+
+    Args:
+        db_paths (str | list[str]): Memmap folder paths.
+        client_keys (str | list[str]): Client keys. Default: 'default'.
+    """
+
+    def __init__(self, db_paths, client_keys='default'):
+        if isinstance(client_keys, str):
+            client_keys = [client_keys]
+        if isinstance(db_paths, str):
+            db_paths = [db_paths]
+        self.db_paths = [str(v) for v in db_paths]
+        assert len(client_keys) == len(self.db_paths), ('client_keys and db_paths should have the same length, '
+                                                        f'but received {len(client_keys)} and {len(self.db_paths)}.')
+
+        self._folders = dict(zip(client_keys, self.db_paths))
+        self._index = {}
+        self._shards = {}  # opened lazily, so that each dataloader worker has its own mappings
+        for client, path in zip(client_keys, self.db_paths):
+            index = {}
+            with open(os.path.join(path, 'meta_info.txt')) as fin:
+                for line in fin:
+                    name, shape, _, shard_idx, offset = line.split()
+                    shape = tuple(int(v) for v in shape[1:-1].split(','))
+                    index[os.path.splitext(name)[0]] = (int(shard_idx), int(offset), shape)
+            self._index[client] = index
+
+    def _get_shard(self, client_key, shard_idx):
+        shard = self._shards.get((client_key, shard_idx))
+        if shard is None:
+            shard_path = os.path.join(self._folders[client_key], f'shard_{shard_idx:03d}.bin')
+            shard = np.memmap(shard_path, dtype=np.uint8, mode='r')
+            self._shards[(client_key, shard_idx)] = shard
+        return shard
+
+    def get(self, filepath, client_key):
+        """Get the image array according to the filepath from the shards named client_key.
+
+        Args:
+            filepath (str | obj:`Path`): Here, filepath is the key.
+            client_key (str): Used for distinguishing different memmap folders.
+
+        Returns:
+            ndarray: Image view with order HWC, BGR, uint8.
+        """
+        assert client_key in self._index, (f'client_key {client_key} is not in memmap clients.')
+        shard_idx, offset, shape = self._index[client_key][str(filepath)]
+        shard = self._get_shard(client_key, shard_idx)
+        return shard[offset:offset + shape[0] * shape[1] * shape[2]].reshape(shape)
+
     def get_text(self, filepath):
         raise NotImplementedError
 
@@ -136,32 +231,101 @@ class FileClient(object):
     and return it as a binary file. it can also register other backend
     accessor with a given name and backend class.
 
+    Files that will be read soon can be passed to ``prefetch()``. They are
+    read by background threads, and the following ``get()`` or ``get_many()``
+    of them returns the prefetched values. Prefetching is disabled if
+    ``prefetch_threads`` is 0, and not supported by the memcached backend,
+    whose client is not thread-safe.
+
     Attributes:
         backend (str): The storage backend type. Options are "disk",
-            "memcached" and "lmdb".
+            "memcached", "lmdb" and "memmap".
         client (:obj:`BaseStorageBackend`): The backend object.
+        prefetch_threads (int): Number of threads for prefetching. Default: 0.
     """
 
     _backends = {
         'disk': HardDiskBackend,
         'memcached': MemcachedBackend,
         'lmdb': LmdbBackend,
+        'memmap': MemmapBackend,
     }
 
-    def __init__(self, backend='disk', **kwargs):
+    # max number of prefetched files that are not read yet; the oldest ones are dropped
+    _max_prefetched = 256
+
+    def __init__(self, backend='disk', prefetch_threads=0, **kwargs):
         if backend not in self._backends:
             raise ValueError(f'Backend {backend} is not supported. Currently supported ones'
                              f' are {list(self._backends.keys())}')
         self.backend = backend
         self.client = self._backends[backend](**kwargs)
-
-    def get(self, filepath, client_key='default'):
-        # client_key is used only for lmdb, where different fileclients have
-        # different lmdb environments.
-        if self.backend == 'lmdb':
+        self.prefetch_threads = prefetch_threads if backend != 'memcached' else 0
+        self._prefetch_executor = None
+        self._prefetched = {}
+
+    def _get(self, filepath, client_key):
+        # client_key is used only for lmdb and memmap, where different fileclients have
+        # different lmdb environments (memmap folders).
+        if self.backend in ('lmdb', 'memmap'):
             return self.client.get(filepath, client_key)
         else:
             return self.client.get(filepath)
 
+    def get(self, filepath, client_key='default'):
+        future = self._prefetched.pop((client_key, str(filepath)), None)
+        if future is not None:
+            return future.result()
+        return self._get(filepath, client_key)
+
+    def get_many(self, filepaths, client_key='default'):
+        """Get several files. It is faster than calling ``get()`` one by one.
+
+        Lmdb reads them in one transaction and the disk backend reads them
+        concurrently.
+
+        Args:
+            filepaths (list[str | obj:`Path`]): File paths (or keys).
+            client_key (str): Used for lmdb and memmap. Default: 'default'.
+
+        Returns:
+            list: Values in the order of filepaths.
+        """
+        values = [None] * len(filepaths)
+        to_read = []
+        for i, filepath in enumerate(filepaths):
+            future = self._prefetched.pop((client_key, str(filepath)), None)
+            if future is None:
+                to_read.append(i)
+            else:
+                values[i] = future.result()
+        if to_read:
+            paths = [filepaths[i] for i in to_read]
+            if self.backend in ('lmdb', 'memmap'):
+                results = self.client.get_many(paths, client_key)
+            else:
+                results = self.client.get_many(paths)
+            for i, value in zip(to_read, results):
+                values[i] = value
+        return values
+
+    def prefetch(self, filepaths, client_key='default'):
+        """Hint that the files will be read soon, so that they are read in the background.
+
+        Args:
+            filepaths (list[str | obj:`Path`]): File paths (or keys).
+            client_key (str): Used for lmdb and memmap. Default: 'default'.
+        """
+        if self.prefetch_threads <= 0:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=self.prefetch_threads)
+        for filepath in filepaths:
+            key = (client_key, str(filepath))
+            if key not in self._prefetched:
+                self._prefetched[key] = self._prefetch_executor.submit(self._get, filepath, client_key)
+        while len(self._prefetched) > self._max_prefetched:
+            self._prefetched.pop(next(iter(self._prefetched)))
+
     def get_text(self, filepath):
         return self.client.get_text(filepath)
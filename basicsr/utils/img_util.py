@@ -3,7 +3,6 @@ import math
 import numpy as np
 import os
 import torch
-from torchvision.utils import make_grid
 
 
 def img2tensor(imgs, bgr2rgb=True, float32=True):
@@ -68,6 +67,9 @@ def tensor2img(tensor, rgb2bgr=True, out_type=np.uint8, min_max=(0, 1)):
 
         n_dim = _tensor.dim()
         if n_dim == 4:
+            # torchvision is slow to import, so it is only imported here
+            from torchvision.utils import make_grid
+
             img_np = make_grid(_tensor, nrow=int(math.sqrt(_tensor.size(0))), normalize=False).numpy()
             img_np = img_np.transpose(1, 2, 0)
             if rgb2bgr:
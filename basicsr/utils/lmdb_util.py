@@ -1,6 +1,7 @@
 import cv2
 import lmdb
 import sys
+from collections import deque
 from multiprocessing import Pool
 from os import path as osp
 from tqdm import tqdm
@@ -14,7 +15,9 @@ def make_lmdb_from_imgs(data_path,
                         compress_level=1,
                         multiprocessing_read=False,
                         n_thread=40,
-                        map_size=None):
+                        map_size=None,
+                        resume=False,
+                        max_pending=None):
     """Make lmdb from images.
 
     Contents of lmdb. The file structure is:
@@ -43,8 +46,15 @@ def make_lmdb_from_imgs(data_path,
 
     We use the image name without extension as the lmdb key.
 
-    If `multiprocessing_read` is True, it will read all the images to memory
-    using multiprocessing. Thus, your server needs to have enough memory.
+    If `multiprocessing_read` is True, images are read and encoded by a
+    process pool while the main process writes them. At most `max_pending`
+    encoded images are held in memory, so the memory does not grow with the
+    dataset size.
+
+    The meta information of the images in a batch is written after the batch
+    is committed. Thus, if the building is interrupted, it can be resumed with
+    `resume=True`: the images already committed and recorded in meta_info.txt
+    are skipped.
 
     Args:
         data_path (str): Data path for reading images.
@@ -54,11 +64,16 @@ def make_lmdb_from_imgs(data_path,
         batch (int): After processing batch images, lmdb commits.
             Default: 5000.
         compress_level (int): Compress level when encoding images. Default: 1.
-        multiprocessing_read (bool): Whether use multiprocessing to read all
-            the images to memory. Default: False.
+        multiprocessing_read (bool): Whether use multiprocessing to read and
+            encode images. Default: False.
         n_thread (int): For multiprocessing.
         map_size (int | None): Map size for lmdb env. If None, use the
             estimated size from images. Default: None
+        resume (bool): Whether to resume an interrupted building of
+            lmdb_path. Default: False.
+        max_pending (int | None): Max number of encoded images waiting to be
+            written with multiprocessing. If None, use 4 * n_thread.
+            Default: None.
     """
 
     assert len(img_path_list) == len(keys), ('img_path_list and keys should have the same length, '
@@ -67,31 +82,10 @@ def make_lmdb_from_imgs(data_path,
     print(f'Totoal images: {len(img_path_list)}')
     if not lmdb_path.endswith('.lmdb'):
         raise ValueError("lmdb_path must end with '.lmdb'.")
-    if osp.exists(lmdb_path):
+    if osp.exists(lmdb_path) and not resume:
         print(f'Folder {lmdb_path} already exists. Exit.')
         sys.exit(1)
 
-    if multiprocessing_read:
-        # read all the images to memory (multiprocessing)
-        dataset = {}  # use dict to keep the order for multiprocessing
-        shapes = {}
-        print(f'Read images with multiprocessing, #thread: {n_thread} ...')
-        pbar = tqdm(total=len(img_path_list), unit='image')
-
-        def callback(arg):
-            """get the image data and update pbar."""
-            key, dataset[key], shapes[key] = arg
-            pbar.update(1)
-            pbar.set_description(f'Read {key}')
-
-        pool = Pool(n_thread)
-        for path, key in zip(img_path_list, keys):
-            pool.apply_async(read_img_worker, args=(osp.join(data_path, path), key, compress_level), callback=callback)
-        pool.close()
-        pool.join()
-        pbar.close()
-        print(f'Finish reading {len(img_path_list)} images.')
-
     # create lmdb environment
     if map_size is None:
         # obtain data size for one image
@@ -100,38 +94,75 @@ def make_lmdb_from_imgs(data_path,
         data_size_per_img = img_byte.nbytes
         print('Data size per image is: ', data_size_per_img)
         data_size = data_size_per_img * len(img_path_list)
-        map_size = data_size * 10
+        # at least 1 MB, since tiny images are dominated by the lmdb page overhead
+        map_size = max(data_size * 10, 1 << 20)
 
     env = lmdb.open(lmdb_path, map_size=map_size)
 
+    # skip the images that are committed and recorded in meta_info.txt
+    meta_path = osp.join(lmdb_path, 'meta_info.txt')
+    meta_lines = []
+    if resume and osp.exists(meta_path):
+        with env.begin() as txn:
+            committed = set(key.decode('ascii') for key in txn.cursor().iternext(keys=True, values=False))
+        with open(meta_path, 'r') as fin:
+            # drop the unfinished last line, if any
+            meta_lines = [line for line in fin if line.endswith('\n') and line.split('.png ')[0] in committed]
+        print(f'Resume from {len(meta_lines)} committed images.')
+    done_keys = set(line.split('.png ')[0] for line in meta_lines)
+    tasks = [(osp.join(data_path, path), key) for path, key in zip(img_path_list, keys) if key not in done_keys]
+
     # write data to lmdb
-    pbar = tqdm(total=len(img_path_list), unit='chunk')
+    txt_file = open(meta_path, 'w')
+    txt_file.writelines(meta_lines)
+    txt_file.flush()
+    pbar = tqdm(total=len(img_path_list), initial=len(img_path_list) - len(tasks), unit='image')
+    if multiprocessing_read:
+        print(f'Read images with multiprocessing, #thread: {n_thread} ...')
+        results = _encode_imgs_parallel(tasks, compress_level, n_thread, max_pending or 4 * n_thread)
+    else:
+        results = (read_img_worker(path, key, compress_level) for path, key in tasks)
     txn = env.begin(write=True)
-    txt_file = open(osp.join(lmdb_path, 'meta_info.txt'), 'w')
-    for idx, (path, key) in enumerate(zip(img_path_list, keys)):
+    batch_meta = []
+    for idx, (key, img_byte, (h, w, c)) in enumerate(results):
         pbar.update(1)
         pbar.set_description(f'Write {key}')
-        key_byte = key.encode('ascii')
-        if multiprocessing_read:
-            img_byte = dataset[key]
-            h, w, c = shapes[key]
-        else:
-            _, img_byte, img_shape = read_img_worker(osp.join(data_path, path), key, compress_level)
-            h, w, c = img_shape
-
-        txn.put(key_byte, img_byte)
+        txn.put(key.encode('ascii'), img_byte)
         # write meta information
-        txt_file.write(f'{key}.png ({h},{w},{c}) {compress_level}\n')
+        batch_meta.append(f'{key}.png ({h},{w},{c}) {compress_level}\n')
         if idx % batch == 0:
             txn.commit()
+            txt_file.writelines(batch_meta)
+            txt_file.flush()
+            batch_meta = []
             txn = env.begin(write=True)
     pbar.close()
     txn.commit()
+    txt_file.writelines(batch_meta)
     env.close()
     txt_file.close()
     print('\nFinish writing lmdb.')
 
 
+def _encode_imgs_parallel(tasks, compress_level, n_thread, max_pending):
+    """Read and encode images with a process pool, yielding in order.
+
+    At most max_pending images are submitted but not yet yielded.
+    """
+    pool = Pool(n_thread)
+    pending = deque()
+    try:
+        for path, key in tasks:
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(read_img_worker, args=(path, key, compress_level)))
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def read_img_worker(path, key, compress_level):
     """Read image worker.
 
@@ -80,6 +80,7 @@ class MessageLogger():
 
                 time (float): Iter time.
                 data_time (float): Data time for each iter.
+                profile (dict): Optional. Time (ms) of each section of an iter.
         """
         # epoch, iter, learning rates
         epoch = log_vars.pop('epoch')
@@ -103,6 +104,14 @@ class MessageLogger():
             message += f'[eta: {eta_str}, '
             message += f'time (data): {iter_time:.3f} ({data_time:.3f})] '
 
+        # time of the sections of an iter
+        if 'profile' in log_vars.keys():
+            profile = log_vars.pop('profile')
+            message += '[profile (ms): ' + ', '.join(f'{k}: {v:.2f}' for k, v in profile.items()) + '] '
+            if self.use_tb_logger and 'debug' not in self.exp_name:
+                for k, v in profile.items():
+                    self.tb_logger.add_scalar(f'profile/{k}', v, current_iter)
+
         # other items, especially losses
         for k, v in log_vars.items():
             message += f'{k}: {v:.4e} '
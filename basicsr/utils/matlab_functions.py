@@ -1,3 +1,4 @@
+import functools
 import math
 import numpy as np
 import torch
@@ -82,6 +83,60 @@ def calculate_weights_indices(in_length, out_length, scale, kernel, kernel_width
     return weights, indices, int(sym_len_s), int(sym_len_e)
 
 
+@functools.lru_cache(maxsize=128)
+def _get_resize_blocks(in_length, out_length, scale, antialiasing, device):
+    """Cached banded weight matrices of imresize along one axis.
+
+    The output positions are split into blocks. Each block reads a contiguous
+    range of the symmetrically padded input, so it is resized with one dense
+    matmul of shape (block length, input range length). The input range is
+    kept short, so that the zeros outside the band cost little.
+
+    Returns:
+        list[tuple]: (in_start, input indices, weights) of each block in the
+            output order. Weights have shape (block length, input range length).
+            If the input range does not touch the padding, it starts at
+            ``in_start`` and the indices are None. Otherwise ``in_start`` is
+            None and the int64 input indices (with the padding folded in) are
+            given.
+    """
+    weights, indices, sym_len_s, _ = calculate_weights_indices(in_length, out_length, scale, 'cubic', 4, antialiasing)
+    kernel_width = weights.size(1)
+    # the first index of each output position in the input coordinates
+    starts = indices[:, 0].long() - sym_len_s
+    # about 128 input positions for each block when downsampling
+    block = max(1, int(128 * min(scale, 1)))
+    blocks = []
+    for out_start in range(0, out_length, block):
+        out_end = min(out_start + block, out_length)
+        in_start, in_end = int(starts[out_start]), int(starts[out_end - 1]) + kernel_width
+        block_weights = torch.zeros(out_end - out_start, in_end - in_start)
+        for i in range(out_start, out_end):
+            offset = int(starts[i]) - in_start
+            block_weights[i - out_start, offset:offset + kernel_width] = weights[i]
+        if in_start >= 0 and in_end <= in_length:
+            blocks.append((in_start, None, block_weights.to(device)))
+        else:
+            # symmetric padding: -1 -> 0, -2 -> 1, ...; in_length -> in_length - 1, ...
+            idx = torch.arange(in_start, in_end)
+            idx = torch.where(idx < 0, -idx - 1, idx)
+            idx = torch.where(idx >= in_length, 2 * in_length - 1 - idx, idx).clamp_(0, in_length - 1)
+            blocks.append((None, idx.to(device), block_weights.to(device)))
+    return blocks
+
+
+def _resize_along_dim(img, blocks, dim):
+    """Apply the banded weight matrices along ``dim`` (-2 or -1) with one matmul per block."""
+    outs = []
+    for in_start, idx, weights in blocks:
+        if idx is None:
+            x = img.narrow(dim, in_start, weights.size(1))
+        else:
+            x = img.index_select(dim, idx)
+        outs.append(torch.matmul(weights, x) if dim == -2 else torch.matmul(x, weights.t()))
+    return outs[0] if len(outs) == 1 else torch.cat(outs, dim=dim)
+
+
 @torch.no_grad()
 def imresize(img, scale, antialiasing=True):
     """imresize function same as MATLAB.
@@ -89,9 +144,13 @@ def imresize(img, scale, antialiasing=True):
     It now only supports bicubic.
     The same scale applies for both height and width.
 
+    Each axis is resized with a few banded matmuls over the whole image (or
+    batch), and the weights are cached per (size, scale, device).
+
     Args:
         img (Tensor | Numpy array):
-            Tensor: Input image with shape (c, h, w), [0, 1] range.
+            Tensor: Input image with shape (c, h, w) or (n, c, h, w), [0, 1]
+                range. It can be on any device.
             Numpy: Input image with shape (h, w, c), [0, 1] range.
         scale (float): Scale factor. The same scale applies for both height
             and width.
@@ -99,7 +158,8 @@ def imresize(img, scale, antialiasing=True):
             Default: True.
 
     Returns:
-        Tensor: Output image with shape (c, h, w), [0, 1] range, w/o round.
+        Tensor: Output image with shape (c, h, w) or (n, c, h, w), [0, 1]
+            range, w/o round.
     """
     squeeze_flag = False
     if type(img).__module__ == np.__name__:  # numpy type
@@ -113,60 +173,14 @@ def imresize(img, scale, antialiasing=True):
         if img.ndim == 2:
             img = img.unsqueeze(0)
             squeeze_flag = True
+        img = img.float()
 
-    in_c, in_h, in_w = img.size()
+    in_h, in_w = img.shape[-2:]
     out_h, out_w = math.ceil(in_h * scale), math.ceil(in_w * scale)
-    kernel_width = 4
-    kernel = 'cubic'
-
-    # get weights and indices
-    weights_h, indices_h, sym_len_hs, sym_len_he = calculate_weights_indices(in_h, out_h, scale, kernel, kernel_width,
-                                                                             antialiasing)
-    weights_w, indices_w, sym_len_ws, sym_len_we = calculate_weights_indices(in_w, out_w, scale, kernel, kernel_width,
-                                                                             antialiasing)
-    # process H dimension
-    # symmetric copying
-    img_aug = torch.FloatTensor(in_c, in_h + sym_len_hs + sym_len_he, in_w)
-    img_aug.narrow(1, sym_len_hs, in_h).copy_(img)
-
-    sym_patch = img[:, :sym_len_hs, :]
-    inv_idx = torch.arange(sym_patch.size(1) - 1, -1, -1).long()
-    sym_patch_inv = sym_patch.index_select(1, inv_idx)
-    img_aug.narrow(1, 0, sym_len_hs).copy_(sym_patch_inv)
-
-    sym_patch = img[:, -sym_len_he:, :]
-    inv_idx = torch.arange(sym_patch.size(1) - 1, -1, -1).long()
-    sym_patch_inv = sym_patch.index_select(1, inv_idx)
-    img_aug.narrow(1, sym_len_hs + in_h, sym_len_he).copy_(sym_patch_inv)
-
-    out_1 = torch.FloatTensor(in_c, out_h, in_w)
-    kernel_width = weights_h.size(1)
-    for i in range(out_h):
-        idx = int(indices_h[i][0])
-        for j in range(in_c):
-            out_1[j, i, :] = img_aug[j, idx:idx + kernel_width, :].transpose(0, 1).mv(weights_h[i])
-
-    # process W dimension
-    # symmetric copying
-    out_1_aug = torch.FloatTensor(in_c, out_h, in_w + sym_len_ws + sym_len_we)
-    out_1_aug.narrow(2, sym_len_ws, in_w).copy_(out_1)
-
-    sym_patch = out_1[:, :, :sym_len_ws]
-    inv_idx = torch.arange(sym_patch.size(2) - 1, -1, -1).long()
-    sym_patch_inv = sym_patch.index_select(2, inv_idx)
-    out_1_aug.narrow(2, 0, sym_len_ws).copy_(sym_patch_inv)
-
-    sym_patch = out_1[:, :, -sym_len_we:]
-    inv_idx = torch.arange(sym_patch.size(2) - 1, -1, -1).long()
-    sym_patch_inv = sym_patch.index_select(2, inv_idx)
-    out_1_aug.narrow(2, sym_len_ws + in_w, sym_len_we).copy_(sym_patch_inv)
-
-    out_2 = torch.FloatTensor(in_c, out_h, out_w)
-    kernel_width = weights_w.size(1)
-    for i in range(out_w):
-        idx = int(indices_w[i][0])
-        for j in range(in_c):
-            out_2[j, :, i] = out_1_aug[j, :, idx:idx + kernel_width].mv(weights_w[i])
+
+    # process H dimension, then W dimension
+    out_1 = _resize_along_dim(img, _get_resize_blocks(in_h, out_h, scale, antialiasing, img.device), -2)
+    out_2 = _resize_along_dim(out_1, _get_resize_blocks(in_w, out_w, scale, antialiasing, img.device), -1)
 
     if squeeze_flag:
         out_2 = out_2.squeeze(0)
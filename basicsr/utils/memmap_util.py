@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+import os
+import sys
+from multiprocessing import Pool
+from os import path as osp
+from tqdm import tqdm
+
+
+def make_memmap_from_imgs(data_path, memmap_path, img_path_list, keys, shard_size_mb=4096, n_thread=40):
+    """Make memory-mapped shards from images.
+
+    Images are stored as raw uint8 arrays (HWC, BGR) one after another in
+    large shard files, so that they can be sliced from the mapping without
+    decoding or copying. The file structure is:
+
+    ::
+
+        example.memmap
+        ├── shard_000.bin
+        ├── shard_001.bin
+        ├── meta_info.txt
+
+    Each line in meta_info.txt records 1)image name (with extension),
+    2)image shape, 3)compression level (always 0), 4)shard index and 5)byte
+    offset in the shard, separated by a white space. The first three fields are
+    the same as the meta_info.txt of lmdb, so the paths can be read in the same
+    way. For example: `0001.png (480,480,3) 0 0 691200`.
+
+    We use the image name without extension as the key.
+
+    Args:
+        data_path (str): Data path for reading images.
+        memmap_path (str): Save path. It should end with '.memmap'.
+        img_path_list (str): Image path list.
+        keys (str): Used for keys.
+        shard_size_mb (int): Max size of a shard in MB. Default: 4096.
+        n_thread (int): Number of processes to read images. Default: 40.
+    """
+    assert len(img_path_list) == len(keys), ('img_path_list and keys should have the same length, '
+                                             f'but got {len(img_path_list)} and {len(keys)}')
+    print(f'Create memmap shards for {data_path}, save to {memmap_path}...')
+    if not memmap_path.endswith('.memmap'):
+        raise ValueError("memmap_path must end with '.memmap'.")
+    if osp.exists(memmap_path):
+        print(f'Folder {memmap_path} already exists. Exit.')
+        sys.exit(1)
+    os.makedirs(memmap_path)
+
+    shard_size = int(shard_size_mb * 1024 * 1024)
+    shard_idx, offset = 0, 0
+    shard_file = open(osp.join(memmap_path, f'shard_{shard_idx:03d}.bin'), 'wb')
+    txt_file = open(osp.join(memmap_path, 'meta_info.txt'), 'w')
+    pbar = tqdm(total=len(img_path_list), unit='image')
+    with Pool(n_thread) as pool:
+        # imap keeps the order; reading is slower than writing, so few results wait in memory
+        paths = [osp.join(data_path, path) for path in img_path_list]
+        for key, img in zip(keys, pool.imap(read_img_array_worker, paths, chunksize=4)):
+            pbar.update(1)
+            pbar.set_description(f'Write {key}')
+            if offset > 0 and offset + img.nbytes > shard_size:
+                shard_file.close()
+                shard_idx, offset = shard_idx + 1, 0
+                shard_file = open(osp.join(memmap_path, f'shard_{shard_idx:03d}.bin'), 'wb')
+            shard_file.write(img.tobytes())
+            h, w, c = img.shape
+            txt_file.write(f'{key}.png ({h},{w},{c}) 0 {shard_idx} {offset}\n')
+            offset += img.nbytes
+    pbar.close()
+    shard_file.close()
+    txt_file.close()
+    print('\nFinish writing memmap shards.')
+
+
+def read_img_array_worker(path):
+    """Read an image as a uint8 HWC array.
+
+    Args:
+        path (str): Image path.
+
+    Returns:
+        ndarray: Image with order HWC, BGR.
+    """
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    # the shards are read back as uint8, e.g., 16-bit png images would be corrupted
+    if img.dtype != np.uint8:
+        raise ValueError(f'Only uint8 images are supported by memmap shards, but got {img.dtype} for {path}.')
+    if img.ndim == 2:
+        img = img[..., None]
+    return img
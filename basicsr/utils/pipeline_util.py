@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
+
+
+def run_folder_pipeline(items,
+                        read_fn,
+                        infer_fn,
+                        write_fn,
+                        batch_size=1,
+                        num_read_workers=4,
+                        num_write_workers=2,
+                        queue_size=8,
+                        callback=None):
+    """Run decode -> forward -> encode as a bounded producer/consumer pipeline.
+
+    Items are decoded by a thread pool, grouped into batches of consecutive
+    items with the same array shape, passed to ``infer_fn`` on the calling
+    thread and handed to a second thread pool for encoding and writing. At most
+    ``queue_size`` decoded inputs and ``queue_size`` pending writes are held at
+    any time, so memory does not grow with the number of items. Items are
+    processed in order and batching never reorders them.
+
+    Args:
+        items (list): Items to process, e.g., image paths.
+        read_fn (callable): ``read_fn(item) -> ndarray | None``. Returning None
+            marks the item as failed.
+        infer_fn (callable): ``infer_fn(list[ndarray]) -> list``. Returns one
+            result per input.
+        write_fn (callable): ``write_fn(item, result)``.
+        batch_size (int): Maximum number of same-shape inputs per forward.
+            Default: 1.
+        num_read_workers (int): Number of decode threads. Default: 4.
+        num_write_workers (int): Number of encode/write threads. Default: 2.
+        queue_size (int): Bound of the decode and write queues. Default: 8.
+        callback (callable | None): ``callback(idx, item, error)`` called on the
+            calling thread once an item is written (error is None) or has
+            failed. Default: None.
+
+    Returns:
+        dict: Statistics with keys ``num_done``, ``num_failed``, ``time`` (s)
+            and ``throughput`` (images/s).
+    """
+    stats = {'num_done': 0, 'num_failed': 0}
+    decoded = queue.Queue(maxsize=queue_size)
+    read_pool = ThreadPoolExecutor(max_workers=num_read_workers)
+    write_pool = ThreadPoolExecutor(max_workers=num_write_workers)
+    stop = threading.Event()
+
+    def _produce():
+        try:
+            for idx, item in enumerate(items):
+                if stop.is_set():
+                    break
+                # blocks once queue_size decodes are in flight
+                decoded.put((idx, item, read_pool.submit(read_fn, item)))
+        finally:
+            decoded.put(_END)
+
+    def _report(idx, item, error):
+        stats['num_failed' if error is not None else 'num_done'] += 1
+        if callback is not None:
+            callback(idx, item, error)
+
+    pending_writes = deque()
+
+    def _finish_write():
+        idx, item, future = pending_writes.popleft()
+        try:
+            future.result()
+        except Exception as error:
+            _report(idx, item, error)
+        else:
+            _report(idx, item, None)
+
+    batch = []
+
+    def _flush():
+        if not batch:
+            return
+        try:
+            results = infer_fn([img for _, _, img in batch])
+        except Exception as error:
+            for idx, item, _ in batch:
+                _report(idx, item, error)
+        else:
+            for (idx, item, _), result in zip(batch, results):
+                pending_writes.append((idx, item, write_pool.submit(write_fn, item, result)))
+        batch.clear()
+        while len(pending_writes) > queue_size:
+            _finish_write()
+
+    start_time = time.perf_counter()
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            entry = decoded.get()
+            if entry is _END:
+                break
+            idx, item, future = entry
+            try:
+                img = future.result()
+            except Exception as error:
+                img, read_error = None, error
+            else:
+                read_error = None if img is not None else ValueError(f'Failed to read {item}.')
+            if img is None:
+                _report(idx, item, read_error)
+                continue
+            if batch and (len(batch) >= batch_size or batch[0][2].shape != img.shape):
+                _flush()
+            batch.append((idx, item, img))
+        _flush()
+        while pending_writes:
+            _finish_write()
+    finally:
+        stop.set()
+        # drain the queue so that a blocked producer can exit
+        while producer.is_alive():
+            try:
+                decoded.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        read_pool.shutdown(wait=True)
+        write_pool.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - start_time
+    stats['time'] = elapsed
+    stats['throughput'] = stats['num_done'] / elapsed if elapsed > 0 else 0.
+    return stats
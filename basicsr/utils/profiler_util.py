@@ -0,0 +1,211 @@
+import contextlib
+import json
+import os
+import time
+import torch
+from collections import OrderedDict
+
+from .logger import get_root_logger
+
+
+class StepProfiler():
+    """Break training iterations into timed sections.
+
+    Sections are timed with CUDA events on GPUs, so that the time of the
+    kernels launched in a section is measured instead of the time to launch
+    them, and the training is not synchronized. The events are resolved in
+    ``summary`` (once per logging interval). Host-side sections, such as
+    waiting for the dataloader, are timed with ``time.perf_counter``.
+
+    Optionally, all the sections are written to a JSON trace in the Chrome
+    trace event format (viewable in chrome://tracing or Perfetto), and
+    ``torch.profiler`` is run for a range of iterations with its traces saved
+    for TensorBoard.
+
+    A disabled profiler costs one function call per section.
+
+    Args:
+        enabled (bool): Whether to time the sections. Default: True.
+        trace_path (str | None): Path of the JSON trace. Default: None.
+        profiler_iters (list[int] | None): Iteration range [start, end] to run
+            ``torch.profiler`` for. Default: None.
+        profiler_dir (str | None): Folder of the ``torch.profiler`` traces.
+            Default: None.
+    """
+
+    def __init__(self, enabled=True, trace_path=None, profiler_iters=None, profiler_dir=None):
+        self.enabled = enabled
+        self.use_cuda = enabled and torch.cuda.is_available()
+        self.profiler_iters = profiler_iters
+        self.profiler_dir = profiler_dir
+        self._torch_profiler = None
+        self._current_iter = 0
+        self._paused = False
+        self._pending = []  # (iter, name, start, end), resolved in summary
+        self._trace_file = None
+        if enabled and trace_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+            # JSON array format: the closing bracket is optional, so that events can be appended
+            self._trace_file = open(trace_path, 'w')
+            self._trace_file.write('[\n')
+            self._num_trace_events = 0
+        if self.use_cuda:
+            self._origin_event = torch.cuda.Event(enable_timing=True)
+            self._origin_event.record()
+        self._origin_time = time.perf_counter()
+
+    def section(self, name, host=False):
+        """Time a section of the current iteration.
+
+        Args:
+            name (str): Section name, e.g., 'g_forward'.
+            host (bool): Time it on the host instead of with CUDA events.
+                Use it for sections that do not launch CUDA work, such as
+                waiting for data. Default: False.
+
+        Returns:
+            Context manager.
+        """
+        if not self.enabled or self._paused:
+            return contextlib.nullcontext()
+        return self._section(name, host)
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Do not time sections inside the context, e.g., during validation.
+
+        Otherwise, the sections of validation would be attributed to the
+        current training iteration and inflate its averages.
+        """
+        paused, self._paused = self._paused, True
+        try:
+            yield
+        finally:
+            self._paused = paused
+
+    @contextlib.contextmanager
+    def _section(self, name, host):
+        if self.use_cuda and not host:
+            start = torch.cuda.Event(enable_timing=True)
+            end = torch.cuda.Event(enable_timing=True)
+            start.record()
+            yield
+            end.record()
+        else:
+            start = time.perf_counter()
+            yield
+            end = time.perf_counter()
+        self._pending.append((self._current_iter, name, start, end))
+
+    def step(self, current_iter):
+        """Start a new iteration. Call it at the beginning of each iteration.
+
+        Args:
+            current_iter (int): The iteration to start.
+        """
+        self._current_iter = current_iter
+        if not self.enabled or not self.profiler_iters:
+            return
+        start_iter, end_iter = self.profiler_iters
+        if current_iter == start_iter and self._torch_profiler is None:
+            if not hasattr(torch, 'profiler'):
+                get_root_logger().warning('torch.profiler requires PyTorch >= 1.8.1. Skip it.')
+                self.profiler_iters = None
+                return
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._torch_profiler = torch.profiler.profile(
+                activities=activities,
+                record_shapes=True,
+                on_trace_ready=torch.profiler.tensorboard_trace_handler(self.profiler_dir))
+            self._torch_profiler.__enter__()
+        elif current_iter == end_iter + 1:
+            self._stop_torch_profiler()
+
+    def _stop_torch_profiler(self):
+        if self._torch_profiler is not None:
+            self._torch_profiler.__exit__(None, None, None)
+            self._torch_profiler = None
+            get_root_logger().info(f'torch.profiler traces are saved to {self.profiler_dir}.')
+
+    def _elapsed(self, start, end):
+        """Return the start (relative to the origin) and the duration of a section in ms."""
+        if isinstance(start, float):
+            return (start - self._origin_time) * 1000, (end - start) * 1000
+        return self._origin_event.elapsed_time(start), start.elapsed_time(end)
+
+    def summary(self):
+        """Resolve the timed sections since the last summary.
+
+        It synchronizes CUDA once and appends the sections to the JSON trace.
+
+        Returns:
+            OrderedDict: Average time per iteration (ms) of each section.
+        """
+        if not self.enabled or not self._pending:
+            return OrderedDict()
+        if self.use_cuda:
+            torch.cuda.synchronize()
+        totals = OrderedDict()
+        iters = set()
+        trace_events = []
+        for current_iter, name, start, end in self._pending:
+            ts, duration = self._elapsed(start, end)
+            totals[name] = totals.get(name, 0) + duration
+            iters.add(current_iter)
+            if self._trace_file is not None:
+                trace_events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': ts * 1000,  # us
+                    'dur': duration * 1000,
+                    'pid': 0,
+                    'tid': 0 if isinstance(start, float) else 1,  # 0: host, 1: cuda
+                    'args': {
+                        'iter': current_iter
+                    }
+                })
+        self._pending = []
+        if trace_events:
+            for event in trace_events:
+                prefix = ',\n' if self._num_trace_events > 0 else ''
+                self._trace_file.write(prefix + json.dumps(event))
+                self._num_trace_events += 1
+            self._trace_file.flush()
+        return OrderedDict((name, total / len(iters)) for name, total in totals.items())
+
+    def close(self):
+        """Stop torch.profiler and close the JSON trace."""
+        self._stop_torch_profiler()
+        if self._trace_file is not None:
+            self.summary()
+            self._trace_file.write('\n]\n')
+            self._trace_file.close()
+            self._trace_file = None
+
+
+def build_step_profiler(opt, log_dir=None):
+    """Build a StepProfiler from the ``logger: profiler`` option.
+
+    Args:
+        opt (dict | None): Config with optional keys ``trace`` (bool, write a
+            JSON trace), ``profiler_iters`` ([start, end]) and ``enabled``.
+            None returns a disabled profiler.
+        log_dir (str | None): Folder of the JSON trace and the torch.profiler
+            traces. Default: None.
+
+    Returns:
+        StepProfiler: The profiler.
+    """
+    if not opt:
+        return StepProfiler(enabled=False)
+    trace_path = None
+    if opt.get('trace', True) and log_dir is not None:
+        trace_path = os.path.join(log_dir, 'step_trace.json')
+    profiler_dir = None if log_dir is None else os.path.join(log_dir, 'torch_profiler')
+    return StepProfiler(
+        enabled=opt.get('enabled', True),
+        trace_path=trace_path,
+        profiler_iters=opt.get('profiler_iters'),
+        profiler_dir=profiler_dir)
@@ -1,4 +1,12 @@
 # Modified from: https://github.com/facebookresearch/fvcore/blob/master/fvcore/common/registry.py  # noqa: E501
+import importlib
+import os
+import re
+from os import path as osp
+
+# matches ``@XXX_REGISTRY.register()`` / ``@XXX_REGISTRY.register(suffix='basicsr')`` followed by a class or function
+_REGISTER_PATTERN = re.compile(r'^@(\w+)\.register\((?:suffix=[\'"](\w+)[\'"])?\)\s*\n(?:@.*\n)*(?:class|def)\s+(\w+)',
+                               re.MULTILINE)
 
 
 class Registry():
@@ -25,15 +33,33 @@ class Registry():
     .. code-block:: python
 
         BACKBONE_REGISTRY.register(MyBackbone)
+
+    To register an object lazily, i.e., its module is only imported when the
+    object is first requested by ``get``:
+
+    .. code-block:: python
+
+        BACKBONE_REGISTRY.register_lazy('MyBackbone', 'my_package.my_backbone')
     """
 
-    def __init__(self, name):
+    def __init__(self, name, package=None):
         """
         Args:
             name (str): the name of this registry
+            package (str | None): the package that registers the objects of
+                this registry when imported. It is imported before the first
+                lookup, since ``basicsr`` no longer imports its subpackages
+                eagerly. Default: None.
         """
         self._name = name
+        self._package = package
         self._obj_map = {}
+        self._lazy_map = {}  # name -> module to import
+
+    def _import_package(self):
+        if self._package is not None:
+            importlib.import_module(self._package)
+            self._package = None
 
     def _do_register(self, name, obj, suffix=None):
         if isinstance(suffix, str):
@@ -42,6 +68,36 @@ class Registry():
         assert (name not in self._obj_map), (f"An object named '{name}' was already registered "
                                              f"in '{self._name}' registry!")
         self._obj_map[name] = obj
+        self._lazy_map.pop(name, None)
+
+    def register_lazy(self, name, module):
+        """Register the name of an object whose module is imported on demand.
+
+        Args:
+            name (str): Registered name (including the suffix, if any).
+            module (str): Module that registers the object when imported.
+        """
+        if name in self._obj_map:
+            return
+        assert self._lazy_map.get(name, module) == module, (f"An object named '{name}' was already registered "
+                                                            f"in '{self._name}' registry!")
+        self._lazy_map[name] = module
+
+    def _lookup(self, name):
+        self._import_package()
+        ret = self._obj_map.get(name)
+        if ret is None and name in self._lazy_map:
+            importlib.import_module(self._lazy_map[name])
+            self._lazy_map.pop(name, None)
+            ret = self._obj_map.get(name)
+        return ret
+
+    def import_lazy_modules(self):
+        """Import all modules registered lazily."""
+        self._import_package()
+        for module in sorted(set(self._lazy_map.values())):
+            importlib.import_module(module)
+        self._lazy_map.clear()
 
     def register(self, obj=None, suffix=None):
         """
@@ -63,26 +119,55 @@ class Registry():
         self._do_register(name, obj, suffix)
 
     def get(self, name, suffix='basicsr'):
-        ret = self._obj_map.get(name)
+        ret = self._lookup(name)
         if ret is None:
-            ret = self._obj_map.get(name + '_' + suffix)
+            ret = self._lookup(name + '_' + suffix)
             print(f'Name {name} is not found, use name: {name}_{suffix}!')
         if ret is None:
             raise KeyError(f"No object named '{name}' found in '{self._name}' registry!")
         return ret
 
     def __contains__(self, name):
-        return name in self._obj_map
+        self._import_package()
+        return name in self._obj_map or name in self._lazy_map
 
     def __iter__(self):
+        self.import_lazy_modules()
         return iter(self._obj_map.items())
 
     def keys(self):
-        return self._obj_map.keys()
+        self._import_package()
+        return list(self._obj_map.keys()) + list(self._lazy_map.keys())
+
 
+def scan_registered_names(folder, package, file_suffix, registry_var):
+    """Build a name -> module index by scanning source files, without importing them.
 
-DATASET_REGISTRY = Registry('dataset')
-ARCH_REGISTRY = Registry('arch')
-MODEL_REGISTRY = Registry('model')
-LOSS_REGISTRY = Registry('loss')
-METRIC_REGISTRY = Registry('metric')
+    Args:
+        folder (str): Folder of the package.
+        package (str): Package name, e.g., 'basicsr.archs'.
+        file_suffix (str): Only scan files ending with it, e.g., '_arch.py'.
+        registry_var (str): Variable name of the registry used in the
+            decorator, e.g., 'ARCH_REGISTRY'.
+
+    Returns:
+        dict: Registered name -> module name.
+    """
+    index = {}
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(file_suffix):
+            continue
+        module = f'{package}.{osp.splitext(osp.basename(filename))[0]}'
+        with open(osp.join(folder, filename), 'r', encoding='utf-8') as f:
+            source = f.read()
+        for var, suffix, name in _REGISTER_PATTERN.findall(source):
+            if var == registry_var:
+                index[f'{name}_{suffix}' if suffix else name] = module
+    return index
+
+
+DATASET_REGISTRY = Registry('dataset', 'basicsr.data')
+ARCH_REGISTRY = Registry('arch', 'basicsr.archs')
+MODEL_REGISTRY = Registry('model', 'basicsr.models')
+LOSS_REGISTRY = Registry('loss', 'basicsr.losses')
+METRIC_REGISTRY = Registry('metric', 'basicsr.metrics')
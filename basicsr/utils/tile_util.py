@@ -0,0 +1,137 @@
+import torch
+from torch.nn import functional as F
+
+
+def _tile_starts(length, tile_size, stride):
+    """Start offsets of tiles along one axis.
+
+    The last tile is aligned to the end of the axis so that every tile has the
+    same size and no tile hangs over the border.
+    """
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def _feather_ramp(length, ramp_head, ramp_tail, dtype, device):
+    """1D blending weights: linear ramps at the overlapping ends, ones elsewhere.
+
+    Ramp values never reach zero, so every output pixel keeps a positive total
+    weight after accumulation.
+    """
+    weight = torch.ones(length, dtype=dtype, device=device)
+    if ramp_head > 0:
+        ramp_head = min(ramp_head, length)
+        weight[:ramp_head] = (torch.arange(ramp_head, dtype=dtype, device=device) + 0.5) / ramp_head
+    if ramp_tail > 0:
+        ramp_tail = min(ramp_tail, length)
+        ramp = (torch.arange(ramp_tail, dtype=dtype, device=device) + 0.5) / ramp_tail
+        weight[-ramp_tail:] = torch.minimum(weight[-ramp_tail:], ramp.flip(0))
+    return weight
+
+
+def pad_to_window(img, window_size):
+    """Reflect-pad the bottom/right of an image to a multiple of window_size.
+
+    Args:
+        img (Tensor): Input with shape (n, c, h, w).
+        window_size (int): Window size of the network (e.g., 8 for SwinIR).
+            Values <= 1 disable padding.
+
+    Returns:
+        tuple[Tensor, int, int]: Padded image, bottom padding and right padding.
+    """
+    if window_size <= 1:
+        return img, 0, 0
+    _, _, h, w = img.size()
+    mod_pad_h = (window_size - h % window_size) % window_size
+    mod_pad_w = (window_size - w % window_size) % window_size
+    if mod_pad_h or mod_pad_w:
+        # reflect padding requires the pad to be smaller than the input size
+        mode = 'reflect' if mod_pad_h < h and mod_pad_w < w else 'replicate'
+        img = F.pad(img, (0, mod_pad_w, 0, mod_pad_h), mode)
+    return img, mod_pad_h, mod_pad_w
+
+
+@torch.no_grad()
+def tile_inference(model, img, scale=None, tile_size=0, tile_overlap=16, window_size=1, device=None, out_device='cpu'):
+    """Run an SR network on an image tile by tile with feathered seam blending.
+
+    The image is split into tiles of ``tile_size`` that overlap by
+    ``tile_overlap`` pixels. Each tile is (optionally) padded to a multiple of
+    ``window_size``, upsampled by the network and weighted by a linear ramp in
+    the overlapping area before being accumulated into the output. Only one
+    tile lives on ``device`` at any time, so network memory is bounded by the
+    tile size rather than by the input resolution.
+
+    Args:
+        model (nn.Module): SR network.
+        img (Tensor): Input with shape (n, c, h, w), range [0, 1].
+        scale (int | None): Upsampling factor of the network. If None, it is
+            inferred from the output of the first tile. Default: None.
+        tile_size (int): Tile size in input pixels. 0 disables tiling and runs
+            the whole image in one forward pass. Default: 0.
+        tile_overlap (int): Overlap between neighbouring tiles in input pixels.
+            Default: 16.
+        window_size (int): Pad each tile to a multiple of this value, e.g., the
+            window size of SwinIR. Default: 1.
+        device (torch.device | None): Device for the forward passes. If None,
+            use the device of the model parameters. Default: None.
+        out_device (torch.device | str): Device holding the accumulated output.
+            Default: 'cpu'.
+
+    Returns:
+        Tensor: Output with shape (n, c_out, h * scale, w * scale) on
+            ``out_device``.
+    """
+    if device is None:
+        device = next(model.parameters()).device
+    n, _, h, w = img.size()
+
+    if tile_size <= 0 or (h <= tile_size and w <= tile_size):
+        inp, mod_pad_h, mod_pad_w = pad_to_window(img.to(device), window_size)
+        output = model(inp)
+        if scale is None:
+            scale = output.size(2) // inp.size(2)
+        output = output[:, :, :h * scale, :w * scale]
+        return output.to(out_device)
+
+    if tile_overlap < 0 or tile_overlap >= tile_size:
+        raise ValueError(f'tile_overlap should be in [0, tile_size), but got {tile_overlap} (tile_size={tile_size}).')
+    tile_h, tile_w = min(tile_size, h), min(tile_size, w)
+    stride = tile_size - tile_overlap
+    starts_y = _tile_starts(h, tile_h, stride)
+    starts_x = _tile_starts(w, tile_w, stride)
+
+    output = None
+    weight_sum = None
+    for y0 in starts_y:
+        for x0 in starts_x:
+            tile = img[:, :, y0:y0 + tile_h, x0:x0 + tile_w].to(device)
+            tile, _, _ = pad_to_window(tile, window_size)
+            out_tile = model(tile)
+            if scale is None:
+                scale = out_tile.size(2) // tile.size(2)
+            out_tile = out_tile[:, :, :tile_h * scale, :tile_w * scale].float()
+
+            if output is None:
+                output = torch.zeros((n, out_tile.size(1), h * scale, w * scale),
+                                     dtype=torch.float32,
+                                     device=out_device)
+                weight_sum = torch.zeros((1, 1, h * scale, w * scale), dtype=torch.float32, device=out_device)
+
+            ramp = tile_overlap * scale
+            weight_y = _feather_ramp(tile_h * scale, ramp if y0 > 0 else 0, ramp if y0 + tile_h < h else 0,
+                                     out_tile.dtype, out_tile.device)
+            weight_x = _feather_ramp(tile_w * scale, ramp if x0 > 0 else 0, ramp if x0 + tile_w < w else 0,
+                                     out_tile.dtype, out_tile.device)
+            weight = (weight_y[:, None] * weight_x[None, :])[None, None]
+
+            oy, ox = y0 * scale, x0 * scale
+            output[:, :, oy:oy + tile_h * scale, ox:ox + tile_w * scale] += (out_tile * weight).to(out_device)
+            weight_sum[:, :, oy:oy + tile_h * scale, ox:ox + tile_w * scale] += weight.to(out_device)
+            del tile, out_tile
+
+    return output.div_(weight_sum)
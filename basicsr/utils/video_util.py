@@ -0,0 +1,271 @@
+import json
+import numpy as np
+import subprocess
+import tempfile
+import torch
+
+from basicsr.utils.img_util import tensor2img
+
+
+def get_video_meta_info(video_path, ffprobe_bin='ffprobe'):
+    """Get width, height, fps and number of frames of a video with ffprobe.
+
+    Args:
+        video_path (str): Video path.
+        ffprobe_bin (str): ffprobe executable. Default: 'ffprobe'.
+
+    Returns:
+        dict: Meta info with keys ``width``, ``height``, ``fps``, ``nb_frames``
+            (None if unknown) and ``audio`` (whether an audio stream exists).
+    """
+    cmd = [
+        ffprobe_bin, '-v', 'error', '-show_entries', 'stream=codec_type,width,height,avg_frame_rate,nb_frames', '-of',
+        'json', video_path
+    ]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    streams = json.loads(result.stdout.decode())['streams']
+    video_streams = [stream for stream in streams if stream.get('codec_type') == 'video']
+    if not video_streams:
+        raise ValueError(f'No video stream found in {video_path}.')
+    video = video_streams[0]
+    num, den = video.get('avg_frame_rate', '0/1').split('/')
+    fps = float(num) / float(den) if float(den) != 0 else 0.
+    nb_frames = video.get('nb_frames')
+    return {
+        'width': int(video['width']),
+        'height': int(video['height']),
+        'fps': fps if fps > 0 else 30.,
+        'nb_frames': int(nb_frames) if nb_frames and nb_frames.isdigit() else None,
+        'audio': any(stream.get('codec_type') == 'audio' for stream in streams)
+    }
+
+
+class FFmpegVideoReader(object):
+    """Decode a video to RGB uint8 frames through an ffmpeg rawvideo pipe.
+
+    No frames are written to disk; only the frames requested by
+    :meth:`read_frames` are held in memory.
+
+    Args:
+        video_path (str): Input video path.
+        ffmpeg_bin (str): ffmpeg executable. Default: 'ffmpeg'.
+        ffprobe_bin (str): ffprobe executable. Default: 'ffprobe'.
+    """
+
+    def __init__(self, video_path, ffmpeg_bin='ffmpeg', ffprobe_bin='ffprobe'):
+        self.meta = get_video_meta_info(video_path, ffprobe_bin)
+        self.width = self.meta['width']
+        self.height = self.meta['height']
+        self.fps = self.meta['fps']
+        self.nb_frames = self.meta['nb_frames']
+        self._frame_bytes = self.width * self.height * 3
+        cmd = [
+            ffmpeg_bin, '-loglevel', 'error', '-i', video_path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-vsync', '0',
+            'pipe:1'
+        ]
+        # stderr goes to a temp file rather than a pipe, so that ffmpeg never blocks on a full stderr pipe
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=self._stderr)
+        self._eof = False
+
+    def read_frame(self):
+        """Read one frame.
+
+        Returns:
+            ndarray | None: Frame with shape (h, w, 3), RGB, uint8. None at the
+                end of the stream.
+        """
+        buffer = self._process.stdout.read(self._frame_bytes)
+        if len(buffer) < self._frame_bytes:
+            self._eof = True
+            return None
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def read_frames(self, num_frames):
+        """Read up to ``num_frames`` frames; fewer are returned at the end."""
+        frames = []
+        for _ in range(num_frames):
+            frame = self.read_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+        return frames
+
+    def close(self):
+        """Close the pipe and wait for ffmpeg.
+
+        Raises:
+            RuntimeError: If the stream has been read to the end but ffmpeg
+                exited with an error, e.g., a truncated or corrupted video.
+                Closing before the end of the stream is not an error.
+        """
+        self._process.stdout.close()
+        if not self._eof:
+            self._process.terminate()
+        returncode = self._process.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(errors='replace').strip()
+        self._stderr.close()
+        if self._eof and returncode != 0:
+            raise RuntimeError(f'ffmpeg exited with code {returncode}: {stderr}')
+
+
+class FFmpegVideoWriter(object):
+    """Encode RGB uint8 frames to a video through an ffmpeg rawvideo pipe.
+
+    Args:
+        video_path (str): Output video path.
+        width (int): Frame width.
+        height (int): Frame height.
+        fps (float): Frame rate.
+        audio_path (str | None): If given, copy the audio stream (if any) of
+            this file into the output. Default: None.
+        codec (str): Video codec. Default: 'libx264'.
+        crf (int): Constant rate factor of the encoder. Default: 18.
+        ffmpeg_bin (str): ffmpeg executable. Default: 'ffmpeg'.
+    """
+
+    def __init__(self, video_path, width, height, fps, audio_path=None, codec='libx264', crf=18, ffmpeg_bin='ffmpeg'):
+        self.width = width
+        self.height = height
+        cmd = [
+            ffmpeg_bin, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+            '-r', f'{fps}', '-i', 'pipe:0'
+        ]
+        if audio_path is not None:
+            cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a?', '-c:a', 'copy']
+        cmd += ['-c:v', codec, '-crf', str(crf), '-pix_fmt', 'yuv420p', video_path]
+        # stderr goes to a temp file rather than a pipe, so that ffmpeg never blocks on a full stderr pipe
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def write_frame(self, frame):
+        """Write one frame with shape (h, w, 3), RGB, uint8."""
+        if frame.shape != (self.height, self.width, 3):
+            raise ValueError(f'Frame shape {frame.shape} does not match ({self.height}, {self.width}, 3).')
+        self._process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+
+    def close(self):
+        """Close the pipe and wait for ffmpeg to finish encoding.
+
+        Raises:
+            RuntimeError: If ffmpeg exited with an error, e.g., an unsupported
+                codec or an unwritable output path.
+        """
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg has exited, its error is reported below
+        returncode = self._process.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(errors='replace').strip()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f'ffmpeg exited with code {returncode}: {stderr}')
+
+
+def get_overlap_windows(num_frames, interval, context=0):
+    """Split a sequence into chunks with warm-up context frames on each side.
+
+    Recurrent video networks (e.g., BasicVSR) propagate features through the
+    whole input, so a chunk that starts cold has worse quality at its
+    boundaries. Each chunk is therefore extended by ``context`` frames on both
+    sides; the outputs of these context frames are discarded.
+
+    Args:
+        num_frames (int): Number of frames of the sequence.
+        interval (int): Number of frames kept from each chunk.
+        context (int): Number of warm-up frames on each side. Default: 0.
+
+    Returns:
+        list[tuple[int]]: (window_start, window_end, keep_start, keep_end) for
+            each chunk. Frames [window_start, window_end) are fed to the
+            network and outputs of frames [keep_start, keep_end) are kept.
+    """
+    if interval <= 0:
+        raise ValueError(f'interval should be positive, but got {interval}.')
+    if context < 0:
+        raise ValueError(f'context should be non-negative, but got {context}.')
+    windows = []
+    for keep_start in range(0, num_frames, interval):
+        keep_end = min(keep_start + interval, num_frames)
+        windows.append((max(0, keep_start - context), min(num_frames, keep_end + context), keep_start, keep_end))
+    return windows
+
+
+def stream_inference(model, video_path, output_video_path, interval, device, context=0, callback=None):
+    """Super-resolve a video through ffmpeg rawvideo pipes, chunk by chunk.
+
+    Frames are decoded by :class:`FFmpegVideoReader`, fed to a recurrent video
+    network in chunks of ``interval`` frames and encoded by
+    :class:`FFmpegVideoWriter` (with the audio of the input), so no frame is
+    written to disk. As :func:`get_overlap_windows`, each chunk is extended by
+    ``context`` warm-up frames on both sides and their outputs are discarded.
+    Memory depends on ``interval + 2 * context`` only, not on the video length.
+
+    Args:
+        model (nn.Module): Video network that maps (1, t, c, h, w) RGB frames
+            in [0, 1] to (1, t, c, h', w').
+        video_path (str): Input video path.
+        output_video_path (str): Output video path.
+        interval (int): Number of frames kept from each chunk.
+        device (torch.device): Device of the model.
+        context (int): Number of warm-up frames on each side. Default: 0.
+        callback (callable | None): ``callback(num_done, num_frames)`` called
+            after each frame is written. ``num_frames`` is None if the number
+            of frames is unknown. Default: None.
+
+    Returns:
+        int: Number of frames written.
+    """
+    if interval <= 0:
+        raise ValueError(f'interval should be positive, but got {interval}.')
+    if context < 0:
+        raise ValueError(f'context should be non-negative, but got {context}.')
+    reader = FFmpegVideoReader(video_path)
+    writer = None
+    buffer, buffer_start = [], 0  # frames [buffer_start, buffer_start + len(buffer)) of the video
+    keep_start = 0
+    eof = False
+    try:
+        while True:
+            # read ahead so that the chunk has `context` future frames
+            while not eof and buffer_start + len(buffer) < keep_start + interval + context:
+                frame = reader.read_frame()
+                if frame is None:
+                    eof = True
+                else:
+                    buffer.append(frame)
+            num_read = buffer_start + len(buffer)
+            if keep_start >= num_read:
+                break
+            keep_end = min(keep_start + interval, num_read)
+            window_start, window_end = max(0, keep_start - context), min(num_read, keep_end + context)
+
+            frames = buffer[window_start - buffer_start:window_end - buffer_start]
+            # RGB uint8 (t, h, w, c) -> float (1, t, c, h, w), the same as read_img_seq
+            imgs = torch.from_numpy(np.stack(frames).transpose(0, 3, 1, 2)).float().div_(255.)
+            imgs = imgs.unsqueeze(0).to(device)
+            with torch.no_grad():
+                outputs = model(imgs)
+            outputs = outputs.squeeze(0)[keep_start - window_start:keep_end - window_start]
+
+            for idx, output in enumerate(outputs):
+                output = tensor2img(output, rgb2bgr=False)
+                if writer is None:
+                    writer = FFmpegVideoWriter(
+                        output_video_path, output.shape[1], output.shape[0], reader.fps, audio_path=video_path)
+                writer.write_frame(output)
+                if callback is not None:
+                    callback(keep_start + idx + 1, reader.nb_frames)
+
+            # only the past context of the next chunk has to stay in memory
+            num_drop = max(0, keep_end - context - buffer_start)
+            buffer = buffer[num_drop:]
+            buffer_start += num_drop
+            keep_start = keep_end
+    finally:
+        reader.close()
+        if writer is not None:
+            writer.close()
+    return keep_start
@@ -0,0 +1,5 @@
+# GENERATED VERSION FILE
+# TIME: Sun Oct 18 12:18:28 2026
+__version__ = '1.4.2'
+__gitsha__ = '9c85336'
+version_info = (1, 4, 2)
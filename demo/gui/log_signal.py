@@ -3,4 +3,9 @@ from PyQt5.QtCore import QObject, pyqtSignal
 
 class LogSignal(QObject):
     """信号类，用于在不同模块之间传递日志信息"""
-    log_signal = pyqtSignal(str)
\ No newline at end of file
+    log_signal = pyqtSignal(str)
+
+
+class WorkerEventSignal(QObject):
+    """信号类，用于把常驻推理进程的事件从监听线程转到 UI 线程"""
+    worker_event_signal = pyqtSignal(object)
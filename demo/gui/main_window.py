@@ -124,6 +124,11 @@ class InferenceGUI(QMainWindow):
         if event.key() == Qt.Key_Escape:
             self.close()
 
+    def closeEvent(self, event):
+        """关闭窗口时结束常驻推理进程"""
+        self.runner.shutdown()
+        super().closeEvent(event)
+
     def create_shortcuts(self):
         """ENTER 启动程序"""
         enter_start = QAction('enter', self)
@@ -223,6 +228,9 @@ class InferenceGUI(QMainWindow):
 
     def stop_inference(self):
         """停止推理"""
+        if self.runner.job_id is not None:
+            self.runner.cancel()
+            self.log_message("INFO", "用户终止运行")
         if self.process:
             self.process.terminate()
             self.log_message("INFO", "用户终止运行")
@@ -8,8 +8,9 @@ from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from gui.log_signal import LogSignal
 from logic.config_manager import ConfigManager
-from logic.utils import (contains_chinese, show_warning_chinese, show_warning_path, get_model_info, check_file_type,
-                         show_warning_file, open_output_folder)
+from logic.utils import (contains_chinese, show_warning_chinese, show_warning_path, get_model_info, get_model_path,
+                         check_file_type, show_warning_file, open_output_folder)
+from logic.inference_worker import InferenceWorker
 
 # from gui.image_display import display_images
 from gui.image_display import display_images
@@ -20,6 +21,8 @@ class InferenceGUI(QMainWindow):
     # 信号，用来显示对比图像
     display_signal = pyqtSignal(str, str)
     # display_video_signal = pyqtSignal(str, str)
+    # 信号，将常驻推理进程的事件转到 UI 线程
+    worker_event_signal = pyqtSignal(object)
 
 
     def __init__(self):
@@ -39,6 +42,11 @@ class InferenceGUI(QMainWindow):
         self.display_signal.connect(self.display_comparison_dialog)
         # self.display_video_signal.connect(self.display_video)
 
+        # 常驻推理进程: 图片/文件夹任务复用已加载的 torch 与模型
+        self.worker = InferenceWorker(self.worker_event_signal.emit)
+        self.worker_event_signal.connect(self.handle_worker_event)
+        self.worker_job = None
+
 
     def init_ui(self):
         """初始化UI组件"""
@@ -164,6 +172,42 @@ class InferenceGUI(QMainWindow):
         if event.key() == Qt.Key_Escape:
             self.close()
 
+    def closeEvent(self, event):
+        """关闭窗口时结束常驻推理进程"""
+        self.worker.shutdown()
+        super().closeEvent(event)
+
+    def handle_worker_event(self, event):
+        """处理常驻推理进程回传的事件 (UI 线程)"""
+        if event['type'] == 'ready':
+            self.log_message("INFO", event['message'])
+            return
+        job = self.worker_job
+        if job is None or event['job_id'] != job['job_id']:
+            return  # 已取消任务的残留事件
+
+        if event['type'] in ('log', 'progress'):
+            self.log_message("INFO", event['message'])
+        elif event['type'] == 'error' and not event.get('fatal'):
+            self.log_message("ERROR", event['message'])
+        else:
+            if event['type'] == 'done':
+                self.log_message("INFO", event['message'])
+                self.log_message("SUCCESS", "推理完成")
+            elif event['type'] == 'cancelled':
+                self.log_message("INFO", event['message'])
+            else:
+                self.log_message("ERROR", event['message'])
+            self.worker_job = None
+            self.start_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
+
+            if event['type'] == 'done' and event['outputs']:
+                # 单图片或文件夹中第一张图像的对比
+                input_image_path, output_image_path = event['outputs'][0]
+                self.log_message("SUCCESS", "展示对比图片" if job['input_type'] == 'image' else "仅展示第一张对比图片")
+                self.display_signal.emit(input_image_path, output_image_path)
+
     def load_config(self):
         """加载配置文件"""
         config = ConfigManager.load()
@@ -214,6 +258,11 @@ class InferenceGUI(QMainWindow):
 
     def stop_inference(self):
         """停止推理"""
+        if self.worker_job is not None:
+            # 只取消当前任务, 常驻进程与已加载模型保留
+            self.worker.cancel(self.worker_job['job_id'])
+            self.worker_job = None
+            self.log_message("INFO", "推理已取消")
         if self.process:
             self.process.terminate()
             self.log_message("INFO", "推理已取消")
@@ -261,6 +310,13 @@ class InferenceGUI(QMainWindow):
         self.log_message("INFO", f"使用模型: {model_type}, 脚本: {script}")
         # print(f"使用模型: {model_type}, 脚本: {script}")
 
+        model_path = get_model_path(model_type, scale)
+        if input_type in ('image', 'folder') and model_path is not None:
+            # 图片/文件夹任务提交给常驻推理进程, 不再为每次推理启动新进程
+            job_id = self.worker.submit(model_type, model_path, scale, input_type, input_path, output_path)
+            self.worker_job = {'job_id': job_id, 'input_type': input_type}
+            return
+
         def execute():
             """执行推理"""
             try:
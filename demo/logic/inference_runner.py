@@ -1,20 +1,75 @@
+import os
+import re
 import threading
 import multiprocessing
+from gui.log_signal import WorkerEventSignal
 from inference_process import run_inference_process
+from logic.inference_worker import InferenceWorker
 
 
 class InferenceRunner:
-    """处理推理的类，负责启动推理进程或线程，并更新日志信息。"""
+    """处理推理的类，负责启动推理进程或线程，并更新日志信息。
+
+    图片/文件夹任务提交给常驻推理进程 (InferenceWorker)，模型只加载一次；视频任务仍使用独立进程。
+    """
 
     def __init__(self, gui):
         self.gui = gui
+        # 事件在监听线程中产生, 经 Qt 信号转到 UI 线程后再更新按钮状态
+        self.worker_signal = WorkerEventSignal()
+        self.worker_signal.worker_event_signal.connect(self._on_worker_event)
+        self.worker = InferenceWorker(self.worker_signal.worker_event_signal.emit)
+        self.job_id = None
 
     def start(self, input_path, model_path, output_folder):
         if self.gui.video_radio.isChecked():
             self._start_process(input_path, model_path, output_folder)
-        else:
+        elif not self._start_worker(input_path, model_path, output_folder):
             self._start_thread(input_path, model_path, output_folder)
 
+    def cancel(self):
+        """取消常驻进程中的当前任务"""
+        if self.job_id is not None:
+            self.worker.cancel(self.job_id)
+            self.job_id = None
+
+    def shutdown(self):
+        self.worker.shutdown()
+
+    def _start_worker(self, input_path, model_path, output_folder):
+        arch = self.gui.model_selection_combo.currentText()
+        if arch == 'ESRGAN':
+            scale = 4
+        elif arch == 'EDSR':
+            # EDSR 的放大倍数从权重文件名中解析, 例如 EDSR_Mx2_f64b16.pth
+            match = re.search(r'x(\d)', os.path.basename(model_path))
+            if match is None:
+                return False
+            scale = int(match.group(1))
+        else:
+            return False
+        input_type = 'image' if self.gui.file_radio.isChecked() else 'folder'
+        self.job_id = self.worker.submit(arch, model_path, scale, input_type, input_path, output_folder)
+        return True
+
+    def _on_worker_event(self, event):
+        """处理常驻推理进程回传的事件 (UI 线程)"""
+        if event['type'] == 'ready':
+            self.gui.log_message("INFO", event['message'])
+            return
+        if event['job_id'] != self.job_id:
+            return
+        if event['type'] in ('log', 'progress'):
+            self.gui.log_message("INFO", event['message'])
+        elif event['type'] == 'error' and not event.get('fatal'):
+            self.gui.log_message("ERROR", event['message'])
+        else:
+            level = {'done': "SUCCESS", 'cancelled': "INFO"}.get(event['type'], "ERROR")
+            self.gui.log_message(level, event['message'])
+            self.job_id = None
+            self.gui.start_button.setEnabled(True)
+            self.gui.stop_button.setEnabled(False)
+
     def _start_thread(self, input_path, model_path, output_folder):
         thread = threading.Thread(target=self.gui.run_inference, args=(input_path, model_path, output_folder))
         thread.start()
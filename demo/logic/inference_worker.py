@@ -0,0 +1,224 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+
+def _build_model(arch, scale):
+    """根据网络名称构建模型 (在 worker 进程中调用)"""
+    from basicsr.archs.edsr_arch import EDSR
+    from basicsr.archs.rrdbnet_arch import RRDBNet
+
+    if arch == 'ESRGAN':
+        return RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32)
+    elif arch == 'EDSR':
+        return EDSR(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=16, upscale=scale)
+    raise ValueError(f'Unsupported arch for the resident worker: {arch}')
+
+
+class ModelCache:
+    """按 (arch, 模型路径, 设备) 缓存已加载模型的 LRU, 超出容量时释放最久未使用的模型"""
+
+    def __init__(self, capacity=2):
+        self.capacity = capacity
+        self._models = OrderedDict()
+
+    def get(self, arch, model_path, device, scale):
+        import torch
+
+        key = (arch, os.path.abspath(model_path), str(device))
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key], True
+
+        model = _build_model(arch, scale)
+        loadnet = torch.load(model_path, map_location=torch.device('cpu'))
+        keyname = 'params_ema' if 'params_ema' in loadnet else 'params'
+        model.load_state_dict(loadnet[keyname], strict=arch != 'ESRGAN')
+        model.eval()
+        model = model.to(device)
+
+        self._models[key] = model
+        while len(self._models) > self.capacity:
+            self._models.popitem(last=False)
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        return model, False
+
+
+def _list_images(input_type, input_path):
+    if input_type == 'image':
+        return [input_path]
+    return sorted(
+        os.path.join(input_path, name) for name in os.listdir(input_path)
+        if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(input_path, name)))
+
+
+def _run_job(job, cache, device, cancel_job_id, emit):
+    """在 worker 进程中执行一个推理任务, 通过 emit 回传结构化事件"""
+    import cv2
+    import numpy as np
+    import torch
+
+    from basicsr.utils.tile_util import tile_inference
+
+    job_id = job['job_id']
+    start_time = time.perf_counter()
+    model, cached = cache.get(job['arch'], job['model_path'], device, job['scale'])
+    emit({'job_id': job_id, 'type': 'log', 'message': f"{'复用已加载模型' if cached else '载入模型完成'}: {job['arch']}"})
+
+    image_paths = _list_images(job['input_type'], job['input_path'])
+    total = len(image_paths)
+    outputs = []
+    for idx, path in enumerate(image_paths):
+        if cancel_job_id.value == job_id:
+            emit({'job_id': job_id, 'type': 'cancelled', 'message': '推理已取消'})
+            return
+
+        imgname = os.path.splitext(os.path.basename(path))[0]
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            emit({'job_id': job_id, 'type': 'error', 'message': f'Error: failed to read {path}', 'fatal': False})
+            continue
+        img = img.astype(np.float32) / 255.
+        img = torch.from_numpy(np.transpose(img[:, :, [2, 1, 0]], (2, 0, 1))).float()
+        img = img.unsqueeze(0).to(device)
+        with torch.no_grad():
+            output = tile_inference(model, img, tile_size=job.get('tile', 0))
+        output = output.data.squeeze().float().cpu().clamp_(0, 1).numpy()
+        output = np.transpose(output[[2, 1, 0], :, :], (1, 2, 0))
+        output = (output * 255.0).round().astype(np.uint8)
+        output_path = os.path.join(job['output_path'], f"{imgname}_{job['arch']}.png").replace(os.sep, '/')
+        cv2.imwrite(output_path, output)
+        outputs.append((path.replace(os.sep, '/'), output_path))
+
+        emit({
+            'job_id': job_id,
+            'type': 'progress',
+            'current': idx + 1,
+            'total': total,
+            'input_path': path,
+            'output_path': output_path,
+            'message': f'Processing: {idx + 1} / {total} ({(idx + 1) / total * 100:.2f}%)'
+        })
+
+    emit({
+        'job_id': job_id,
+        'type': 'done',
+        'outputs': outputs,
+        'time': time.perf_counter() - start_time,
+        'message': f'共计用时: {time.perf_counter() - start_time:.6f} 秒'
+    })
+
+
+def worker_main(job_queue, event_queue, cancel_job_id, max_models=2):
+    """常驻推理进程入口: torch 与 basicsr 只导入一次, 模型常驻在 LRU 中, 从 job_queue 循环读取任务
+
+    cancel_job_id 为共享的整数, 保存要取消的任务 id; 只有 id 相同的任务会被取消, 无需在任务之间清除。
+    """
+    import torch
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    cache = ModelCache(max_models)
+    event_queue.put({'job_id': None, 'type': 'ready', 'message': f'推理进程已就绪, 设备: {device}'})
+
+    while True:
+        job = job_queue.get()
+        if job is None:  # shutdown
+            break
+        try:
+            _run_job(job, cache, device, cancel_job_id, event_queue.put)
+        except Exception as error:
+            event_queue.put({
+                'job_id': job['job_id'],
+                'type': 'error',
+                'fatal': True,
+                'message': f'推理失败: {error}',
+                'traceback': traceback.format_exc()
+            })
+
+
+class InferenceWorker:
+    """GUI 端的常驻推理进程句柄
+
+    启动一次后进程一直存在, 后续任务通过队列提交, 无需重复导入 torch 与加载模型。
+    事件 (log/progress/done/error/cancelled) 在后台线程中读取并交给 callback。
+
+    Args:
+        callback (callable): callback(event), 在监听线程中调用, 需要用 Qt 信号转到 UI 线程。
+        max_models (int): 常驻模型的最大数量。 Default: 2.
+    """
+
+    def __init__(self, callback, max_models=2):
+        self.callback = callback
+        self.max_models = max_models
+        self._job_ids = itertools.count(1)
+        self._process = None
+        self._listener = None
+
+    def start(self):
+        if self.is_alive():
+            return
+        ctx = multiprocessing.get_context('spawn')
+        self._job_queue = ctx.Queue()
+        self._event_queue = ctx.Queue()
+        # job_id 从 1 开始, 0 表示没有要取消的任务
+        self._cancel_job_id = ctx.Value('i', 0)
+        self._process = ctx.Process(
+            target=worker_main,
+            args=(self._job_queue, self._event_queue, self._cancel_job_id, self.max_models),
+            daemon=True)
+        self._process.start()
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def submit(self, arch, model_path, scale, input_type, input_path, output_path, tile=0):
+        """提交一个 image/folder 任务, 返回 job_id"""
+        self.start()
+        job_id = next(self._job_ids)
+        self._job_queue.put({
+            'job_id': job_id,
+            'arch': arch,
+            'model_path': model_path,
+            'scale': scale,
+            'input_type': input_type,
+            'input_path': input_path,
+            'output_path': output_path,
+            'tile': tile
+        })
+        return job_id
+
+    def cancel(self, job_id):
+        """取消 job_id 对应的任务, 已加载的模型保留
+
+        正在执行的任务在两张图片之间停止, 排队中的任务在开始时即停止, 其他任务不受影响。
+        """
+        if self.is_alive():
+            self._cancel_job_id.value = job_id
+
+    def shutdown(self, timeout=5):
+        if not self.is_alive():
+            return
+        self._job_queue.put(None)
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+    def _listen(self):
+        process = self._process
+        while process.is_alive() or not self._event_queue.empty():
+            try:
+                event = self._event_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.callback(event)
@@ -18,6 +18,19 @@ def get_model_info(input_type: str, scale: int):
     return model_type, script
 
 
+# 与 inference/*.py 脚本中的默认模型路径保持一致
+MODEL_PATHS = {
+    ('ESRGAN', 4): r'D:\gracode\sr_models\Pic\ESRGAN\ESRGAN_PSNR_SRx4_DF2K.pth',
+    ('EDSR', 2): r'D:\gracode\sr_models\Pic\EDSR\EDSR_Mx2_f64b16.pth',
+    ('EDSR', 3): r'D:\gracode\sr_models\Pic\EDSR\EDSR_Mx3_f64b16.pth',
+}
+
+
+def get_model_path(model_type: str, scale: int):
+    """返回常驻推理进程使用的模型权重路径, 不支持的组合返回 None"""
+    return MODEL_PATHS.get((model_type, scale))
+
+
 def check_file_type(file_path):
     """检查文件类型"""
     # 获取文件扩展名
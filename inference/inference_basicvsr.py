@@ -11,12 +11,15 @@ from pathlib import Path
 from basicsr.archs.basicvsr_arch import BasicVSR
 from basicsr.data.data_util import read_img_seq
 from basicsr.utils.img_util import tensor2img
+from basicsr.utils.video_util import get_overlap_windows, stream_inference
 
 
-def inference(imgs, imgnames, model, save_path, total_frames, start_frame=0):
+def inference(imgs, imgnames, model, save_path, total_frames, start_frame=0, keep_start=0, keep_end=None):
     """接收输入图像张量 imgs 和对应的图像名称 imgnames。
     使用 BasicVSR 模型对输入图像进行推理。
     将推理结果保存为图像文件。
+
+    只保存 [keep_start, keep_end) 范围内的帧, 其余帧仅作为时序传播的上下文 (warm-up), 其输出被丢弃。
     """
 
     print("It may take a while to process the first frame...")
@@ -24,8 +27,9 @@ def inference(imgs, imgnames, model, save_path, total_frames, start_frame=0):
         outputs = model(imgs)  # 使用模型进行推理
 
     # save imgs
-    outputs = outputs.squeeze()  # 去掉多余的维度
-    outputs = list(outputs)  # 将输出转换为列表
+    outputs = outputs.squeeze(0)  # 去掉 batch 维度
+    outputs = list(outputs[keep_start:keep_end])  # 丢弃上下文帧的输出
+    imgnames = imgnames[keep_start:keep_end]
 
     for idx, (output, imgname) in enumerate(zip(outputs, imgnames)):
         output = tensor2img(output)
@@ -37,6 +41,26 @@ def inference(imgs, imgnames, model, save_path, total_frames, start_frame=0):
         print(f"Processing: {current_frame} / {total_frames} ({percentage:.2f}%)")
 
 
+def print_progress(current_frame, total_frames):
+    """stream_inference 的回调, 打印进度; 总帧数未知时只打印当前帧数。"""
+    if total_frames:
+        print(f"Processing: {current_frame} / {total_frames} ({current_frame / total_frames * 100:.2f}%)")
+    else:
+        print(f"Processing: {current_frame}")
+
+
+def print_total_time(start_time):
+    end_time = time.perf_counter()
+    elapsed_time = end_time - start_time
+    if elapsed_time >= 60:
+        # 如果超过一分钟，按分钟:秒格式显示
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
+        print(f"Total time: {minutes:02d}:{seconds:02d} (minutes:seconds)")
+    else:
+        # 否则直接显示秒数，保留6位小数
+        print(f"Total time: {elapsed_time:.6f} seconds")
+
 
 def main():
     start_time = time.perf_counter()
@@ -49,6 +73,10 @@ def main():
         '--input_path', type=str, default=r"D:\gracode\sr_data\video\video_12f.mp4", help='input test image folder or video file')
     parser.add_argument('--save_path', type=str, default=r"D:\gracode\sr_results\basicsr", help='save image path')
     parser.add_argument('--interval', type=int, default=30, help='interval size')
+    parser.add_argument(
+        '--context', type=int, default=0, help='warm-up frames on each side of a chunk, their outputs are discarded')
+    parser.add_argument(
+        '--pipe', action='store_true', help='stream video frames through ffmpeg pipes instead of temporary PNG files')
     args = parser.parse_args()
 
     print("Loading model...")
@@ -65,6 +93,17 @@ def main():
     # extract images from video format files
     input_path = args.input_path
 
+    if args.pipe and not os.path.isdir(input_path):
+        # ffmpeg decode -> rawvideo -> BasicVSR -> rawvideo -> ffmpeg encode, nothing touches the disk
+        video_name = os.path.splitext(os.path.split(args.input_path)[-1])[0]
+        output_video_path = os.path.join(args.save_path, f"{video_name}_BasicVSR.mp4").replace(os.sep, "/")
+        print("per process interval:", args.interval)
+        stream_inference(
+            model, input_path, output_video_path, args.interval, device, args.context, callback=print_progress)
+        print(f"Video saved at {output_video_path}")
+        print_total_time(start_time)
+        return
+
     use_ffmpeg = False
     if not os.path.isdir(input_path):
         use_ffmpeg = True
@@ -102,11 +141,20 @@ def main():
         imgs = imgs.unsqueeze(0).to(device)
         inference(imgs, imgnames, model, args.save_path, total_frames=num_imgs)
     else:
-        for idx in range(0, num_imgs, args.interval):
-            interval = min(args.interval, num_imgs - idx)
-            imgs, imgnames = read_img_seq(imgs_list[idx:idx + interval], return_imgname=True)
+        # overlapping windows: each chunk is extended by `context` warm-up frames on both sides
+        for window_start, window_end, keep_start, keep_end in get_overlap_windows(num_imgs, args.interval,
+                                                                                  args.context):
+            imgs, imgnames = read_img_seq(imgs_list[window_start:window_end], return_imgname=True)
             imgs = imgs.unsqueeze(0).to(device)
-            inference(imgs, imgnames, model, args.save_path, total_frames=num_imgs, start_frame=idx)
+            inference(
+                imgs,
+                imgnames,
+                model,
+                args.save_path,
+                total_frames=num_imgs,
+                start_frame=keep_start,
+                keep_start=keep_start - window_start,
+                keep_end=keep_end - window_start)
 
 
     # 合成视频
@@ -133,16 +181,7 @@ def main():
             os.remove(file_path)  # 删除所有图片
 
 
-    end_time = time.perf_counter()
-    elapsed_time = end_time - start_time
-    if elapsed_time >= 60:
-        # 如果超过一分钟，按分钟:秒格式显示
-        minutes = int(elapsed_time // 60)
-        seconds = int(elapsed_time % 60)
-        print(f"Total time: {minutes:02d}:{seconds:02d} (minutes:seconds)")
-    else:
-        # 否则直接显示秒数，保留6位小数
-        print(f"Total time: {elapsed_time:.6f} seconds")
+    print_total_time(start_time)
 
 
 
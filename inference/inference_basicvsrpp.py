@@ -8,14 +8,16 @@ import torch
 from basicsr.archs.basicvsrpp_arch import BasicVSRPlusPlus
 from basicsr.data.data_util import read_img_seq
 from basicsr.utils.img_util import tensor2img
+from basicsr.utils.video_util import get_overlap_windows, stream_inference
 
 
-def inference(imgs, imgnames, model, save_path):
+def inference(imgs, imgnames, model, save_path, keep_start=0, keep_end=None):
     with torch.no_grad():
         outputs = model(imgs)
-    # save imgs
-    outputs = outputs.squeeze()
-    outputs = list(outputs)
+    # save imgs, outputs of the warm-up context frames are discarded
+    outputs = outputs.squeeze(0)
+    outputs = list(outputs[keep_start:keep_end])
+    imgnames = imgnames[keep_start:keep_end]
     for output, imgname in zip(outputs, imgnames):
         output = tensor2img(output)
         cv2.imwrite(os.path.join(save_path, f'{imgname}_BasicVSRPP.png'), output)
@@ -28,6 +30,10 @@ def main():
         '--input_path', type=str, default='datasets/REDS4/sharp_bicubic/000', help='input test image folder')
     parser.add_argument('--save_path', type=str, default='results', help='save image path')
     parser.add_argument('--interval', type=int, default=15, help='interval size')
+    parser.add_argument(
+        '--context', type=int, default=0, help='warm-up frames on each side of a chunk, their outputs are discarded')
+    parser.add_argument(
+        '--pipe', action='store_true', help='stream video frames through ffmpeg pipes instead of temporary PNG files')
     args = parser.parse_args()
 
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -42,6 +48,12 @@ def main():
 
     # extract images from video format files
     input_path = args.input_path
+    if args.pipe and not os.path.isdir(input_path):
+        video_name = os.path.splitext(os.path.split(args.input_path)[-1])[0]
+        output_video_path = os.path.join(args.save_path, f'{video_name}_BasicVSRPP.mp4')
+        stream_inference(model, input_path, output_video_path, args.interval, device, args.context)
+        return
+
     use_ffmpeg = False
     # if not os.path.isdir(input_path):
     #     use_ffmpeg = True
@@ -65,12 +77,17 @@ def main():
         imgs = imgs.unsqueeze(0).to(device)
         inference(imgs, imgnames, model, args.save_path)
     else:
-        for idx in range(0, num_imgs, args.interval):
-            interval = min(args.interval, num_imgs - idx)
-            imgs, imgnames = read_img_seq(imgs_list[idx:idx + interval], return_imgname=True)
+        for window_start, window_end, keep_start, keep_end in get_overlap_windows(num_imgs, args.interval,
+                                                                                  args.context):
+            imgs, imgnames = read_img_seq(imgs_list[window_start:window_end], return_imgname=True)
             imgs = imgs.unsqueeze(0).to(device)
-            inference(imgs, imgnames, model, args.save_path)
-            print(111)
+            inference(
+                imgs,
+                imgnames,
+                model,
+                args.save_path,
+                keep_start=keep_start - window_start,
+                keep_end=keep_end - window_start)
 
     # delete ffmpeg output images
     if use_ffmpeg:
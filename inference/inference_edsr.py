@@ -9,6 +9,7 @@ import torch
 import time
 
 from basicsr.archs.edsr_arch import EDSR
+from basicsr.utils.tile_util import tile_inference
 
 import sys
 
@@ -31,6 +32,8 @@ def main():
     parser.add_argument('--input_file', type=str, default=None, help='Input single image file')
     parser.add_argument('--output', type=str, default=None, help='Output folder')
     parser.add_argument('--scale', type=int, default=None, help='Scale factor for super-resolution')
+    parser.add_argument('--tile', type=int, default=0, help='Tile size, 0 for no tiling')
+    parser.add_argument('--tile_overlap', type=int, default=16, help='Overlap between neighbouring tiles')
     args = parser.parse_args()
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
@@ -70,7 +73,7 @@ def main():
 
     if args.input_file:
         # Process a single image
-        process_image(args.input_file, model, device, args.output)
+        process_image(args.input_file, model, device, args.output, args.tile, args.tile_overlap)
     else:
 
         # 统计输入文件夹中的图像数量
@@ -90,7 +93,7 @@ def main():
             # Inference
             try:
                 with torch.no_grad():
-                    output = model(img)
+                    output = tile_inference(model, img, tile_size=args.tile, tile_overlap=args.tile_overlap)
             except Exception as error:
                 print('Error', error, imgname)
             else:
@@ -106,7 +109,7 @@ def main():
     print(f"共计用时: {end_time - start_time:.6f} 秒")
 
 
-def process_image(image_path, model, device, output_folder):
+def process_image(image_path, model, device, output_folder, tile=0, tile_overlap=16):
     """Process a single image."""
     imgname = os.path.splitext(os.path.basename(image_path))[0]
     print('Processing: ', imgname)
@@ -117,7 +120,7 @@ def process_image(image_path, model, device, output_folder):
 
         # Inference
         with torch.no_grad():
-            output = model(img)
+            output = tile_inference(model, img, tile_size=tile, tile_overlap=tile_overlap)
 
         # Save image
         output = output.data.squeeze().float().cpu().clamp_(0, 1).numpy()
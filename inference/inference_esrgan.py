@@ -13,6 +13,8 @@ from inference_esrgan_up import *
 
 from basicsr.archs.rrdbnet_arch import RRDBNet
 from basicsr.metrics.niqe import calculate_niqe
+from basicsr.utils.pipeline_util import run_folder_pipeline
+from basicsr.utils.tile_util import tile_inference
 # from inference_niqe import calculate_niqe_2
 
 
@@ -30,6 +32,11 @@ def main():
     parser.add_argument('--input_file', type=str, default=None, help='input single image file')
     parser.add_argument('--output', type=str, default=None, help='output folder')
     parser.add_argument('--scale', type=int, default=None, help='scale factor for super-resolution')
+    parser.add_argument('--tile', type=int, default=0, help='tile size, 0 for no tiling')
+    parser.add_argument('--tile_overlap', type=int, default=16, help='overlap between neighbouring tiles')
+    parser.add_argument('--batch_size', type=int, default=1, help='max number of same-size images per forward')
+    parser.add_argument('--num_read_workers', type=int, default=4, help='number of image decoding threads')
+    parser.add_argument('--num_write_workers', type=int, default=2, help='number of image encoding threads')
     args = parser.parse_args()
 
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -48,7 +55,7 @@ def main():
 
     if args.input_file:
         # process a single image
-        process_image(args.input_file, model, device, args.output)
+        process_image(args.input_file, model, device, args.output, args.tile, args.tile_overlap)
 
     else:
 
@@ -58,34 +65,47 @@ def main():
 
         print(f"总图片数量: {total_images}")
 
-        for idx, path in enumerate(sorted(glob.glob(os.path.join(args.input, '*')))):
+        def read_fn(path):
+            return cv2.imread(path, cv2.IMREAD_COLOR)
+
+        def infer_fn(imgs):
+            img = np.stack(imgs).astype(np.float32) / 255.
+            img = torch.from_numpy(np.transpose(img[:, :, :, [2, 1, 0]], (0, 3, 1, 2))).float().to(device)
+            with torch.no_grad():
+                output = tile_inference(model, img, tile_size=args.tile, tile_overlap=args.tile_overlap)
+            return list(output.data.float().cpu().clamp_(0, 1).numpy())
+
+        def write_fn(path, output):
             imgname = os.path.splitext(os.path.basename(path))[0]
-            # print('Processing: ', idx, imgname)
-            print(f'Processing: {idx + 1} / {total_images} ({(idx + 1) / total_images * 100:.2f}%)')
-
-            # read image
-            img = cv2.imread(path, cv2.IMREAD_COLOR).astype(np.float32) / 255.
-            img = torch.from_numpy(np.transpose(img[:, :, [2, 1, 0]], (2, 0, 1))).float()
-            img = img.unsqueeze(0).to(device)
-            # inference
-            try:
-                with torch.no_grad():
-                    output = model(img)
-            except Exception as error:
+            output = np.transpose(output[[2, 1, 0], :, :], (1, 2, 0))
+            output = (output * 255.0).round().astype(np.uint8)
+            cv2.imwrite(os.path.join(args.output, f'{imgname}_ESRGAN.png'), output)
+
+        def callback(idx, path, error):
+            imgname = os.path.splitext(os.path.basename(path))[0]
+            if error is not None:
                 print('Error', error, imgname)
             else:
-                # save image
-                output = output.data.squeeze().float().cpu().clamp_(0, 1).numpy()
-                output = np.transpose(output[[2, 1, 0], :, :], (1, 2, 0))
-                output = (output * 255.0).round().astype(np.uint8)
-                cv2.imwrite(os.path.join(args.output, f'{imgname}_ESRGAN.png'), output)
+                print(f'Processing: {idx + 1} / {total_images} ({(idx + 1) / total_images * 100:.2f}%)')
                 print('Save:', idx, imgname)
 
+        # decode, forward and encode/write overlap in a bounded pipeline
+        stats = run_folder_pipeline(
+            image_paths,
+            read_fn,
+            infer_fn,
+            write_fn,
+            batch_size=args.batch_size,
+            num_read_workers=args.num_read_workers,
+            num_write_workers=args.num_write_workers,
+            callback=callback)
+        print(f"吞吐量: {stats['throughput']:.2f} images/s (done: {stats['num_done']}, failed: {stats['num_failed']})")
+
     end_time = time.perf_counter()
     print(f"共计用时: {end_time - start_time:.6f} 秒")
 
 
-def process_image(image_path, model, device, output_folder):
+def process_image(image_path, model, device, output_folder, tile=0, tile_overlap=16):
     """Process a single image."""
     imgname = os.path.splitext(os.path.basename(image_path))[0]
     print('Processing: ', imgname)
@@ -97,7 +117,7 @@ def process_image(image_path, model, device, output_folder):
 
         # inference
         with torch.no_grad():
-            output = model(img)
+            output = tile_inference(model, img, tile_size=tile, tile_overlap=tile_overlap)
 
         # save image
         output = output.data.squeeze().float().cpu().clamp_(0, 1).numpy()
@@ -1,7 +1,5 @@
 import sys
 import os
-import threading
-import subprocess
 import yaml  # 用于处理 YAML 文件
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton, QTextEdit, QWidget, QFileDialog, QLabel, QLineEdit, QHBoxLayout, QRadioButton, QButtonGroup, QAction
@@ -11,6 +9,11 @@ from PyQt5.QtGui import QPixmap
 
 from PIL import Image  # 添加导入，用于读取图像的真实分辨率
 
+# 复用 demo 中的常驻推理进程 (demo/logic/inference_worker.py)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.extend([ROOT_DIR, os.path.join(ROOT_DIR, 'demo')])
+from logic.inference_worker import InferenceWorker  # noqa: E402
+
 
 # 信号类，用于线程间通信
 class LogSignal(QObject):
@@ -20,6 +23,8 @@ class LogSignal(QObject):
 # 主窗口类
 class InferenceGUI(QMainWindow):
     CONFIG_FILE = "./userdata/config.yaml"  # 配置文件路径
+    # 信号，将常驻推理进程的事件转到 UI 线程
+    worker_event_signal = pyqtSignal(object)
 
     def __init__(self):
         super().__init__()
@@ -35,8 +40,10 @@ class InferenceGUI(QMainWindow):
         # 加载默认配置
         self.load_config()
 
-        # 推理进程
-        self.process = None
+        # 常驻推理进程: torch 与模型只加载一次, 之后的任务复用
+        self.worker = InferenceWorker(self.worker_event_signal.emit)
+        self.worker_event_signal.connect(self.handle_worker_event)
+        self.worker_job = None
 
         # 设置快捷键
         self.create_shortcuts()
@@ -251,93 +258,56 @@ class InferenceGUI(QMainWindow):
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
-        # 启动推理线程
-        inference_thread = threading.Thread(target=self.run_inference, args=(input_path, model_path, output_folder))
-        inference_thread.start()
+        # 提交给常驻推理进程, 不再为每次推理启动新进程
+        input_type = 'image' if self.file_radio.isChecked() else 'folder'
+        job_id = self.worker.submit('ESRGAN', model_path, 4, input_type, input_path, output_folder)
+        self.worker_job = {'job_id': job_id, 'input_type': input_type}
 
     def stop_inference(self):
         """停止推理"""
-        if self.process:
-            self.process.terminate()  # 终止推理进程
+        if self.worker_job is not None:
+            # 只取消当前任务, 常驻进程与已加载模型保留
+            self.worker.cancel(self.worker_job['job_id'])
+            self.worker_job = None
             self.log_message("INFO", "User stopped.\n")
-            self.process = None
 
         # 重置按钮状态
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
-    def run_inference(self, input_path, model_path, output_folder):
-        # 使用 subprocess 调用 inference_esrgan.py 脚本
-        input_image_path = None  # 初始化变量
-        output_image_path = None  # 初始化变量
-
-        if self.file_radio.isChecked():
-            # 单个文件模式
-            command = [
-                "python", "inference/inference_esrgan.py",
-                "--input_file", input_path,
-                "--model_path", model_path,
-                "--output", output_folder
-            ]
-            input_image_path = input_path
-            output_image_path = os.path.join(output_folder, f"{os.path.splitext(os.path.basename(input_path))[0]}_ESRGAN.png")
-        elif self.folder_radio.isChecked():
-            # 文件夹模式
-            command = [
-                "python", "inference/inference_esrgan.py",
-                "--input", input_path,
-                "--model_path", model_path,
-                "--output", output_folder
-            ]
-            # 获取文件夹中第一个输入文件和对应的输出文件
-            input_files = sorted(os.listdir(input_path))
-            if input_files:
-                first_input_image = input_files[0]
-                input_image_path = os.path.join(input_path, first_input_image)
-                first_output_image = f"{os.path.splitext(first_input_image)[0]}_ESRGAN.png"
-                output_image_path = os.path.join(output_folder, first_output_image)
+    def closeEvent(self, event):
+        """关闭窗口时结束常驻推理进程"""
+        self.worker.shutdown()
+        super().closeEvent(event)
 
-        try:
-            # 检查是否正确设置了输入和输出路径
-            if not input_image_path or not output_image_path:
-                self.log_message("ERROR", "Error: No valid input or output image found.")
-                return
-
-            # 使用 subprocess 捕获输出并实时更新日志
-            self.process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=1,
-                text=True,
-                universal_newlines=True,
-                env={**os.environ, "PYTHONUNBUFFERED": "1"}  # 禁用缓冲
-            )
-
-            # 实时读取 stdout 和 stderr
-            for line in self.process.stdout:
-                self.log_message("INFO", line.strip())
-            for line in self.process.stderr:
-                self.log_message("ERROR", f"ERROR: {line.strip()}")
-
-            self.process.wait()  # 等待进程结束
-            if self.process.returncode == 0:
+    def handle_worker_event(self, event):
+        """处理常驻推理进程回传的事件 (UI 线程)"""
+        if event['type'] == 'ready':
+            self.log_message("INFO", event['message'])
+            return
+        job = self.worker_job
+        if job is None or event['job_id'] != job['job_id']:
+            return  # 已取消任务的残留事件
+
+        if event['type'] in ('log', 'progress'):
+            self.log_message("INFO", event['message'])
+        elif event['type'] == 'error' and not event.get('fatal'):
+            self.log_message("ERROR", event['message'])
+        else:
+            if event['type'] == 'done':
+                self.log_message("INFO", event['message'])
                 self.log_message("SUCCESS", "Inference Completed Successfully!\n")
-                self.display_images(input_image_path, output_image_path)
+            elif event['type'] == 'cancelled':
+                self.log_message("INFO", event['message'])
             else:
-                self.log_message("ERROR", f"Failed with return code {self.process.returncode}")
-
-        except Exception as e:
-            if self.process is not None:
-                self.log_message("ERROR", f"Error: {str(e)}")
-
-        finally:
-            # 重置按钮状态
+                self.log_message("ERROR", event['message'])
+            self.worker_job = None
             self.start_button.setEnabled(True)
             self.stop_button.setEnabled(False)
-            self.process = None
-
 
+            if event['type'] == 'done' and event['outputs']:
+                # 单个文件或文件夹中第一张图像的对比
+                self.display_images(*event['outputs'][0])
 
     def display_images(self, input_image_path, output_image_path):
         """显示输入图像和生成图像，并显示图像信息"""
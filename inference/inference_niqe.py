@@ -1,269 +1,72 @@
+import argparse
 import numpy as np
-import scipy.misc
-import scipy.io
-from os.path import dirname
-from os.path import join
-import scipy
-from PIL import Image
-import numpy as np
-import scipy.ndimage
-import numpy as np
-import scipy.special
-import math
 import os
-from PIL import Image
-from skimage.transform import resize
-
-gamma_range = np.arange(0.2, 10, 0.001)
-a = scipy.special.gamma(2.0 / gamma_range)
-a *= a
-b = scipy.special.gamma(1.0 / gamma_range)
-c = scipy.special.gamma(3.0 / gamma_range)
-prec_gammas = a / (b * c)
-
-
-def aggd_features(imdata):
-    # flatten imdata
-    imdata.shape = (len(imdata.flat), )
-    imdata2 = imdata * imdata
-    left_data = imdata2[imdata < 0]
-    right_data = imdata2[imdata >= 0]
-    left_mean_sqrt = 0
-    right_mean_sqrt = 0
-    if len(left_data) > 0:
-        left_mean_sqrt = np.sqrt(np.average(left_data))
-    if len(right_data) > 0:
-        right_mean_sqrt = np.sqrt(np.average(right_data))
-
-    if right_mean_sqrt != 0:
-        gamma_hat = left_mean_sqrt / right_mean_sqrt
-    else:
-        gamma_hat = np.inf
-    # solve r-hat norm
-
-    imdata2_mean = np.mean(imdata2)
-    if imdata2_mean != 0:
-        r_hat = (np.average(np.abs(imdata))**2) / (np.average(imdata2))
-    else:
-        r_hat = np.inf
-    rhat_norm = r_hat * (((math.pow(gamma_hat, 3) + 1) * (gamma_hat + 1)) / math.pow(math.pow(gamma_hat, 2) + 1, 2))
-
-    # solve alpha by guessing values that minimize ro
-    pos = np.argmin((prec_gammas - rhat_norm)**2)
-    alpha = gamma_range[pos]
-
-    gam1 = scipy.special.gamma(1.0 / alpha)
-    gam2 = scipy.special.gamma(2.0 / alpha)
-    gam3 = scipy.special.gamma(3.0 / alpha)
-
-    aggdratio = np.sqrt(gam1) / np.sqrt(gam3)
-    bl = aggdratio * left_mean_sqrt
-    br = aggdratio * right_mean_sqrt
-
-    # mean parameter
-    N = (br - bl) * (gam2 / gam1)  # *aggdratio
-    return (alpha, N, bl, br, left_mean_sqrt, right_mean_sqrt)
-
-
-def ggd_features(imdata):
-    nr_gam = 1 / prec_gammas
-    sigma_sq = np.var(imdata)
-    E = np.mean(np.abs(imdata))
-    rho = sigma_sq / E**2
-    pos = np.argmin(np.abs(nr_gam - rho))
-    return gamma_range[pos], sigma_sq
-
-
-def paired_product(new_im):
-    shift1 = np.roll(new_im.copy(), 1, axis=1)
-    shift2 = np.roll(new_im.copy(), 1, axis=0)
-    shift3 = np.roll(np.roll(new_im.copy(), 1, axis=0), 1, axis=1)
-    shift4 = np.roll(np.roll(new_im.copy(), 1, axis=0), -1, axis=1)
-
-    H_img = shift1 * new_im
-    V_img = shift2 * new_im
-    D1_img = shift3 * new_im
-    D2_img = shift4 * new_im
-
-    return (H_img, V_img, D1_img, D2_img)
-
-
-def gen_gauss_window(lw, sigma):
-    sd = np.float32(sigma)
-    lw = int(lw)
-    weights = [0.0] * (2 * lw + 1)
-    weights[lw] = 1.0
-    sum = 1.0
-    sd *= sd
-    for ii in range(1, lw + 1):
-        tmp = np.exp(-0.5 * np.float32(ii * ii) / sd)
-        weights[lw + ii] = tmp
-        weights[lw - ii] = tmp
-        sum += 2.0 * tmp
-    for ii in range(2 * lw + 1):
-        weights[ii] /= sum
-    return weights
-
-
-def compute_image_mscn_transform(image, C=1, avg_window=None, extend_mode='constant'):
-    if avg_window is None:
-        avg_window = gen_gauss_window(3, 7.0 / 6.0)
-    assert len(np.shape(image)) == 2
-    h, w = np.shape(image)
-    mu_image = np.zeros((h, w), dtype=np.float32)
-    var_image = np.zeros((h, w), dtype=np.float32)
-    image = np.array(image).astype('float32')
-    scipy.ndimage.correlate1d(image, avg_window, 0, mu_image, mode=extend_mode)
-    scipy.ndimage.correlate1d(mu_image, avg_window, 1, mu_image, mode=extend_mode)
-    scipy.ndimage.correlate1d(image**2, avg_window, 0, var_image, mode=extend_mode)
-    scipy.ndimage.correlate1d(var_image, avg_window, 1, var_image, mode=extend_mode)
-    var_image = np.sqrt(np.abs(var_image - mu_image**2))
-    return (image - mu_image) / (var_image + C), var_image, mu_image
 
+from basicsr.metrics.folder_metric import score_folder, score_image_pair
+from basicsr.utils import scandir
 
-def _niqe_extract_subband_feats(mscncoefs):
-    # alpha_m,  = extract_ggd_features(mscncoefs)
-    alpha_m, N, bl, br, lsq, rsq = aggd_features(mscncoefs.copy())
-    pps1, pps2, pps3, pps4 = paired_product(mscncoefs)
-    alpha1, N1, bl1, br1, lsq1, rsq1 = aggd_features(pps1)
-    alpha2, N2, bl2, br2, lsq2, rsq2 = aggd_features(pps2)
-    alpha3, N3, bl3, br3, lsq3, rsq3 = aggd_features(pps3)
-    alpha4, N4, bl4, br4, lsq4, rsq4 = aggd_features(pps4)
-    return np.array([
-        alpha_m,
-        (bl + br) / 2.0,
-        alpha1,
-        N1,
-        bl1,
-        br1,  # (V)
-        alpha2,
-        N2,
-        bl2,
-        br2,  # (H)
-        alpha3,
-        N3,
-        bl3,
-        bl3,  # (D1)
-        alpha4,
-        N4,
-        bl4,
-        bl4,  # (D2)
-    ])
 
+def calculate_niqe_2(img_path, crop_border=0):
+    """计算单张图像的 NIQE.
 
-def get_patches_train_features(img, patch_size, stride=8):
-    return _get_patches_generic(img, patch_size, 1, stride)
+    使用库中的 :func:`basicsr.metrics.calculate_niqe` (与 MATLAB 结果一致, 特征提取已向量化),
+    在 Y 通道上计算.
 
+    Args:
+        img_path (str): 图像路径.
+        crop_border (int): 每条边裁掉的像素数. Default: 0.
 
-def get_patches_test_features(img, patch_size, stride=8):
-    return _get_patches_generic(img, patch_size, 0, stride)
+    Returns:
+        float: NIQE 结果, 越低越好.
+    """
+    return score_image_pair(None, img_path, metrics=('niqe', ), crop_border=crop_border)[0]['niqe']
 
 
-def extract_on_patches(img, patch_size):
-    h, w = img.shape
-    #patch_size = np.int(patch_size)
-    patch_size = int(patch_size)
-    patches = []
-    for j in range(0, h - patch_size + 1, patch_size):
-        for i in range(0, w - patch_size + 1, patch_size):
-            patch = img[j:j + patch_size, i:i + patch_size]
-            patches.append(patch)
+def niqe_folder(input_folder, report_path=None, crop_border=0, num_workers=8, resume=False):
+    """用进程池并行计算一个文件夹中所有图像的 NIQE.
 
-    patches = np.array(patches)
+    每张图像的结果按顺序流式写入同一个报告 (csv/jsonl), 中断后可以用 resume 继续.
 
-    patch_features = []
-    for p in patches:
-        patch_features.append(_niqe_extract_subband_feats(p))
-    patch_features = np.array(patch_features)
+    Args:
+        input_folder (str): 图像文件夹.
+        report_path (str | None): 报告路径, 以 '.csv' 或 '.jsonl' 结尾. Default: None.
+        crop_border (int): 每条边裁掉的像素数. Default: 0.
+        num_workers (int): 进程数. 0 表示在当前进程中串行计算. Default: 8.
+        resume (bool): 跳过报告中已有的图像. Default: False.
 
-    return patch_features
+    Returns:
+        list[dict]: 每张图像的结果, 包含 'name' 和 'niqe'.
+    """
+    img_list = sorted(scandir(input_folder, recursive=True, full_path=True))
+    pairs = [(os.path.relpath(path, input_folder), None, path) for path in img_list]
 
+    def print_result(idx, row):
+        print(f'{idx + 1:3d}: {row["name"]:25}. \tNIQE: {row["niqe"]:.6f}')
 
-def _get_patches_generic(img, patch_size, is_train, stride):
-    h, w = np.shape(img)
-    if h < patch_size or w < patch_size:
-        print("Input image is too small")
-        exit(0)
+    return score_folder(
+        pairs,
+        metrics=('niqe', ),
+        crop_border=crop_border,
+        num_workers=num_workers,
+        result_path=report_path,
+        resume=resume,
+        callback=print_result)
 
-    # ensure that the patch divides evenly into img
-    hoffset = (h % patch_size)
-    woffset = (w % patch_size)
 
-    if hoffset > 0:
-        img = img[:-hoffset, :]
-    if woffset > 0:
-        img = img[:, :-woffset]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', type=str, required=True, help='输入图像或文件夹')
+    parser.add_argument('--report', type=str, default=None, help='报告路径 (.csv 或 .jsonl)')
+    parser.add_argument('--crop_border', type=int, default=0, help='每条边裁掉的像素数')
+    parser.add_argument('--num_workers', type=int, default=8, help='进程数, 0 表示串行计算')
+    parser.add_argument('--resume', action='store_true', help='跳过报告中已有的图像')
+    args = parser.parse_args()
 
-    img = img.astype(np.float32)
-    #numpy.array(Image.fromarray(arr).resize())
-    #img2 = scipy.misc.imresize(img, 0.5, interp='bicubic', mode='F')
-    img2 = resize(img, (int(img.shape[0] * 0.5), int(img.shape[1] * 0.5)), mode='constant', anti_aliasing=True)
-
-    mscn1, var, mu = compute_image_mscn_transform(img)
-    mscn1 = mscn1.astype(np.float32)
-
-    mscn2, _, _ = compute_image_mscn_transform(img2)
-    mscn2 = mscn2.astype(np.float32)
-
-    feats_lvl1 = extract_on_patches(mscn1, patch_size)
-    feats_lvl2 = extract_on_patches(mscn2, patch_size / 2)
-
-    feats = np.hstack((feats_lvl1, feats_lvl2))  # feats_lvl3))
-
-    return feats
-
-
-def niqe(inputImgData):
-    patch_size = 96
-    module_path = dirname(__file__)
-
-    # TODO: memoize
-    params = scipy.io.loadmat(join(module_path, 'data', 'niqe_image_params.mat'))
-    pop_mu = np.ravel(params["pop_mu"])
-    pop_cov = params["pop_cov"]
-
-    M, N = inputImgData.shape
-
-    # assert C == 1, "niqe called with videos containing %d channels. Please supply only the luminance channel" % (C,)
-    assert M > (
-        patch_size * 2 +
-        1), "niqe called with small frame size, requires > 192x192 resolution video using current training parameters"
-    assert N > (
-        patch_size * 2 +
-        1), "niqe called with small frame size, requires > 192x192 resolution video using current training parameters"
-
-    feats = get_patches_test_features(inputImgData, patch_size)
-    sample_mu = np.mean(feats, axis=0)
-    sample_cov = np.cov(feats.T)
-
-    X = sample_mu - pop_mu
-    covmat = ((pop_cov + sample_cov) / 2.0)
-    pinvmat = scipy.linalg.pinv(covmat)
-    niqe_score = np.sqrt(np.dot(np.dot(X, pinvmat), X))
-
-    return niqe_score
-
-def calculate_niqe_2(img_path):
-    # 读取图像
-    image = np.array(Image.open(img_path).convert('LA'))[:, :, 0]
-
-    print('Image shape:', image.shape)
-
-    # 计算 NIQE
-    niqe_value = niqe(image)
-
-    return niqe_value
-
-
-if __name__ == "__main__":
-    # 指定图像路径
-    path = 'D:/gracode/sr_data/pic/Set5/image_SRF_4/HR/img_001.png'
-
-    # 读取图像
-    image = np.array(Image.open(path).convert('LA'))[:, :, 0]
-
-    # 计算 NIQE
-    niqe_value = niqe(image)
-
-    # 输出结果
-    print('NIQE for the image:', niqe_value)
\ No newline at end of file
+    if os.path.isfile(args.input):
+        # 计算单张图像的 NIQE
+        print('NIQE for the image:', calculate_niqe_2(args.input, args.crop_border))
+    else:
+        # 并行计算文件夹中所有图像的 NIQE
+        results = niqe_folder(args.input, args.report, args.crop_border, args.num_workers, args.resume)
+        print(args.input)
+        print(f'Average: NIQE: {np.mean([row["niqe"] for row in results]):.6f}')
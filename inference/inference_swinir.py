@@ -5,9 +5,9 @@ import glob
 import numpy as np
 import os
 import torch
-from torch.nn import functional as F
 
 from basicsr.archs.swinir_arch import SwinIR
+from basicsr.utils.tile_util import tile_inference
 
 
 def main():
@@ -26,6 +26,8 @@ def main():
     parser.add_argument('--noise', type=int, default=15, help='noise level: 15, 25, 50')
     parser.add_argument('--jpeg', type=int, default=40, help='scale factor: 10, 20, 30, 40')
     parser.add_argument('--large_model', action='store_true', help='Use large model, only used for real image sr')
+    parser.add_argument('--tile', type=int, default=0, help='tile size, 0 for no tiling')
+    parser.add_argument('--tile_overlap', type=int, default=32, help='overlap between neighbouring tiles')
     parser.add_argument(
         '--model_path',
         type=str,
@@ -54,19 +56,9 @@ def main():
         img = img.unsqueeze(0).to(device)
 
         # inference
-        with torch.no_grad():
-            # pad input image to be a multiple of window_size
-            mod_pad_h, mod_pad_w = 0, 0
-            _, _, h, w = img.size()
-            if h % window_size != 0:
-                mod_pad_h = window_size - h % window_size
-            if w % window_size != 0:
-                mod_pad_w = window_size - w % window_size
-            img = F.pad(img, (0, mod_pad_w, 0, mod_pad_h), 'reflect')
-
-            output = model(img)
-            _, _, h, w = output.size()
-            output = output[:, :, 0:h - mod_pad_h * args.scale, 0:w - mod_pad_w * args.scale]
+        # each tile (or the whole image) is padded to be a multiple of window_size
+        output = tile_inference(
+            model, img, scale=args.scale, tile_size=args.tile, tile_overlap=args.tile_overlap, window_size=window_size)
 
         # save image
         output = output.data.squeeze().float().cpu().clamp_(0, 1).numpy()
@@ -0,0 +1,66 @@
+import argparse
+import math
+import statistics
+import time
+import torch
+
+from basicsr.utils.matlab_functions import calculate_weights_indices, imresize
+
+# (h, w, scale): DIV2K-sized downsampling, as in dataset preparation and NIQE, and upsampling
+CASES = [(1024, 1024, 0.25), (1356, 2040, 0.25), (1356, 2040, 0.5), (339, 510, 4), (2160, 3840, 0.25)]
+
+
+def imresize_loop(img, scale, antialiasing=True):
+    """The previous implementation: one mv for each output row/column and channel."""
+    in_c, in_h, in_w = img.size()
+    out_h, out_w = math.ceil(in_h * scale), math.ceil(in_w * scale)
+    weights_h, indices_h, sym_hs, sym_he = calculate_weights_indices(in_h, out_h, scale, 'cubic', 4, antialiasing)
+    weights_w, indices_w, sym_ws, sym_we = calculate_weights_indices(in_w, out_w, scale, 'cubic', 4, antialiasing)
+
+    img_aug = torch.cat([img[:, :sym_hs].flip(1), img, img[:, in_h - sym_he:].flip(1)], dim=1)
+    out_1 = torch.zeros(in_c, out_h, in_w)
+    for i in range(out_h):
+        idx = int(indices_h[i][0])
+        for j in range(in_c):
+            out_1[j, i, :] = img_aug[j, idx:idx + weights_h.size(1), :].transpose(0, 1).mv(weights_h[i])
+
+    out_1_aug = torch.cat([out_1[:, :, :sym_ws].flip(2), out_1, out_1[:, :, in_w - sym_we:].flip(2)], dim=2)
+    out_2 = torch.zeros(in_c, out_h, out_w)
+    for i in range(out_w):
+        idx = int(indices_w[i][0])
+        for j in range(in_c):
+            out_2[j, :, i] = out_1_aug[j, :, idx:idx + weights_w.size(1)].mv(weights_w[i])
+    return out_2
+
+
+def measure(func, img, scale, repeat):
+    func(img, scale)  # warm up, e.g., the weight cache
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(img, scale)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    """Benchmark the MATLAB-compatible imresize against the previous loop implementation on CPU.
+
+    Usage:
+        python scripts/benchmark_imresize.py --repeat 5 --num_threads 1
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs for each case.')
+    parser.add_argument('--num_threads', type=int, default=1, help='Number of torch threads.')
+    args = parser.parse_args()
+    torch.set_num_threads(args.num_threads)
+
+    for h, w, scale in CASES:
+        img = torch.rand(3, h, w)
+        loop = measure(imresize_loop, img, scale, args.repeat)
+        banded = measure(imresize, img, scale, args.repeat)
+        print(f'{w}x{h} x{scale}: loop {loop:.3f}s, banded {banded:.3f}s, speedup {loop / banded:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
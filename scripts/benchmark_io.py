@@ -0,0 +1,82 @@
+import argparse
+import cv2
+import os
+import random
+import tempfile
+import time
+from os import path as osp
+
+from basicsr.data.image_cache import read_image_region
+from basicsr.utils import FileClient, scandir
+from basicsr.utils.lmdb_util import make_lmdb_from_imgs
+from basicsr.utils.memmap_util import make_memmap_from_imgs
+
+
+def measure(file_client, paths, client_key, regions):
+    """Read the patches and return the time per patch in ms."""
+    start = time.perf_counter()
+    for path, region in zip(paths, regions):
+        patch = read_image_region(file_client, path, region, client_key)
+        assert patch.shape[0:2] == region[2:4]
+    return (time.perf_counter() - start) / len(regions) * 1000
+
+
+def main():
+    """Benchmark reading random training patches from disk (png), lmdb (png) and memmap shards.
+
+    The lmdb and the memmap shards are created from the input folder in a
+    temporary folder. Note that the files may be in the page cache after they
+    are created; drop the caches to measure cold reads.
+
+    Usage:
+        python scripts/benchmark_io.py --input datasets/DIV2K/DIV2K_train_HR --num_images 50 --patch_size 128
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', type=str, required=True, help='Folder of png images.')
+    parser.add_argument('--num_images', type=int, default=50, help='Number of images to use.')
+    parser.add_argument('--num_patches', type=int, default=500, help='Number of random patches to read.')
+    parser.add_argument('--patch_size', type=int, default=128, help='Patch size.')
+    parser.add_argument('--tmp_dir', type=str, default=None, help='Folder for the lmdb and memmap shards.')
+    args = parser.parse_args()
+
+    img_path_list = sorted(list(scandir(args.input, suffix='png', recursive=False)))[:args.num_images]
+    keys = [img_path.split('.png')[0] for img_path in img_path_list]
+    shapes = [cv2.imread(osp.join(args.input, path), cv2.IMREAD_UNCHANGED).shape for path in img_path_list]
+
+    rng = random.Random(0)
+    indices, regions = [], []
+    for _ in range(args.num_patches):
+        idx = rng.randrange(len(keys))
+        h, w = shapes[idx][0:2]
+        top, left = rng.randint(0, h - args.patch_size), rng.randint(0, w - args.patch_size)
+        indices.append(idx)
+        regions.append((top, left, args.patch_size, args.patch_size))
+
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp_dir:
+        lmdb_path = osp.join(tmp_dir, 'bench.lmdb')
+        memmap_path = osp.join(tmp_dir, 'bench.memmap')
+        make_lmdb_from_imgs(args.input, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=8)
+        make_memmap_from_imgs(args.input, memmap_path, img_path_list, keys, n_thread=8)
+
+        results = {}
+        file_client = FileClient('disk')
+        results['disk + png'] = measure(file_client, [osp.join(args.input, img_path_list[i]) for i in indices],
+                                        'default', regions)
+        file_client = FileClient('lmdb', db_paths=[lmdb_path], client_keys=['default'])
+        results['lmdb + png'] = measure(file_client, [keys[i] for i in indices], 'default', regions)
+        file_client = FileClient('memmap', db_paths=[memmap_path], client_keys=['default'])
+        results['memmap'] = measure(file_client, [keys[i] for i in indices], 'default', regions)
+
+        sizes = {
+            'disk + png': sum(os.path.getsize(osp.join(args.input, path)) for path in img_path_list),
+            'lmdb + png': os.path.getsize(osp.join(lmdb_path, 'data.mdb')),
+            'memmap': sum(os.path.getsize(osp.join(memmap_path, name)) for name in os.listdir(memmap_path))
+        }
+
+    for name, ms in results.items():
+        print(f'{name:<12s}: {ms:8.3f} ms / patch, {results["disk + png"] / ms:6.2f}x, '
+              f'size {sizes[name] / 1024 / 1024:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
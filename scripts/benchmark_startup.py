@@ -0,0 +1,57 @@
+import argparse
+import statistics
+import subprocess
+import sys
+
+# build a single RRDBNet, as an inference script would do
+LAZY = """
+from basicsr.archs import build_network
+build_network(dict(type='RRDBNet', num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32))
+"""
+# previous behaviour: ``import basicsr`` imports every subpackage (models, losses, the training pipeline and
+# torchvision), and every arch and dataset module is imported at startup
+EAGER = """
+import torchvision
+from basicsr import *
+from basicsr.utils.registry import ARCH_REGISTRY, DATASET_REGISTRY
+ARCH_REGISTRY.import_lazy_modules()
+DATASET_REGISTRY.import_lazy_modules()
+""" + LAZY
+
+TIMER = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code, repeat):
+    times = []
+    for _ in range(repeat):
+        # a fresh interpreter for every run, so that nothing is cached in sys.modules
+        output = subprocess.run([sys.executable, '-c', TIMER.format(code=code)], check=True,
+                                stdout=subprocess.PIPE).stdout.decode()
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+
+def main():
+    """Benchmark the startup time of building a network with lazy and eager registration.
+
+    Usage:
+        python scripts/benchmark_startup.py --repeat 5
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs for each mode.')
+    args = parser.parse_args()
+
+    lazy = measure(LAZY, args.repeat)
+    eager = measure(EAGER, args.repeat)
+    print(f'lazy : median {statistics.median(lazy):.3f}s, min {min(lazy):.3f}s')
+    print(f'eager: median {statistics.median(eager):.3f}s, min {min(eager):.3f}s')
+    print(f'speedup: {statistics.median(eager) / statistics.median(lazy):.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+import os
+import sys
+from multiprocessing import Pool
+from os import path as osp
+from tqdm import tqdm
+
+from basicsr.utils import scandir
+
+
+def main():
+    """A multi-thread tool to convert images to uint8 .npy arrays.
+
+    PairedImageDataset with the `sub_images` option memory-maps .npy images and
+    only reads the cropped regions, without decoding. Thus, it replaces
+    `extract_subimages.py` for DIV2K: convert the full images once, and the
+    sub-images are cropped on the fly.
+
+    Args:
+        opt (dict): Configuration dict. It contains:
+        n_thread (int): Thread number.
+        input_folder (str): Path to the input folder.
+        save_folder (str): Path to save folder.
+
+    Usage:
+        For each folder, run this script.
+        Typically, there are four folders to be processed for DIV2K dataset.
+
+            * DIV2K_train_HR
+            * DIV2K_train_LR_bicubic/X2
+            * DIV2K_train_LR_bicubic/X3
+            * DIV2K_train_LR_bicubic/X4
+
+        Remember to modify opt configurations according to your settings.
+    """
+
+    opt = {}
+    opt['n_thread'] = 20
+
+    # HR images
+    opt['input_folder'] = 'datasets/DIV2K/DIV2K_train_HR'
+    opt['save_folder'] = 'datasets/DIV2K/DIV2K_train_HR_npy'
+    convert_to_npy(opt)
+
+    # LRx4 images
+    opt['input_folder'] = 'datasets/DIV2K/DIV2K_train_LR_bicubic/X4'
+    opt['save_folder'] = 'datasets/DIV2K/DIV2K_train_LR_bicubic/X4_npy'
+    convert_to_npy(opt)
+
+
+def convert_to_npy(opt):
+    """Convert the images in a folder to .npy files.
+
+    Args:
+        opt (dict): Configuration dict. It contains:
+        input_folder (str): Path to the input folder.
+        save_folder (str): Path to save folder.
+        n_thread (int): Thread number.
+    """
+    input_folder = opt['input_folder']
+    save_folder = opt['save_folder']
+    if not osp.exists(save_folder):
+        os.makedirs(save_folder)
+        print(f'mkdir {save_folder} ...')
+    else:
+        print(f'Folder {save_folder} already exists. Exit.')
+        sys.exit(1)
+
+    img_list = list(scandir(input_folder, full_path=True))
+
+    pbar = tqdm(total=len(img_list), unit='image', desc='Convert')
+    pool = Pool(opt['n_thread'])
+    for path in img_list:
+        pool.apply_async(worker, args=(path, opt), callback=lambda arg: pbar.update(1))
+    pool.close()
+    pool.join()
+    pbar.close()
+    print('All processes done.')
+
+
+def worker(path, opt):
+    """Worker for each process.
+
+    Args:
+        path (str): Image path.
+        opt (dict): Configuration dict. It contains:
+        save_folder (str): Path to save folder.
+
+    Returns:
+        process_info (str): Process information displayed in progress bar.
+    """
+    img_name = osp.splitext(osp.basename(path))[0]
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img.ndim == 2:
+        img = img[..., None]
+    # HWC, BGR, uint8. Keep the file names, so that the gt and lq images are still paired by name.
+    np.save(osp.join(opt['save_folder'], f'{img_name}.npy'), np.ascontiguousarray(img))
+    process_info = f'Processing {img_name} ...'
+    return process_info
+
+
+if __name__ == '__main__':
+    main()
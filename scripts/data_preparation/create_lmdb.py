@@ -5,7 +5,7 @@ from basicsr.utils import scandir
 from basicsr.utils.lmdb_util import make_lmdb_from_imgs
 
 
-def create_lmdb_for_div2k():
+def create_lmdb_for_div2k(n_thread=40, resume=False):
     """Create lmdb files for DIV2K dataset.
 
     Usage:
@@ -18,24 +18,32 @@ def create_lmdb_for_div2k():
             * DIV2K_train_LR_bicubic/X4_sub
 
         Remember to modify opt configurations according to your settings.
+
+    Args:
+        n_thread (int): Number of processes to read and encode images.
+            Default: 40.
+        resume (bool): Whether to resume interrupted buildings. Default: False.
     """
     # HR images
     folder_path = 'datasets/DIV2K/DIV2K_train_HR_test_sub'
     lmdb_path = 'datasets/DIV2K/DIV2K_train_HR_test_sub.lmdb'
     img_path_list, keys = prepare_keys_div2k(folder_path)
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
     # LRx2 images
     folder_path = 'datasets/DIV2K/DIV2K_train_LR_test/X2_sub'
     lmdb_path = 'datasets/DIV2K/DIV2K_train_LR_test/X2_sub.lmdb'
     img_path_list, keys = prepare_keys_div2k(folder_path)
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
     # LRx3 images
     folder_path = 'datasets/DIV2K/DIV2K_train_LR_test/X3_sub'
     lmdb_path = 'datasets/DIV2K/DIV2K_train_LR_test/X3_sub.lmdb'
     img_path_list, keys = prepare_keys_div2k(folder_path)
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
     # LRx4 images
     # folder_path = 'datasets/DIV2K/DIV2K_train_LR_bicubic/X4_sub'
@@ -43,7 +51,8 @@ def create_lmdb_for_div2k():
     folder_path = 'datasets/DIV2K/DIV2K_train_LR_test/X4_sub'
     lmdb_path = 'datasets/DIV2K/DIV2K_train_LR_test/X4_sub.lmdb'
     img_path_list, keys = prepare_keys_div2k(folder_path)
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
 
 def prepare_keys_div2k(folder_path):
@@ -63,7 +72,7 @@ def prepare_keys_div2k(folder_path):
     return img_path_list, keys
 
 
-def create_lmdb_for_reds():
+def create_lmdb_for_reds(n_thread=40, resume=False):
     """Create lmdb files for REDS dataset.
 
     Usage:
@@ -74,18 +83,25 @@ def create_lmdb_for_reds():
             * train_sharp_bicubic
 
         Remember to modify opt configurations according to your settings.
+
+    Args:
+        n_thread (int): Number of processes to read and encode images.
+            Default: 40.
+        resume (bool): Whether to resume interrupted buildings. Default: False.
     """
     # train_sharp
     folder_path = 'datasets/REDS/train_sharp'
     lmdb_path = 'datasets/REDS/train_sharp_with_val.lmdb'
     img_path_list, keys = prepare_keys_reds(folder_path)
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
     # train_sharp_bicubic
     folder_path = 'datasets/REDS/train_sharp_bicubic'
     lmdb_path = 'datasets/REDS/train_sharp_bicubic_with_val.lmdb'
     img_path_list, keys = prepare_keys_reds(folder_path)
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
 
 def prepare_keys_reds(folder_path):
@@ -105,25 +121,32 @@ def prepare_keys_reds(folder_path):
     return img_path_list, keys
 
 
-def create_lmdb_for_vimeo90k():
+def create_lmdb_for_vimeo90k(n_thread=40, resume=False):
     """Create lmdb files for Vimeo90K dataset.
 
     Usage:
         Remember to modify opt configurations according to your settings.
+
+    Args:
+        n_thread (int): Number of processes to read and encode images.
+            Default: 40.
+        resume (bool): Whether to resume interrupted buildings. Default: False.
     """
     # GT
     folder_path = 'datasets/vimeo90k/vimeo_septuplet/sequences'
     lmdb_path = 'datasets/vimeo90k/vimeo90k_train_GT_only4th.lmdb'
     train_list_path = 'datasets/vimeo90k/vimeo_septuplet/sep_trainlist.txt'
     img_path_list, keys = prepare_keys_vimeo90k(folder_path, train_list_path, 'gt')
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
     # LQ
     folder_path = 'datasets/vimeo90k/vimeo_septuplet_matlabLRx4/sequences'
     lmdb_path = 'datasets/vimeo90k/vimeo90k_train_LR7frames.lmdb'
     train_list_path = 'datasets/vimeo90k/vimeo_septuplet/sep_trainlist.txt'
     img_path_list, keys = prepare_keys_vimeo90k(folder_path, train_list_path, 'lq')
-    make_lmdb_from_imgs(folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True)
+    make_lmdb_from_imgs(
+        folder_path, lmdb_path, img_path_list, keys, multiprocessing_read=True, n_thread=n_thread, resume=resume)
 
 
 def prepare_keys_vimeo90k(folder_path, train_list_path, mode):
@@ -164,13 +187,15 @@ if __name__ == '__main__':
         '--dataset',
         type=str,
         help=("Options: 'DIV2K', 'REDS', 'Vimeo90K' You may need to modify the corresponding configurations in codes."))
+    parser.add_argument('--n_thread', type=int, default=40, help='Number of processes to read and encode images.')
+    parser.add_argument('--resume', action='store_true', help='Resume interrupted buildings.')
     args = parser.parse_args()
     dataset = args.dataset.lower()
     if dataset == 'div2k':
-        create_lmdb_for_div2k()
+        create_lmdb_for_div2k(args.n_thread, args.resume)
     elif dataset == 'reds':
-        create_lmdb_for_reds()
+        create_lmdb_for_reds(args.n_thread, args.resume)
     elif dataset == 'vimeo90k':
-        create_lmdb_for_vimeo90k()
+        create_lmdb_for_vimeo90k(args.n_thread, args.resume)
     else:
         raise ValueError('Wrong dataset.')
@@ -0,0 +1,50 @@
+import argparse
+
+from basicsr.utils import scandir
+from basicsr.utils.memmap_util import make_memmap_from_imgs
+
+
+def create_memmap(input_folder, memmap_path, remove_suffix='', n_thread=40, shard_size_mb=4096):
+    """Create memory-mapped shards from a folder of png images.
+
+    The images are stored as raw uint8 arrays, so that the memmap io backend
+    can slice patches from them without decoding. Use them with
+    `io_backend: {type: memmap}`, e.g., in PairedImageDataset.
+
+    Usage:
+        For each folder, run this script. For DIV2K, the full images can be
+        used with the `sub_images` option of PairedImageDataset, instead of
+        running `extract_subimages.py`::
+
+            python scripts/data_preparation/create_memmap.py \
+                --input datasets/DIV2K/DIV2K_train_HR --output datasets/DIV2K/DIV2K_train_HR.memmap
+            python scripts/data_preparation/create_memmap.py \
+                --input datasets/DIV2K/DIV2K_train_LR_bicubic/X4 \
+                --output datasets/DIV2K/DIV2K_train_LR_bicubic_X4.memmap --remove_suffix x4
+
+    Args:
+        input_folder (str): Path to the input folder.
+        memmap_path (str): Save path, ending with '.memmap'.
+        remove_suffix (str): Suffix removed from the image names, so that the
+            gt and lq images have the same keys, e.g., 'x4' for DIV2K.
+            Default: ''.
+        n_thread (int): Number of processes to read images. Default: 40.
+        shard_size_mb (int): Max size of a shard in MB. Default: 4096.
+    """
+    img_path_list = sorted(list(scandir(input_folder, suffix='png', recursive=False)))
+    keys = [img_path.split('.png')[0] for img_path in img_path_list]
+    if remove_suffix:
+        keys = [key[:-len(remove_suffix)] if key.endswith(remove_suffix) else key for key in keys]
+    make_memmap_from_imgs(
+        input_folder, memmap_path, img_path_list, keys, shard_size_mb=shard_size_mb, n_thread=n_thread)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', type=str, required=True, help='Input folder.')
+    parser.add_argument('--output', type=str, required=True, help="Output folder, ending with '.memmap'.")
+    parser.add_argument('--remove_suffix', type=str, default='', help="Suffix removed from image names, e.g., 'x4'.")
+    parser.add_argument('--n_thread', type=int, default=40, help='Number of processes to read images.')
+    parser.add_argument('--shard_size_mb', type=int, default=4096, help='Max size of a shard in MB.')
+    args = parser.parse_args()
+    create_memmap(args.input, args.output, args.remove_suffix, args.n_thread, args.shard_size_mb)
@@ -1,11 +1,11 @@
 import argparse
 import math
-import numpy as np
 import torch
 from torch.utils.data import DataLoader
 
 from basicsr.data import build_dataset
-from basicsr.metrics.fid import calculate_fid, extract_inception_features, load_patched_inception_v3
+from basicsr.metrics.fid import (InceptionFeatureCache, calculate_fid, extract_inception_stats,
+                                 extract_inception_stats_from_paths, load_patched_inception_v3)
 
 
 def calculate_fid_folder():
@@ -18,6 +18,12 @@ def calculate_fid_folder():
     parser.add_argument('--num_sample', type=int, default=50000)
     parser.add_argument('--num_workers', type=int, default=4)
     parser.add_argument('--backend', type=str, default='disk', help='io backend for dataset. Option: disk, lmdb')
+    parser.add_argument(
+        '--cache',
+        type=str,
+        default=None,
+        help='Path to an inception feature cache (.npz). Only new or changed images are passed through the '
+        'inception model. Only for the disk backend.')
     args = parser.parse_args()
 
     # inception model
@@ -33,6 +39,16 @@ def calculate_fid_folder():
     opt['std'] = [0.5, 0.5, 0.5]
     dataset = build_dataset(opt)
 
+    if args.cache is not None:
+        assert args.backend == 'disk', 'The feature cache only supports the disk backend.'
+        # the same images as the dataloader below
+        img_paths = dataset.paths[:args.num_sample]
+        cache = InceptionFeatureCache(args.cache)
+        stats = extract_inception_stats_from_paths(img_paths, inception, cache, args.batch_size, device)
+        print(f'Extracted {stats.num} features ({cache.num_new} new) to calculate stats.')
+        calculate_fid_from_stats(stats, args.fid_stats)
+        return
+
     # create dataloader
     data_loader = DataLoader(
         dataset=dataset,
@@ -51,22 +67,20 @@ def calculate_fid_folder():
             else:
                 yield data['lq']
 
-    features = extract_inception_features(data_generator(data_loader, total_batch), inception, total_batch, device)
-    features = features.numpy()
-    total_len = features.shape[0]
-    features = features[:args.num_sample]
-    print(f'Extracted {total_len} features, use the first {features.shape[0]} features to calculate stats.')
+    stats = extract_inception_stats(
+        data_generator(data_loader, total_batch), inception, total_batch, device, num_sample=args.num_sample)
+    print(f'Extracted {stats.num} features to calculate stats.')
+    calculate_fid_from_stats(stats, args.fid_stats)
 
-    sample_mean = np.mean(features, 0)
-    sample_cov = np.cov(features, rowvar=False)
 
+def calculate_fid_from_stats(stats, fid_stats):
     # load the dataset stats
-    stats = torch.load(args.fid_stats)
-    real_mean = stats['mean']
-    real_cov = stats['cov']
+    real_stats = torch.load(fid_stats)
+    real_mean = real_stats['mean']
+    real_cov = real_stats['cov']
 
     # calculate FID metric
-    fid = calculate_fid(sample_mean, sample_cov, real_mean, real_cov)
+    fid = calculate_fid(stats.mean, stats.cov, real_mean, real_cov)
     print('fid:', fid)
 
 
@@ -1,11 +1,10 @@
 import argparse
 import math
-import numpy as np
 import torch
 from torch.utils.data import DataLoader
 
 from basicsr.data import build_dataset
-from basicsr.metrics.fid import extract_inception_features, load_patched_inception_v3
+from basicsr.metrics.fid import extract_inception_stats, load_patched_inception_v3
 
 
 def calculate_stats_from_dataset():
@@ -44,13 +43,11 @@ def calculate_stats_from_dataset():
             else:
                 yield data['gt']
 
-    features = extract_inception_features(data_generator(data_loader, total_batch), inception, total_batch, device)
-    features = features.numpy()
-    total_len = features.shape[0]
-    features = features[:args.num_sample]
-    print(f'Extracted {total_len} features, use the first {features.shape[0]} features to calculate stats.')
-    mean = np.mean(features, 0)
-    cov = np.cov(features, rowvar=False)
+    stats = extract_inception_stats(
+        data_generator(data_loader, total_batch), inception, total_batch, device, num_sample=args.num_sample)
+    print(f'Extracted {stats.num} features to calculate stats.')
+    mean = stats.mean
+    cov = stats.cov
 
     save_path = f'inception_{opt["name"]}_{args.size}.pth'
     torch.save(
@@ -1,17 +1,36 @@
 import argparse
-import cv2
 import numpy as np
 from os import path as osp
 
-from basicsr.metrics import calculate_psnr, calculate_ssim
-from basicsr.utils import bgr2ycbcr, scandir
+from basicsr.metrics.folder_metric import score_folder
+from basicsr.utils import img2tensor, scandir
+
+
+def build_lpips_fn(device='cuda'):
+    """Build a callable calculating LPIPS (vgg) on uint8 BGR images."""
+    import lpips
+    import torch
+
+    loss_fn_vgg = lpips.LPIPS(net='vgg').to(device)
+
+    @torch.no_grad()
+    def lpips_fn(img_gt, img_restored):
+        img_gt, img_restored = img2tensor([img_gt.astype(np.float32), img_restored.astype(np.float32)], bgr2rgb=True)
+        # norm to [-1, 1]
+        img_gt = img_gt.unsqueeze(0).to(device) / 127.5 - 1
+        img_restored = img_restored.unsqueeze(0).to(device) / 127.5 - 1
+        return loss_fn_vgg(img_restored, img_gt).item()
+
+    return lpips_fn
 
 
 def main(args):
-    """Calculate PSNR and SSIM for images.
+    """Calculate PSNR and SSIM (and optionally NIQE and LPIPS) for images.
+
+    The image pairs are decoded and scored once across a process pool. Use
+    `--save` to stream per-image results to a csv/jsonl file and `--resume` to
+    continue a partially scored folder.
     """
-    psnr_all = []
-    ssim_all = []
     img_list_gt = sorted(list(scandir(args.gt, recursive=True, full_path=True)))
     img_list_restored = sorted(list(scandir(args.restored, recursive=True, full_path=True)))
 
@@ -20,46 +39,35 @@ def main(args):
     else:
         print('Testing RGB channels.')
 
+    pairs = []
     for i, img_path in enumerate(img_list_gt):
         basename, ext = osp.splitext(osp.basename(img_path))
-        img_gt = cv2.imread(img_path, cv2.IMREAD_UNCHANGED).astype(np.float32) / 255.
         if args.suffix == '':
             img_path_restored = img_list_restored[i]
         else:
             img_path_restored = osp.join(args.restored, basename + args.suffix + ext)
-        img_restored = cv2.imread(img_path_restored, cv2.IMREAD_UNCHANGED).astype(np.float32) / 255.
-
-        if args.correct_mean_var:
-            mean_l = []
-            std_l = []
-            for j in range(3):
-                mean_l.append(np.mean(img_gt[:, :, j]))
-                std_l.append(np.std(img_gt[:, :, j]))
-            for j in range(3):
-                # correct twice
-                mean = np.mean(img_restored[:, :, j])
-                img_restored[:, :, j] = img_restored[:, :, j] - mean + mean_l[j]
-                std = np.std(img_restored[:, :, j])
-                img_restored[:, :, j] = img_restored[:, :, j] / std * std_l[j]
-
-                mean = np.mean(img_restored[:, :, j])
-                img_restored[:, :, j] = img_restored[:, :, j] - mean + mean_l[j]
-                std = np.std(img_restored[:, :, j])
-                img_restored[:, :, j] = img_restored[:, :, j] / std * std_l[j]
-
-        if args.test_y_channel and img_gt.ndim == 3 and img_gt.shape[2] == 3:
-            img_gt = bgr2ycbcr(img_gt, y_only=True)
-            img_restored = bgr2ycbcr(img_restored, y_only=True)
-
-        # calculate PSNR and SSIM
-        psnr = calculate_psnr(img_gt * 255, img_restored * 255, crop_border=args.crop_border, input_order='HWC')
-        ssim = calculate_ssim(img_gt * 255, img_restored * 255, crop_border=args.crop_border, input_order='HWC')
-        print(f'{i+1:3d}: {basename:25}. \tPSNR: {psnr:.6f} dB, \tSSIM: {ssim:.6f}')
-        psnr_all.append(psnr)
-        ssim_all.append(ssim)
+        pairs.append((osp.relpath(img_path, args.gt), img_path, img_path_restored))
+
+    def print_result(idx, row):
+        scores = ', \t'.join(f'{name.upper()}: {row[name]:.6f}' for name in args.metrics)
+        print(f'{idx+1:3d}: {osp.splitext(osp.basename(row["name"]))[0]:25}. \t{scores}')
+
+    results = score_folder(
+        pairs,
+        metrics=args.metrics,
+        crop_border=args.crop_border,
+        test_y_channel=args.test_y_channel,
+        correct_mean_var=args.correct_mean_var,
+        num_workers=args.num_workers,
+        result_path=args.save,
+        resume=args.resume,
+        lpips_fn=build_lpips_fn() if 'lpips' in args.metrics else None,
+        callback=print_result)
+
     print(args.gt)
     print(args.restored)
-    print(f'Average: PSNR: {sum(psnr_all) / len(psnr_all):.6f} dB, SSIM: {sum(ssim_all) / len(ssim_all):.6f}')
+    averages = ', '.join(f'{name.upper()}: {np.mean([row[name] for row in results]):.6f}' for name in args.metrics)
+    print(f'Average: {averages}')
 
 
 if __name__ == '__main__':
@@ -73,5 +81,15 @@ if __name__ == '__main__':
         action='store_true',
         help='If True, test Y channel (In MatLab YCbCr format). If False, test RGB channels.')
     parser.add_argument('--correct_mean_var', action='store_true', help='Correct the mean and var of restored images.')
+    parser.add_argument(
+        '--metrics',
+        type=str,
+        nargs='+',
+        default=['psnr', 'ssim'],
+        choices=['psnr', 'ssim', 'niqe', 'lpips'],
+        help='Metrics to calculate. NIQE is calculated on the restored images.')
+    parser.add_argument('--num_workers', type=int, default=8, help='Number of processes. 0 to score serially.')
+    parser.add_argument('--save', type=str, default=None, help='Path to save per-image results (.csv or .jsonl).')
+    parser.add_argument('--resume', action='store_true', help='Skip the images already recorded in --save.')
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,30 @@
+import cv2
+import numpy as np
+import pytest
+import torch
+
+from basicsr.data.data_util import FrameWindowCache, generate_frame_indices, read_img_seq
+
+
+@pytest.mark.parametrize('padding', ['replicate', 'reflection', 'reflection_circle', 'circle'])
+def test_frame_window_cache(tmp_path, padding):
+    """Test data: FrameWindowCache"""
+    num_frame, num_total = 5, 9
+    paths = []
+    for i in range(num_total):
+        path = str(tmp_path / f'{i:08d}.png')
+        cv2.imwrite(path, np.random.randint(0, 256, (8, 10, 3), dtype=np.uint8))
+        paths.append(path)
+
+    cache = FrameWindowCache(2 * num_frame)
+    for folder in ['a', 'b']:
+        for idx in range(num_total):
+            select_idx = generate_frame_indices(idx, num_total, num_frame, padding=padding)
+            assert torch.equal(cache.get(folder, paths, select_idx), read_img_seq([paths[i] for i in select_idx]))
+    # each frame is decoded once per folder
+    assert cache.num_decoded == 2 * num_total
+    assert cache.num_requested == 2 * num_total * num_frame
+    assert cache.nbytes == 2 * num_frame * 3 * 8 * 10 * 4
+
+    with pytest.raises(ValueError):
+        cache.get('a', paths, [0, 2 * num_frame])
@@ -0,0 +1,62 @@
+import numpy as np
+import os
+import time
+
+from basicsr.data.image_cache import SharedImageCache, read_image
+
+
+class _CountingClient():
+    """A file client that encodes random images and counts the reads."""
+
+    def __init__(self):
+        import cv2
+        self.num_reads = 0
+        self._bytes = cv2.imencode('.png', np.random.randint(0, 256, (16, 16, 3), dtype=np.uint8))[1].tobytes()
+
+    def get(self, path, client_key='default'):
+        self.num_reads += 1
+        return self._bytes
+
+
+def test_shared_image_cache(tmp_path):
+    """Test data: SharedImageCache"""
+    img = np.random.randint(0, 256, (64, 64, 3), dtype=np.uint8)
+    # room for about three images
+    cache = SharedImageCache(max_size_mb=3.5 * img.nbytes / 1024 / 1024, cache_dir=str(tmp_path), low_watermark=0.6)
+
+    assert cache.get('a') is None
+    assert cache.put('a', img)
+    np.testing.assert_array_equal(cache.get('a'), img)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    # exceeding the cap evicts the least recently used entries
+    for key in ['b', 'c']:
+        time.sleep(0.01)
+        cache.put(key, img)
+    time.sleep(0.01)
+    cache.get('a')  # refresh a
+    cache.put('d', img)
+    stats = cache.stats()
+    assert stats['evictions'] == 2
+    assert cache.get('b') is None and cache.get('c') is None
+    assert cache.get('a') is not None and cache.get('d') is not None
+    assert stats['size_mb'] <= 3.5 * img.nbytes / 1024 / 1024
+
+    # too large to be cached
+    assert not cache.put('e', np.zeros((256, 256, 3), dtype=np.uint8))
+
+    cache.close()
+    assert not os.path.exists(cache.cache_dir)
+
+
+def test_read_image(tmp_path):
+    """Test data: read_image"""
+    client = _CountingClient()
+    cache = SharedImageCache(max_size_mb=1, cache_dir=str(tmp_path))
+    uncached = read_image(client, 'x.png', 'lq')
+    for _ in range(3):
+        img = read_image(client, 'x.png', 'lq', cache)
+    assert client.num_reads == 2  # one without the cache, one miss
+    assert img.dtype == np.float32
+    np.testing.assert_array_equal(img, uncached)
+    cache.close()
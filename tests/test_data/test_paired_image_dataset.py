@@ -1,5 +1,10 @@
+import cv2
+import numpy as np
+import pytest
+import torch
 import yaml
 
+from basicsr.data.data_util import generate_subimage_index
 from basicsr.data.paired_image_dataset import PairedImageDataset
 
 
@@ -95,3 +100,59 @@ phase: train
     assert result['lq'].shape == (1, 120, 123)
     assert result['lq_path'] == 'baboon'
     assert result['gt_path'] == 'baboon'
+
+
+def test_pairedimagedataset_sub_images(tmp_path):
+    """Test dataset: PairedImageDataset with sub_images"""
+    # the same positions as extract_subimages.py: 0, 24, 40 (the last one aligned to the border)
+    assert generate_subimage_index([(72, 48, 3)], 32, 24) == [(0, top, left) for top in (0, 24, 40) for left in (0, 16)]
+
+    rng = np.random.RandomState(0)
+    for name in ['a', 'b']:
+        img_gt = rng.randint(0, 256, (72, 48, 3), dtype=np.uint8)
+        img_lq = cv2.resize(img_gt, (12, 18), interpolation=cv2.INTER_AREA)
+        for folder, img in [('gt', img_gt), ('lq', img_lq)]:
+            for ext in ['png', 'npy']:
+                (tmp_path / f'{folder}_{ext}').mkdir(exist_ok=True)
+                if ext == 'png':
+                    cv2.imwrite(str(tmp_path / f'{folder}_{ext}' / f'{name}.png'), img)
+                else:
+                    np.save(str(tmp_path / f'{folder}_{ext}' / f'{name}.npy'), img)
+
+    opt = dict(
+        type='PairedImageDataset',
+        io_backend=dict(type='disk'),
+        scale=4,
+        gt_size=16,
+        use_hflip=False,
+        use_rot=False,
+        sub_images=dict(crop_size=32, step=24),
+        phase='val')
+    results = {}
+    for ext in ['png', 'npy']:
+        opt.update(dataroot_gt=str(tmp_path / f'gt_{ext}'), dataroot_lq=str(tmp_path / f'lq_{ext}'))
+        opt['io_backend'] = dict(type='disk')
+        dataset = PairedImageDataset(opt)
+        assert len(dataset) == 12
+        results[ext] = [dataset[i] for i in range(len(dataset))]
+
+    img_gt = cv2.imread(str(tmp_path / 'gt_png' / 'b.png'))[24:56, 0:32, ::-1].astype(np.float32) / 255.
+    assert torch.equal(results['png'][8]['gt'], torch.from_numpy(img_gt.transpose(2, 0, 1).copy()))
+    for result_png, result_npy in zip(results['png'], results['npy']):
+        assert result_png['lq'].shape == (3, 8, 8)
+        assert torch.equal(result_png['gt'], result_npy['gt'])
+        assert torch.equal(result_png['lq'], result_npy['lq'])
+
+    # training: only the random patch is read
+    opt['phase'] = 'train'
+    opt['io_backend'] = dict(type='disk')
+    dataset = PairedImageDataset(opt)
+    result = dataset[0]
+    assert result['gt'].shape == (3, 16, 16)
+    assert result['lq'].shape == (3, 4, 4)
+
+    # the random patch should fit in the sub-image
+    opt['gt_size'] = 48
+    opt['io_backend'] = dict(type='disk')
+    with pytest.raises(ValueError):
+        PairedImageDataset(opt)
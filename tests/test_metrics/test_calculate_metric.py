@@ -0,0 +1,38 @@
+import numpy as np
+import torch
+
+from basicsr.metrics import calculate_metric
+from basicsr.utils import tensor2img
+from basicsr.utils.registry import METRIC_REGISTRY
+
+
+@METRIC_REGISTRY.register()
+def calculate_test_mean_diff(img, img2, **kwargs):
+    """A numpy metric without a batched version, only for tests."""
+    return float(np.mean(img.astype(np.float64) - img2.astype(np.float64)))
+
+
+def test_calculate_metric_batch():
+    """Test metric: calculate_metric with batched tensors"""
+    img = torch.rand(3, 3, 16, 16).mul(255).round().div(255)
+    img2 = torch.rand(3, 3, 16, 16).mul(255).round().div(255)
+
+    # routed to the batched version calculate_psnr_pt
+    out = calculate_metric({'img': img, 'img2': img2}, {'type': 'calculate_psnr', 'crop_border': 0})
+    assert out.shape == (3, )
+    for i in range(3):
+        expected = calculate_metric({
+            'img': tensor2img([img[i]]),
+            'img2': tensor2img([img2[i]])
+        }, {
+            'type': 'calculate_psnr',
+            'crop_border': 0
+        })
+        assert abs(out[i].item() - expected) < 1e-4
+
+    # mapped over the images
+    out = calculate_metric({'img': img, 'img2': img2}, {'type': 'calculate_test_mean_diff'})
+    assert out.shape == (3, )
+    for i in range(3):
+        expected = calculate_test_mean_diff(tensor2img([img[i]]), tensor2img([img2[i]]))
+        assert abs(out[i].item() - expected) < 1e-8
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+import torch
+
+from basicsr.metrics.fid import FeatureStats, InceptionFeatureCache, extract_inception_stats_from_paths
+
+
+def test_feature_stats():
+    """Test metric: FeatureStats"""
+    features = np.random.randn(100, 8).astype(np.float32)
+    stats = FeatureStats()
+    for i in range(0, 100, 7):
+        stats.update(torch.from_numpy(features[i:i + 7]))
+    assert stats.num == 100
+    np.testing.assert_allclose(stats.mean, np.mean(features, 0), atol=1e-6)
+    np.testing.assert_allclose(stats.cov, np.cov(features, rowvar=False), atol=1e-6)
+
+
+def test_extract_inception_stats_from_paths(tmp_path):
+    """Test metric: extract_inception_stats_from_paths"""
+    paths = []
+    for i in range(5):
+        path = str(tmp_path / f'{i}.png')
+        size = 8 if i < 3 else 12
+        cv2.imwrite(path, np.random.randint(0, 256, (size, size, 3), dtype=np.uint8))
+        paths.append(path)
+
+    num_calls = []
+
+    def inception(data):
+        num_calls.append(data.shape[0])
+        # a fake feature: the mean of each channel
+        return [data.mean((2, 3), keepdim=True)]
+
+    cache_path = str(tmp_path / 'cache' / 'features.npz')
+    stats = extract_inception_stats_from_paths(paths, inception, InceptionFeatureCache(cache_path), 2, 'cpu')
+    assert num_calls == [2, 1, 2]
+    features = []
+    for path in paths:
+        img = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB).astype(np.float32) / 127.5 - 1
+        features.append(img.mean((0, 1)))
+    np.testing.assert_allclose(stats.mean, np.mean(features, 0), atol=1e-5)
+    np.testing.assert_allclose(stats.cov, np.cov(np.stack(features), rowvar=False), atol=1e-5)
+
+    # only the changed image is passed through the inception model
+    num_calls.clear()
+    cv2.imwrite(paths[4], np.zeros((12, 12, 3), dtype=np.uint8))
+    cache = InceptionFeatureCache(cache_path)
+    assert len(cache.features) == 5
+    stats = extract_inception_stats_from_paths(paths, inception, cache, 2, 'cpu')
+    assert num_calls == [1]
+    assert stats.num == 5
+    np.testing.assert_allclose(stats.mean, np.mean(features[0:4] + [np.full(3, -1.)], 0), atol=1e-5)
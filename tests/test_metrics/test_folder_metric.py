@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+import pytest
+
+from basicsr.metrics.folder_metric import load_metric_results, score_folder, score_image_pair
+
+
+def _make_pairs(tmp_path, num):
+    rng = np.random.RandomState(0)
+    (tmp_path / 'gt').mkdir()
+    (tmp_path / 'restored').mkdir()
+    pairs = []
+    for i in range(num):
+        img = rng.randint(0, 256, (16, 20, 3), dtype=np.uint8)
+        noise = rng.randint(-8, 9, img.shape)
+        gt_path, restored_path = str(tmp_path / 'gt' / f'{i:03d}.png'), str(tmp_path / 'restored' / f'{i:03d}.png')
+        cv2.imwrite(gt_path, img)
+        cv2.imwrite(restored_path, np.clip(img + noise, 0, 255).astype(np.uint8))
+        pairs.append((f'{i:03d}.png', gt_path, restored_path))
+    return pairs
+
+
+def _assert_results_equal(results, expected):
+    assert [row['name'] for row in results] == [row['name'] for row in expected]
+    for row, exp in zip(results, expected):
+        assert row == pytest.approx(exp)
+
+
+@pytest.mark.parametrize('ext', ['csv', 'jsonl'])
+def test_score_folder(tmp_path, ext):
+    """Test metric: score_folder"""
+    pairs = _make_pairs(tmp_path, 5)
+    expected = [score_image_pair(gt, restored, crop_border=1)[0] for _, gt, restored in pairs]
+
+    result_path = str(tmp_path / f'results.{ext}')
+    results = score_folder(pairs, crop_border=1, num_workers=2, max_pending=2, result_path=result_path)
+    _assert_results_equal(results, [{'name': pair[0], **exp} for pair, exp in zip(pairs, expected)])
+    _assert_results_equal(load_metric_results(result_path), results)
+
+    # interrupted: two results are recorded, the last line is unfinished
+    with open(result_path) as f:
+        lines = f.readlines()
+    num_header = 1 if ext == 'csv' else 0
+    with open(result_path, 'w') as f:
+        f.writelines(lines[:num_header + 2] + [lines[num_header + 2][:5]])
+    scored = []
+    resumed = score_folder(
+        pairs,
+        crop_border=1,
+        num_workers=0,
+        result_path=result_path,
+        resume=True,
+        callback=lambda idx, _: scored.append(idx))
+    assert scored == [2, 3, 4]
+    _assert_results_equal(resumed, results)
+    with open(result_path) as f:
+        assert len(f.readlines()) == num_header + 5
+
+    # lpips is calculated in the calling process on the decoded images
+    results = score_folder(
+        pairs[0:2], metrics=('psnr', 'lpips'), num_workers=0, lpips_fn=lambda gt, restored: float(gt.shape[0]))
+    assert [row['lpips'] for row in results] == [16., 16.]
+
+    with pytest.raises(ValueError):
+        score_folder(pairs, metrics=('lpips', ))
+    # the gt image is required for full-reference metrics
+    with pytest.raises(ValueError):
+        score_image_pair(None, pairs[0][2], metrics=('psnr', ))
@@ -0,0 +1,69 @@
+import cv2
+import math
+import numpy as np
+import torch
+from scipy.ndimage import convolve
+
+from basicsr.metrics.niqe import (_load_pris_params, _mvg_quality, calculate_niqe, calculate_niqe_pt, compute_feature,
+                                  compute_feature_batch, niqe)
+from basicsr.utils.matlab_functions import imresize
+
+
+def _make_image(seed=0, size=(200, 296)):
+    rng = np.random.RandomState(seed)
+    img = cv2.resize(rng.rand(size[0] // 8, size[1] // 8, 3), (size[1], size[0]), interpolation=cv2.INTER_CUBIC)
+    img = img + rng.rand(*size, 3) * 0.1
+    return (np.clip(img, 0, 1) * 255).round().astype(np.uint8)
+
+
+def _niqe_loop(img, mu_pris_param, cov_pris_param, gaussian_window, block_size=96):
+    """Reference: one compute_feature call per block."""
+    num_block_h, num_block_w = img.shape[0] // block_size, img.shape[1] // block_size
+    img = img[0:num_block_h * block_size, 0:num_block_w * block_size]
+    distparam = []
+    for scale in (1, 2):
+        img = img.astype(np.float64)
+        mu = convolve(img, gaussian_window, mode='nearest')
+        sigma = np.sqrt(np.abs(convolve(np.square(img), gaussian_window, mode='nearest') - np.square(mu)))
+        img_nomalized = (img - mu) / (sigma + 1)
+        size = block_size // scale
+        feat = []
+        for idx_w in range(num_block_w):
+            for idx_h in range(num_block_h):
+                feat.append(
+                    compute_feature(img_nomalized[idx_h * size:(idx_h + 1) * size, idx_w * size:(idx_w + 1) * size]))
+        distparam.append(np.array(feat))
+        if scale == 1:
+            img = imresize(img / 255., scale=0.5, antialiasing=True) * 255.
+    return _mvg_quality(np.concatenate(distparam, axis=1), mu_pris_param, cov_pris_param)
+
+
+def test_compute_feature_batch():
+    """Test metric: compute_feature_batch"""
+    rng = np.random.RandomState(0)
+    blocks = rng.randn(5, 48, 48).astype(np.float32)
+    blocks[0] = np.abs(blocks[0])  # no negative values: NaN features
+    feat = compute_feature_batch(blocks)
+    assert feat.shape == (5, 18)
+    for block, block_feat in zip(blocks, feat):
+        np.testing.assert_allclose(block_feat, np.array(compute_feature(block)), rtol=1e-4, atol=1e-6)
+
+
+def test_niqe():
+    """Test metric: niqe"""
+    mu_pris_param, cov_pris_param, gaussian_window = _load_pris_params()
+    img = cv2.cvtColor(_make_image(), cv2.COLOR_BGR2GRAY).astype(np.float32)
+    reference = _niqe_loop(img, mu_pris_param, cov_pris_param, gaussian_window)
+    assert math.isclose(niqe(img, mu_pris_param, cov_pris_param, gaussian_window), reference, abs_tol=1e-4)
+
+
+def test_calculate_niqe_pt():
+    """Test metric: calculate_niqe_pt"""
+    imgs = [_make_image(seed) for seed in range(2)]
+    batch = torch.stack([torch.from_numpy(img[..., ::-1].transpose(2, 0, 1).copy()) for img in imgs]).float() / 255.
+    for convert_to in ('y', 'gray'):
+        outputs = calculate_niqe_pt(batch, crop_border=2, convert_to=convert_to)
+        assert outputs.shape == (2, )
+        for img, output in zip(imgs, outputs):
+            reference = calculate_niqe(img, crop_border=2, convert_to=convert_to)
+            assert math.isclose(output.item(), reference, abs_tol=1e-4)
@@ -1,7 +1,9 @@
 import numpy as np
 import pytest
+import torch
 
-from basicsr.metrics.psnr_ssim import calculate_psnr, calculate_ssim
+from basicsr.metrics.psnr_ssim import (_ssim, _ssim_pth, _ssim_separable, _ssim_separable_pth, calculate_psnr,
+                                       calculate_ssim, calculate_ssim_pt)
 
 
 def test_calculate_psnr():
@@ -36,3 +38,29 @@ def test_calculate_ssim():
 
     out = calculate_ssim(np.ones((10, 10, 3)), np.ones((10, 10, 3)) * 2, crop_border=1, test_y_channel=True)
     assert isinstance(out, float)
+
+
+@pytest.mark.parametrize('num_channels', [1, 3])
+def test_ssim_separable(num_channels):
+    """Test metric: _ssim_separable and _ssim_separable_pth"""
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, 256, (2, 37, 45, num_channels)).astype(np.float64)
+    img2 = np.clip(img + rng.randint(-20, 21, img.shape), 0, 255)
+
+    # numpy: the same as the 2D window per channel
+    for i in range(2):
+        expected = np.mean([_ssim(img[i, ..., c], img2[i, ..., c]) for c in range(num_channels)])
+        assert _ssim_separable(img[i], img2[i]) == pytest.approx(expected, abs=1e-8)
+        # several strips, the last one shorter
+        assert _ssim_separable(img[i], img2[i], strip_size=8) == pytest.approx(expected, abs=1e-8)
+        assert calculate_ssim(img[i], img2[i], crop_border=0) == pytest.approx(expected, abs=1e-8)
+
+    # torch: batched (n, c, h, w)
+    img_pt = torch.from_numpy(img.transpose(0, 3, 1, 2).copy())
+    img2_pt = torch.from_numpy(img2.transpose(0, 3, 1, 2).copy())
+    out = _ssim_separable_pth(img_pt, img2_pt)
+    assert out.shape == (2, )
+    expected = _ssim_pth(img_pt, img2_pt)
+    assert torch.allclose(out, expected, rtol=0, atol=1e-8)
+    out = calculate_ssim_pt(img_pt / 255., img2_pt / 255., crop_border=0)
+    assert torch.allclose(out, expected, rtol=0, atol=1e-8)
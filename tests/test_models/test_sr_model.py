@@ -1,6 +1,14 @@
+import cv2
+import math
+import numpy as np
+import os
+import pytest
 import tempfile
 import torch
+import torch.multiprocessing as mp
 import yaml
+from os import path as osp
+from torch import distributed as dist
 
 from basicsr.archs.srresnet_arch import MSRResNet
 from basicsr.data.paired_image_dataset import PairedImageDataset
@@ -163,3 +171,167 @@ val:
         # check metric_results
         assert 'psnr' in model.metric_results
         assert isinstance(model.metric_results['psnr'], float)
+
+
+def test_srmodel_amp():
+    """Test model: SRModel with train: amp and channels_last on CPU"""
+
+    def build_opt(amp, channels_last):
+        return {
+            'scale': 2,
+            'num_gpu': 0,
+            'is_train': True,
+            'dist': False,
+            'network_g': dict(type='MSRResNet', num_in_ch=3, num_out_ch=3, num_feat=4, num_block=1, upscale=2),
+            'path': dict(pretrain_network_g=None, strict_load_g=True, resume_state=None),
+            'train': {
+                'amp': amp,
+                'channels_last': channels_last,
+                'optim_g': dict(type='Adam', lr=1e-3),
+                'scheduler': dict(type='MultiStepLR', milestones=[100], gamma=0.5),
+                'pixel_opt': dict(type='L1Loss', loss_weight=1.0, reduction='mean')
+            }
+        }
+
+    torch.manual_seed(0)
+    model = SRModel(build_opt('bf16', True))
+    assert model.amp_dtype == torch.bfloat16
+    assert model.memory_format == torch.channels_last
+    # loss scaling is only for fp16
+    assert not model.grad_scaler.is_enabled()
+
+    weights = {name: param.detach().clone() for name, param in model.net_g.named_parameters()}
+    model.feed_data(dict(lq=torch.rand(2, 3, 8, 8), gt=torch.rand(2, 3, 16, 16)))
+    assert model.lq.is_contiguous(memory_format=torch.channels_last)
+    model.optimize_parameters(1)
+
+    assert model.output.dtype == torch.bfloat16
+    assert all(math.isfinite(value) for value in model.log_dict.values())
+    for name, param in model.net_g.named_parameters():
+        assert param.dtype == torch.float32
+        assert not torch.equal(param, weights[name]), f'{name} is not updated.'
+
+    # amp off: fp32 training with a disabled scaler
+    model = SRModel(build_opt(False, False))
+    assert model.amp_dtype is None
+    assert model.memory_format == torch.contiguous_format
+    assert not model.grad_scaler.is_enabled()
+    model.feed_data(dict(lq=torch.rand(2, 3, 8, 8), gt=torch.rand(2, 3, 16, 16)))
+    model.optimize_parameters(1)
+    assert model.output.dtype == torch.float32
+    assert math.isfinite(model.log_dict['l_pix'])
+
+
+def test_srmodel_amp_torch_compat(monkeypatch):
+    """Test model: SRModel train: amp with older PyTorch versions"""
+    opt = {
+        'scale': 2,
+        'num_gpu': 0,
+        'is_train': False,
+        'dist': False,
+        'network_g': dict(type='MSRResNet', num_in_ch=3, num_out_ch=3, num_feat=4, num_block=1, upscale=2),
+        'path': dict(pretrain_network_g=None, strict_load_g=True),
+        'train': dict(amp='bf16')
+    }
+    # PyTorch < 2.3: torch.cuda.amp.GradScaler
+    monkeypatch.delattr(torch.amp, 'GradScaler')
+    model = SRModel(opt)
+    assert isinstance(model.grad_scaler, torch.cuda.amp.GradScaler)
+    assert not model.grad_scaler.is_enabled()
+
+    # PyTorch < 1.10: no torch.autocast
+    monkeypatch.delattr(torch, 'autocast')
+    with pytest.raises(ValueError, match='PyTorch >= 1.10'):
+        SRModel(opt)
+    # fp32 training does not need it
+    opt['train']['amp'] = False
+    assert SRModel(opt).amp_dtype is None
+
+
+class _PairedTensorDataset(torch.utils.data.Dataset):
+    """Synthetic lq/gt pairs of two sizes, in the format of PairedImageDataset."""
+
+    def __init__(self, num_imgs=5, scale=2):
+        self.opt = dict(name='Synthetic')
+        generator = torch.Generator().manual_seed(0)
+        self.lqs = [torch.rand(3, 12 + 4 * (i % 2), 12, generator=generator) for i in range(num_imgs)]
+        self.gts = [torch.rand(3, lq.size(1) * scale, lq.size(2) * scale, generator=generator) for lq in self.lqs]
+
+    def __getitem__(self, index):
+        return dict(lq=self.lqs[index], gt=self.gts[index], lq_path=f'{index:04d}.png', gt_path=f'{index:04d}.png')
+
+    def __len__(self):
+        return len(self.lqs)
+
+
+def _build_val_model(visualization):
+    opt = {
+        'name': 'test',
+        'scale': 2,
+        'num_gpu': 0,
+        'is_train': False,
+        'dist': False,
+        'network_g': dict(type='MSRResNet', num_in_ch=3, num_out_ch=3, num_feat=4, num_block=1, upscale=2),
+        'path': dict(pretrain_network_g=None, strict_load_g=True, visualization=visualization),
+        'val': {
+            'suffix': None,
+            'metrics': {
+                'psnr': dict(type='calculate_psnr', crop_border=2, test_y_channel=False),
+                'ssim': dict(type='calculate_ssim', crop_border=2, test_y_channel=True)
+            }
+        }
+    }
+    torch.manual_seed(0)
+    return SRModel(opt)
+
+
+def test_srmodel_batched_validation():
+    """Test model: SRModel with val: batch_size > 1 on CPU"""
+    dataloader = torch.utils.data.DataLoader(_PairedTensorDataset(), batch_size=1, shuffle=False, num_workers=0)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model = _build_val_model(osp.join(tmpdir, 'single'))
+        model.nondist_validation(dataloader, 1, None, save_img=True)
+        expected = dict(model.metric_results)
+
+        # the batches (of 2 and 3 images) are incomplete, bucketed by size and flushed at the end
+        for batch_size in (2, 3):
+            model.opt['path']['visualization'] = osp.join(tmpdir, f'batch{batch_size}')
+            model.opt['val']['batch_size'] = batch_size
+            model.nondist_validation(dataloader, 1, None, save_img=True)
+            for metric, value in expected.items():
+                assert math.isclose(model.metric_results[metric], value, abs_tol=1e-4)
+            for index in range(len(dataloader)):
+                img = cv2.imread(osp.join(tmpdir, 'single', 'Synthetic', f'{index:04d}_test.png'))
+                batched_img = cv2.imread(osp.join(tmpdir, f'batch{batch_size}', 'Synthetic', f'{index:04d}_test.png'))
+                assert img is not None and np.array_equal(img, batched_img)
+
+
+def _dist_validation_worker(rank, world_size, init_file, tmpdir):
+    dist.init_process_group('gloo', init_method=f'file://{init_file}', rank=rank, world_size=world_size)
+    try:
+        dataset = _PairedTensorDataset()
+        dataloader = torch.utils.data.DataLoader(dataset, batch_size=1, shuffle=False, num_workers=0)
+        for batch_size in (1, 2):
+            visualization = osp.join(tmpdir, f'batch{batch_size}')
+            model = _build_val_model(visualization)
+            model.opt['val']['batch_size'] = batch_size
+            model.nondist_validation(dataloader, 1, None, save_img=False)
+            expected = dict(model.metric_results)
+
+            model.dist_validation(dataloader, 1, None, save_img=True)
+            for metric, value in expected.items():
+                assert math.isclose(model.metric_results[metric], value, abs_tol=1e-6), (rank, batch_size, metric)
+            # each rank saves its own shard
+            dist.barrier()
+            img_names = sorted(os.listdir(osp.join(visualization, 'Synthetic')))
+            assert img_names == [f'{index:04d}_test.png' for index in range(len(dataset))]
+    finally:
+        dist.destroy_process_group()
+
+
+def test_srmodel_dist_validation():
+    """Test model: SRModel dist_validation with 2 gloo ranks on CPU"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        init_file = osp.join(tmpdir, 'dist_init')
+        mp.spawn(_dist_validation_worker, args=(2, init_file, tmpdir), nprocs=2, join=True)
@@ -0,0 +1,98 @@
+import cv2
+import http.client
+import json
+import numpy as np
+import os
+import pytest
+import socket
+import threading
+import torch
+from torch import nn
+
+from basicsr.serve import BatchScheduler, build_server
+
+
+def test_batch_scheduler():
+    """Test serve: BatchScheduler"""
+    model = nn.Upsample(scale_factor=2, mode='nearest')
+    model.register_parameter('dummy', nn.Parameter(torch.zeros(1)))
+    scheduler = BatchScheduler(model, torch.device('cpu'), max_batch_size=4, max_latency=0.5)
+    try:
+        # requests of equal size are coalesced into one batch
+        imgs = [np.full((8, 8, 3), i, dtype=np.uint8) for i in range(3)]
+        requests = [scheduler.submit(img) for img in imgs]
+        other = scheduler.submit(np.zeros((6, 6, 3), dtype=np.uint8))
+        for request in requests + [other]:
+            assert request.done.wait(5)
+        assert [request.batch_size for request in requests] == [3, 3, 3]
+        assert other.batch_size == 1
+        for i, request in enumerate(requests):
+            assert request.output.shape == (16, 16, 3)
+            assert (request.output == i).all()
+        assert set(requests[0].timings) == {'decode', 'queue', 'forward'}
+
+        # cancel a queued request
+        scheduler.max_latency = 10
+        request = scheduler.submit(imgs[0])
+        assert scheduler.cancel(request.id)
+        assert request.done.is_set() and request.cancelled and request.output is None
+        assert not scheduler.cancel(request.id)
+    finally:
+        scheduler.stop()
+
+
+def _build_model():
+    model = nn.Upsample(scale_factor=2, mode='nearest')
+    model.register_parameter('dummy', nn.Parameter(torch.zeros(1)))
+    return model
+
+
+def test_serve_timeout_query():
+    """Test serve: the timeout query is validated"""
+    opt = {'serve': dict(host='127.0.0.1', port=0, max_latency_ms=1)}
+    server = build_server(opt, _build_model(), torch.device('cpu'))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        _, body = cv2.imencode('.png', np.zeros((8, 8, 3), dtype=np.uint8))
+        connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+        # the connection is kept alive after the 400 responses
+        for timeout in ('abc', 'nan', 'inf', '-1', '0'):
+            connection.request('POST', f'/sr?timeout={timeout}', body.tobytes())
+            response = connection.getresponse()
+            assert response.status == 400
+            assert 'timeout' in json.loads(response.read())['error']
+        connection.request('POST', '/sr?timeout=5', body.tobytes())
+        response = connection.getresponse()
+        assert response.status == 200
+        output = cv2.imdecode(np.frombuffer(response.read(), np.uint8), cv2.IMREAD_COLOR)
+        assert output.shape == (16, 16, 3)
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.scheduler.stop()
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='requires unix sockets')
+def test_serve_unix_socket(tmp_path):
+    """Test serve: only a stale socket is removed before binding"""
+    path = str(tmp_path / 'sr.sock')
+    # a regular file is never removed
+    with open(path, 'w') as f:
+        f.write('data')
+    with pytest.raises(FileExistsError):
+        build_server({'serve': dict(unix_socket=path)}, _build_model(), torch.device('cpu'))
+    assert os.path.isfile(path)
+
+    # a stale socket of a previous run is replaced
+    os.remove(path)
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = build_server({'serve': dict(unix_socket=path)}, _build_model(), torch.device('cpu'))
+    try:
+        assert server.server_address == path
+    finally:
+        server.server_close()
+        server.scheduler.stop()
@@ -0,0 +1,107 @@
+import os
+import pytest
+import threading
+import torch
+
+from basicsr.utils.checkpoint_util import AsyncCheckpointWriter, snapshot_to_cpu
+
+
+def test_snapshot_to_cpu():
+    """Test utils: snapshot_to_cpu"""
+    state = {'params': {'weight': torch.ones(2, 2)}, 'optimizers': [{'step': 3, 'exp_avg': torch.zeros(2)}]}
+    snapshot = snapshot_to_cpu(state, pin_memory=False)
+    state['params']['weight'].add_(1)
+    state['optimizers'][0]['exp_avg'].add_(1)
+    # the snapshot is not changed by the training
+    assert torch.equal(snapshot['params']['weight'], torch.ones(2, 2))
+    assert torch.equal(snapshot['optimizers'][0]['exp_avg'], torch.zeros(2))
+    assert snapshot['optimizers'][0]['step'] == 3
+
+
+def test_async_checkpoint_writer(tmp_path):
+    """Test utils: AsyncCheckpointWriter"""
+    writer = AsyncCheckpointWriter(max_pending=1, keep_latest=2, pin_memory=False)
+    writer.set_protected([1000])
+    weight = torch.zeros(4)
+    for current_iter in range(1000, 6000, 1000):
+        weight.fill_(current_iter)
+        writer.save({'params': {'weight': weight}}, str(tmp_path / f'net_g_{current_iter}.pth'))
+        writer.save({'iter': current_iter}, str(tmp_path / f'{current_iter}.state'))
+    writer.save({'params': {'weight': weight}}, str(tmp_path / 'net_g_latest.pth'))
+    writer.close()
+
+    # the latest two, the protected one and the one without iteration are kept, no temporary files are left
+    assert sorted(os.listdir(tmp_path)) == [
+        '1000.state', '4000.state', '5000.state', 'net_g_1000.pth', 'net_g_4000.pth', 'net_g_5000.pth',
+        'net_g_latest.pth'
+    ]
+    assert torch.equal(torch.load(str(tmp_path / 'net_g_4000.pth'))['params']['weight'], torch.full((4, ), 4000.))
+    assert torch.load(str(tmp_path / '5000.state'))['iter'] == 5000
+
+
+def test_async_checkpoint_writer_retry(tmp_path, monkeypatch):
+    """Test utils: AsyncCheckpointWriter retries failed writes"""
+    from basicsr.utils import checkpoint_util
+
+    torch_save = torch.save
+    calls = []
+
+    def flaky_save(obj, path):
+        calls.append(path)
+        # the first two attempts of the last checkpoint fail, the third succeeds
+        if path.endswith('net_g_3000.pth.tmp') and len([p for p in calls if p == path]) < 3:
+            raise IOError('disk busy')
+        torch_save(obj, path)
+
+    monkeypatch.setattr(checkpoint_util.torch, 'save', flaky_save)
+    monkeypatch.setattr(checkpoint_util.time, 'sleep', lambda _: None)
+    writer = AsyncCheckpointWriter(keep_latest=1, pin_memory=False)
+    for current_iter in (1000, 2000, 3000):
+        writer.save({'iter': current_iter}, str(tmp_path / f'net_g_{current_iter}.pth'))
+    writer.close()
+
+    # the checkpoint saved at the last attempt is kept and the old ones are pruned
+    assert sorted(os.listdir(tmp_path)) == ['net_g_3000.pth']
+
+
+def test_async_checkpoint_writer_slots(tmp_path, monkeypatch):
+    """Test utils: AsyncCheckpointWriter takes a slot before the snapshot"""
+    from basicsr.utils import checkpoint_util
+
+    torch_save = torch.save
+    snapshot = checkpoint_util.snapshot_to_cpu
+    unblock = threading.Event()
+    snapshots = []
+
+    def blocked_save(obj, path):
+        unblock.wait(10)
+        torch_save(obj, path)
+
+    def counted_snapshot(obj, pin_memory):
+        snapshots.append(obj['iter'])
+        return snapshot(obj, pin_memory)
+
+    monkeypatch.setattr(checkpoint_util.torch, 'save', blocked_save)
+    monkeypatch.setattr(checkpoint_util, 'snapshot_to_cpu', counted_snapshot)
+    writer = AsyncCheckpointWriter(max_pending=1, pin_memory=False)
+    writer.save({'iter': 1000}, str(tmp_path / '1000.state'))
+    # the second save waits for the slot before taking its snapshot
+    thread = threading.Thread(target=writer.save, args=({'iter': 2000}, str(tmp_path / '2000.state')))
+    thread.start()
+    thread.join(0.5)
+    assert thread.is_alive() and snapshots == [1000]
+    unblock.set()
+    thread.join(10)
+    assert snapshots == [1000, 2000]
+
+    # a failed snapshot releases its slot
+    def failed_snapshot(obj, pin_memory):
+        raise RuntimeError('out of memory')
+
+    monkeypatch.setattr(checkpoint_util, 'snapshot_to_cpu', failed_snapshot)
+    with pytest.raises(RuntimeError):
+        writer.save({'iter': 3000}, str(tmp_path / '3000.state'))
+    monkeypatch.setattr(checkpoint_util, 'snapshot_to_cpu', counted_snapshot)
+    writer.save({'iter': 4000}, str(tmp_path / '4000.state'))
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == ['1000.state', '2000.state', '4000.state']
@@ -0,0 +1,31 @@
+import lmdb
+
+from basicsr.utils import FileClient
+
+
+def test_file_client_get_many(tmp_path):
+    """Test utils: FileClient.get_many and prefetch"""
+    paths = []
+    for i in range(5):
+        path = tmp_path / f'{i}.txt'
+        path.write_bytes(f'content {i}'.encode())
+        paths.append(str(path))
+    expected = [f'content {i}'.encode() for i in range(5)]
+
+    for prefetch_threads in [0, 2]:
+        file_client = FileClient('disk', prefetch_threads=prefetch_threads, num_threads=3)
+        assert file_client.get_many(paths) == expected
+        file_client.prefetch(paths[1:3])
+        assert file_client.get(paths[1]) == expected[1]
+        assert file_client.get_many(paths[::-1]) == expected[::-1]
+        assert len(file_client._prefetched) == 0
+
+    lmdb_path = str(tmp_path / 'test.lmdb')
+    env = lmdb.open(lmdb_path, map_size=1024**2)
+    with env.begin(write=True) as txn:
+        for i in range(5):
+            txn.put(f'{i:03d}'.encode('ascii'), expected[i])
+    env.close()
+    file_client = FileClient('lmdb', db_paths=[lmdb_path], client_keys=['lq'], prefetch_threads=2)
+    file_client.prefetch(['004'], 'lq')
+    assert file_client.get_many([f'{i:03d}' for i in range(5)], 'lq') == expected
@@ -0,0 +1,37 @@
+import cv2
+import lmdb
+import numpy as np
+import os
+
+from basicsr.utils.lmdb_util import make_lmdb_from_imgs
+
+
+def test_make_lmdb_from_imgs(tmp_path):
+    """Test utils: make_lmdb_from_imgs"""
+    data_path = tmp_path / 'imgs'
+    data_path.mkdir()
+    keys = [f'{i:04d}' for i in range(7)]
+    for key in keys:
+        cv2.imwrite(str(data_path / f'{key}.png'), np.random.randint(0, 256, (8, 12, 3), dtype=np.uint8))
+    img_path_list = [f'{key}.png' for key in keys]
+
+    lmdb_path = str(tmp_path / 'imgs.lmdb')
+    make_lmdb_from_imgs(
+        str(data_path), lmdb_path, img_path_list, keys, batch=2, multiprocessing_read=True, n_thread=2, max_pending=2)
+    meta_path = os.path.join(lmdb_path, 'meta_info.txt')
+    with open(meta_path) as f:
+        meta_info = f.read()
+    assert meta_info == ''.join(f'{key}.png (8,12,3) 1\n' for key in keys)
+    env = lmdb.open(lmdb_path, readonly=True, lock=False)
+    with env.begin() as txn:
+        for key in keys:
+            img = cv2.imdecode(np.frombuffer(txn.get(key.encode('ascii')), np.uint8), cv2.IMREAD_UNCHANGED)
+            np.testing.assert_array_equal(img, cv2.imread(str(data_path / f'{key}.png'), cv2.IMREAD_UNCHANGED))
+    env.close()
+
+    # interrupted: only three images are recorded, the last line is unfinished
+    with open(meta_path, 'w') as f:
+        f.write(meta_info[:meta_info.index('0003.png') + 5])
+    make_lmdb_from_imgs(str(data_path), lmdb_path, img_path_list, keys, batch=2, resume=True)
+    with open(meta_path) as f:
+        assert f.read() == meta_info
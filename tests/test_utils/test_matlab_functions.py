@@ -0,0 +1,61 @@
+import math
+import numpy as np
+import pytest
+import torch
+
+from basicsr.utils.matlab_functions import calculate_weights_indices, imresize
+
+
+def _imresize_loop(img, scale, antialiasing=True):
+    """Reference: the per-row/column/channel loop with explicit symmetric padding."""
+    in_c, in_h, in_w = img.size()
+    out_h, out_w = math.ceil(in_h * scale), math.ceil(in_w * scale)
+    weights_h, indices_h, sym_hs, sym_he = calculate_weights_indices(in_h, out_h, scale, 'cubic', 4, antialiasing)
+    weights_w, indices_w, sym_ws, sym_we = calculate_weights_indices(in_w, out_w, scale, 'cubic', 4, antialiasing)
+
+    img_aug = torch.cat([img[:, :sym_hs].flip(1), img, img[:, in_h - sym_he:].flip(1)], dim=1)
+    out_1 = torch.zeros(in_c, out_h, in_w)
+    for i in range(out_h):
+        idx = int(indices_h[i][0])
+        for j in range(in_c):
+            out_1[j, i, :] = img_aug[j, idx:idx + weights_h.size(1), :].transpose(0, 1).mv(weights_h[i])
+
+    out_1_aug = torch.cat([out_1[:, :, :sym_ws].flip(2), out_1, out_1[:, :, in_w - sym_we:].flip(2)], dim=2)
+    out_2 = torch.zeros(in_c, out_h, out_w)
+    for i in range(out_w):
+        idx = int(indices_w[i][0])
+        for j in range(in_c):
+            out_2[j, :, i] = out_1_aug[j, :, idx:idx + weights_w.size(1)].mv(weights_w[i])
+    return out_2
+
+
+@pytest.mark.parametrize('scale', [0.25, 0.5, 1 / 3, 2, 4])
+def test_imresize(scale):
+    """Test utils: imresize"""
+    # the same uint8 results as the loop implementation
+    rng = np.random.RandomState(0)
+    img_uint8 = torch.from_numpy(rng.randint(0, 256, (3, 40, 52)).astype(np.float32) / 255.)
+    output = (imresize(img_uint8, scale) * 255.).round().clamp_(0, 255).byte()
+    reference = (_imresize_loop(img_uint8, scale) * 255.).round().clamp_(0, 255).byte()
+    assert torch.equal(output, reference)
+
+    torch.manual_seed(0)
+    img = torch.rand(3, 23, 30)
+    output = imresize(img, scale)
+    reference = _imresize_loop(img, scale)
+    assert output.shape == reference.shape
+    assert torch.allclose(output, reference, atol=1e-6)
+
+    # batched input gives the same result as one image at a time
+    batch = torch.rand(2, 3, 23, 30)
+    output = imresize(batch, scale)
+    for i in range(2):
+        assert torch.allclose(output[i], imresize(batch[i], scale), atol=1e-6)
+
+    # numpy HWC and 2D inputs
+    img_np = img.numpy().transpose(1, 2, 0)
+    output = imresize(img_np, scale)
+    assert isinstance(output, np.ndarray)
+    np.testing.assert_allclose(output, reference.numpy().transpose(1, 2, 0), atol=1e-6)
+    output = imresize(img_np[..., 0], scale)
+    np.testing.assert_allclose(output, reference[0].numpy(), atol=1e-6)
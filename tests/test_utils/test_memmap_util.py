@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+import pytest
+
+from basicsr.data.image_cache import read_image, read_image_region
+from basicsr.utils import FileClient
+from basicsr.utils.memmap_util import make_memmap_from_imgs, read_img_array_worker
+
+
+def test_memmap_backend(tmp_path):
+    """Test utils: make_memmap_from_imgs and the memmap FileClient backend"""
+    data_path = tmp_path / 'imgs'
+    data_path.mkdir()
+    imgs = {}
+    for i, shape in enumerate([(8, 12, 3), (10, 6, 3), (7, 9)]):
+        imgs[f'{i:04d}'] = np.random.randint(0, 256, shape, dtype=np.uint8)
+        cv2.imwrite(str(data_path / f'{i:04d}.png'), imgs[f'{i:04d}'])
+    keys = sorted(imgs.keys())
+
+    memmap_path = str(tmp_path / 'imgs.memmap')
+    # a shard holds at most 300 bytes: the first image (288 bytes) fills shard 0
+    make_memmap_from_imgs(
+        str(data_path), memmap_path, [f'{key}.png' for key in keys], keys, shard_size_mb=300 / 1024 / 1024, n_thread=2)
+    with open(f'{memmap_path}/meta_info.txt') as f:
+        assert f.read() == '0000.png (8,12,3) 0 0 0\n0001.png (10,6,3) 0 1 0\n0002.png (7,9,1) 0 1 180\n'
+
+    file_client = FileClient('memmap', db_paths=[memmap_path], client_keys=['gt'])
+    for key in keys:
+        img = file_client.get(key, 'gt')
+        np.testing.assert_array_equal(img, imgs[key].reshape(img.shape))
+    np.testing.assert_array_equal(
+        read_image_region(file_client, '0000', (2, 3, 4, 5), 'gt'), imgs['0000'][2:6, 3:8].astype(np.float32) / 255.)
+    np.testing.assert_array_equal(read_image(file_client, '0001', 'gt'), imgs['0001'].astype(np.float32) / 255.)
+
+
+def test_read_img_array_worker(tmp_path):
+    """Test utils: read_img_array_worker"""
+    path = str(tmp_path / 'img.png')
+    cv2.imwrite(path, np.random.randint(0, 256, (4, 5), dtype=np.uint8))
+    assert read_img_array_worker(path).shape == (4, 5, 1)
+
+    # 16-bit images cannot be stored as uint8 shards
+    cv2.imwrite(path, np.random.randint(0, 65536, (4, 5, 3), dtype=np.uint16))
+    with pytest.raises(ValueError):
+        read_img_array_worker(path)
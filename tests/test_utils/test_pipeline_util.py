@@ -0,0 +1,34 @@
+import numpy as np
+
+from basicsr.utils.pipeline_util import run_folder_pipeline
+
+
+def test_run_folder_pipeline():
+    """Test utils: run_folder_pipeline"""
+    shapes = {'a': (4, 4), 'b': (4, 4), 'c': (8, 8), 'd': None, 'e': (4, 4)}
+    batches = []
+    written = {}
+    events = []
+
+    def read_fn(item):
+        return None if shapes[item] is None else np.full(shapes[item], ord(item), dtype=np.uint8)
+
+    def infer_fn(imgs):
+        batches.append([img.shape for img in imgs])
+        return [img * 2 for img in imgs]
+
+    def write_fn(item, result):
+        written[item] = result
+
+    def callback(idx, item, error):
+        events.append((idx, item, error is None))
+
+    stats = run_folder_pipeline(
+        list(shapes), read_fn, infer_fn, write_fn, batch_size=2, queue_size=2, callback=callback)
+
+    # only consecutive same-size images are batched
+    assert batches == [[(4, 4), (4, 4)], [(8, 8)], [(4, 4)]]
+    assert sorted(written) == ['a', 'b', 'c', 'e']
+    assert np.array_equal(written['c'], np.full((8, 8), ord('c'), dtype=np.uint8) * 2)
+    assert sorted(events) == [(0, 'a', True), (1, 'b', True), (2, 'c', True), (3, 'd', False), (4, 'e', True)]
+    assert stats['num_done'] == 4 and stats['num_failed'] == 1
@@ -0,0 +1,38 @@
+import json
+import time
+
+from basicsr.utils.profiler_util import StepProfiler, build_step_profiler
+
+
+def test_step_profiler(tmp_path):
+    """Test utils: StepProfiler"""
+    trace_path = str(tmp_path / 'step_trace.json')
+    profiler = StepProfiler(trace_path=trace_path)
+    for current_iter in range(1, 3):
+        profiler.step(current_iter)
+        with profiler.section('data', host=True):
+            time.sleep(0.01)
+        with profiler.section('g_forward'):
+            pass
+    # sections of validation are not recorded
+    with profiler.paused():
+        with profiler.section('h2d'):
+            pass
+    profile = profiler.summary()
+    assert list(profile.keys()) == ['data', 'g_forward']
+    assert profile['data'] >= 10  # average per iter in ms
+    assert profiler.summary() == {}
+    profiler.close()
+
+    with open(trace_path) as f:
+        events = json.load(f)
+    assert [(event['name'], event['args']['iter']) for event in events] == [('data', 1), ('g_forward', 1), ('data', 2),
+                                                                            ('g_forward', 2)]
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+    # a disabled profiler records nothing
+    profiler = build_step_profiler(None)
+    profiler.step(1)
+    with profiler.section('data'):
+        pass
+    assert profiler.summary() == {}
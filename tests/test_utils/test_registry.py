@@ -0,0 +1,54 @@
+import pytest
+import subprocess
+import sys
+
+from basicsr.utils.registry import ARCH_REGISTRY, DATASET_REGISTRY, Registry
+
+
+def test_registry_lazy():
+    """Test utils: Registry lazy registration"""
+    registry = Registry('test')
+    registry.register_lazy('OrderedDict', 'collections')
+    assert 'OrderedDict' in registry
+    assert 'OrderedDict' in registry.keys()
+    # the module registers nothing, so the lazy entry is consumed but nothing is found
+    with pytest.raises(KeyError):
+        registry.get('OrderedDict')
+
+    # conflicting modules for the same name
+    registry.register_lazy('Foo', 'module_a')
+    with pytest.raises(AssertionError):
+        registry.register_lazy('Foo', 'module_b')
+
+
+def test_arch_dataset_registry_index():
+    """Test utils: arch and dataset modules are registered lazily"""
+    assert 'RRDBNet' in ARCH_REGISTRY
+    assert 'SwinIR' in ARCH_REGISTRY
+    assert 'UNetDiscriminatorSN_basicsr' in ARCH_REGISTRY
+    assert 'PairedImageDataset' in DATASET_REGISTRY
+
+    from basicsr.archs.rrdbnet_arch import RRDBNet
+    assert ARCH_REGISTRY.get('RRDBNet') is RRDBNet
+    # the suffix fallback also resolves lazy names
+    assert ARCH_REGISTRY.get('UNetDiscriminatorSN').__name__ == 'UNetDiscriminatorSN'
+    assert 'basicsr.archs.discriminator_arch' in sys.modules
+
+
+def test_package_lazy_import():
+    """Test basicsr: subpackages are imported on first access"""
+    code = """
+import sys
+from basicsr.archs import build_network
+build_network(dict(type='RRDBNet', num_in_ch=3, num_out_ch=3, num_feat=8, num_block=1, num_grow_ch=4))
+print(sorted(name for name in ('basicsr.models', 'basicsr.train', 'torchvision') if name in sys.modules))
+import basicsr
+print(basicsr.build_model.__module__, basicsr.train_pipeline.__module__)
+"""
+    output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE).stdout.decode()
+    assert output.splitlines() == ['[]', 'basicsr.models basicsr.train']
+
+    import basicsr
+    assert 'build_network' in basicsr.__all__
+    with pytest.raises(AttributeError):
+        basicsr.not_a_name
@@ -0,0 +1,48 @@
+import pytest
+import torch
+from torch import nn
+
+from basicsr.utils.tile_util import pad_to_window, tile_inference
+
+
+class _PixelUpsample(nn.Module):
+    """A point-wise network, so tiled and whole-image results must agree."""
+
+    def __init__(self, scale):
+        super().__init__()
+        self.scale = scale
+        self.weight = nn.Parameter(torch.ones(1))
+
+    def forward(self, x):
+        return nn.functional.interpolate(x * self.weight, scale_factor=self.scale, mode='nearest')
+
+
+def test_tile_inference():
+    """Test utils: tile_inference"""
+    model = _PixelUpsample(scale=2)
+    img = torch.rand((1, 3, 37, 50), dtype=torch.float32)
+    whole = tile_inference(model, img)
+    assert whole.shape == (1, 3, 74, 100)
+
+    tiled = tile_inference(model, img, tile_size=16, tile_overlap=4)
+    assert tiled.shape == whole.shape
+    assert torch.allclose(tiled, whole, atol=1e-6)
+
+    # window padding is cropped away for every tile
+    tiled = tile_inference(model, img, scale=2, tile_size=20, tile_overlap=6, window_size=8)
+    assert torch.allclose(tiled, whole, atol=1e-6)
+
+    # overlap must be smaller than the tile
+    with pytest.raises(ValueError):
+        tile_inference(model, img, tile_size=16, tile_overlap=16)
+
+
+def test_pad_to_window():
+    """Test utils: pad_to_window"""
+    img = torch.rand((1, 3, 13, 16), dtype=torch.float32)
+    out, pad_h, pad_w = pad_to_window(img, 8)
+    assert out.shape == (1, 3, 16, 16)
+    assert (pad_h, pad_w) == (3, 0)
+
+    out, pad_h, pad_w = pad_to_window(img, 1)
+    assert out is img and (pad_h, pad_w) == (0, 0)
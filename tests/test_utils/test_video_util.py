@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import shutil
+import torch
+
+from basicsr.utils.video_util import FFmpegVideoReader, FFmpegVideoWriter, get_overlap_windows, stream_inference
+
+
+def test_get_overlap_windows():
+    """Test utils: get_overlap_windows"""
+    # disjoint chunks without context
+    assert get_overlap_windows(7, 3) == [(0, 3, 0, 3), (3, 6, 3, 6), (6, 7, 6, 7)]
+
+    windows = get_overlap_windows(10, 4, context=2)
+    assert windows == [(0, 6, 0, 4), (2, 10, 4, 8), (6, 10, 8, 10)]
+    # kept frames cover the sequence exactly once
+    kept = [idx for _, _, start, end in windows for idx in range(start, end)]
+    assert kept == list(range(10))
+
+    with pytest.raises(ValueError):
+        get_overlap_windows(10, 0)
+    with pytest.raises(ValueError):
+        get_overlap_windows(10, 4, context=-1)
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, reason='requires ffmpeg')
+def test_ffmpeg_video_reader_writer(tmp_path):
+    """Test utils: FFmpegVideoReader and FFmpegVideoWriter"""
+    video_path = str(tmp_path / 'test.mp4')
+    frames = [np.full((32, 48, 3), 40 * i, dtype=np.uint8) for i in range(5)]
+    writer = FFmpegVideoWriter(video_path, 48, 32, 10)
+    for frame in frames:
+        writer.write_frame(frame)
+    with pytest.raises(ValueError):
+        writer.write_frame(np.zeros((16, 16, 3), dtype=np.uint8))
+    writer.close()
+
+    reader = FFmpegVideoReader(video_path)
+    assert (reader.width, reader.height) == (48, 32)
+    assert reader.fps == pytest.approx(10)
+    results = reader.read_frames(10)
+    assert reader.read_frame() is None
+    reader.close()
+    assert len(results) == len(frames)
+    for result, frame in zip(results, frames):
+        assert result.shape == (32, 48, 3)
+        assert np.abs(result.astype(np.float32) - frame).mean() < 4
+
+    # closing before the end of the stream is not an error
+    reader = FFmpegVideoReader(video_path)
+    assert len(reader.read_frames(2)) == 2
+    reader.close()
+
+    # a failed decode is reported
+    reader = FFmpegVideoReader(video_path, ffmpeg_bin='false')
+    assert reader.read_frame() is None
+    with pytest.raises(RuntimeError):
+        reader.close()
+
+    # a failed encode is reported with the ffmpeg error
+    writer = FFmpegVideoWriter(str(tmp_path / 'test.unknown_format'), 48, 32, 10)
+    with pytest.raises(RuntimeError, match='ffmpeg exited'):
+        writer.close()
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, reason='requires ffmpeg')
+def test_stream_inference(tmp_path):
+    """Test utils: stream_inference"""
+    video_path = str(tmp_path / 'input.mp4')
+    frames = [np.full((32, 48, 3), 30 * i, dtype=np.uint8) for i in range(7)]
+    writer = FFmpegVideoWriter(video_path, 48, 32, 10)
+    for frame in frames:
+        writer.write_frame(frame)
+    writer.close()
+
+    window_sizes = []
+
+    def model(imgs):
+        window_sizes.append(imgs.size(1))
+        return imgs
+
+    progress = []
+    output_path = str(tmp_path / 'output.mp4')
+    num_frames = stream_inference(
+        model, video_path, output_path, 3, torch.device('cpu'), context=1, callback=lambda *args: progress.append(args))
+    assert num_frames == 7
+    # chunks of 3 kept frames with 1 context frame on each side
+    assert window_sizes == [4, 5, 2]
+    assert progress == [(idx, 7) for idx in range(1, 8)]
+
+    reader = FFmpegVideoReader(output_path)
+    results = reader.read_frames(10)
+    reader.close()
+    assert len(results) == len(frames)
+    for result, frame in zip(results, frames):
+        assert np.abs(result.astype(np.float32) - frame).mean() < 4